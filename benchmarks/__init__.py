@@ -0,0 +1 @@
+"""Offline benchmarks for the bot hot paths, run with `python -m benchmarks`."""
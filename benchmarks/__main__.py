@@ -0,0 +1,106 @@
+import argparse
+import importlib
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+BENCHMARKS = [
+    "loop",
+    "logging",
+    "lines",
+    "enrichment",
+    "dispatch",
+    "middlewares",
+    "crud",
+    "check_files",
+]
+
+# metric suffixes where a larger value is better, the time suffixes are the opposite
+HIGHER_IS_BETTER = ("_per_s",)
+LOWER_IS_BETTER = ("_s", "_ms", "_us")
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, Any]]:
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Any], threshold: float):
+    """Print the change of every timed metric, returns the regressed ones"""
+    old = dict(flatten(baseline))
+    regressions: List[str] = []
+    for name, value in flatten(results):
+        before = old.get(name)
+        if not isinstance(value, (int, float)) or not isinstance(before, (int, float)):
+            continue
+        if name.endswith(HIGHER_IS_BETTER):
+            higher_is_better = True
+        elif name.endswith(LOWER_IS_BETTER):
+            higher_is_better = False
+        else:
+            continue
+        if not before:
+            continue
+
+        change = (value - before) / before
+        regressed = -change > threshold if higher_is_better else change > threshold
+        if regressed:
+            regressions.append(name)
+        marker = "REGRESSION" if regressed else ""
+        print(f"{name:60} {before:>14.4g} -> {value:<14.4g} {change:+7.1%} {marker}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the bot benchmarks")
+    parser.add_argument(
+        "names", nargs="*", default=BENCHMARKS, help=f"any of {', '.join(BENCHMARKS)}"
+    )
+    parser.add_argument("-o", "--output", help="save the results as json")
+    parser.add_argument("-c", "--compare", help="baseline json saved with --output")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative change counted as a regression, default 0.1",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name}")
+
+        module = importlib.import_module(f"benchmarks.bench_{name}")
+        print(f"running {name}...", file=sys.stderr)
+        results[name] = module.run()
+        print(json.dumps({name: results[name]}, indent=2))
+
+    if args.output:
+        report = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\ncompared with {args.compare} from {baseline.get('created_at')}")
+        regressions = compare(baseline["results"], results, args.threshold)
+        if regressions:
+            print(
+                f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}"
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
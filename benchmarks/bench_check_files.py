@@ -0,0 +1,57 @@
+"""check_files parsing, dedup reads and format_file sorting on generated dumps."""
+
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import timeit
+from tgbot.services import check_files
+
+DOMAINS = 500
+FORMAT_DOMAINS = 200
+
+
+def generate_dump(path: str, lines: int) -> List[str]:
+    rng = random.Random(lines)
+    domains = [f"site{i}.com" for i in range(DOMAINS)]
+    with open(path, "w") as f:
+        for i in range(lines):
+            domain = rng.choice(domains)
+            # some urls carry a port, the parser must keep it in the url
+            port = ":8080" if i % 7 == 0 else ""
+            f.write(f"https://{domain}{port}/login:user{i % (lines // 2)}:pw{i}\n")
+    return domains
+
+
+def run(lines: int = 500000) -> Dict[str, Any]:
+    results: Dict[str, Any] = {"lines": lines}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = os.path.join(tmp, "dump.txt")
+        domains = generate_dump(dump, lines)
+        # format_file reads its format lists from and writes into the cwd
+        for name in ("UrlLogPass_format.txt", "LogPass_format.txt"):
+            with open(os.path.join(tmp, name), "w") as f:
+                f.write("\n".join(domains[:FORMAT_DOMAINS]))
+
+        sample = next(check_files.iter_line_chunks(dump, 1024 * 1024))
+        timing = timeit(lambda: [check_files.parse_line(line) for line in sample])
+        results["parse_line_us"] = timing["best_s"] / len(sample) * 1e6
+
+        timing = timeit(lambda: check_files._read_unique_lines(dump), repeat=3)
+        results["read_unique_lines_per_s"] = lines / timing["best_s"]
+
+        os.chdir(tmp)
+        try:
+            for processes in (1, 4):
+                start = time.perf_counter()
+                check_files.format_file(dump, processes, "bench", processes)
+                results[f"format_file_{processes}p_lines_per_s"] = lines / (
+                    time.perf_counter() - start
+                )
+        finally:
+            os.chdir(cwd)
+
+    return results
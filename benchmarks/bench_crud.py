@@ -0,0 +1,104 @@
+"""
+Repository call latency at several table sizes, needs BENCH_POSTGRES_DSN.
+
+Point it at a throwaway database, the users and addresses tables are
+truncated before every size.
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from benchmarks.common import percentile
+from tgbot.database.models import Address, User
+from tgbot.database.orm import AddressesRepo, batched
+
+ADDRESSES_PER_USER = 10
+CALLS = 300
+
+
+async def populate(engine: AsyncEngine, addresses: int) -> int:
+    users = max(addresses // ADDRESSES_PER_USER, 1)
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE users, addresses RESTART IDENTITY CASCADE"))
+        for ids in batched(range(1, users + 1), 5000):
+            await conn.execute(
+                insert(User), [{"id": i, "username": f"bench{i}"} for i in ids]
+            )
+        for ids in batched(range(addresses), 5000):
+            await conn.execute(
+                insert(Address),
+                [
+                    {
+                        "user_id": i % users + 1,
+                        "sol_address": f"{i:044d}",
+                        "name": f"wallet {i}",
+                        "active": i % 3 != 0,
+                    }
+                    for i in ids
+                ],
+            )
+        await conn.execute(text("ANALYZE users, addresses"))
+    return users
+
+
+async def latency(call: Callable[[], Awaitable[Any]]) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(CALLS):
+        start = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - start)
+    return {
+        "p50_ms": percentile(samples, 0.5) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+    }
+
+
+async def measure(dsn: str, sizes: tuple) -> Dict[str, Any]:
+    engine = create_async_engine(dsn)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            User.metadata.create_all, tables=[User.__table__, Address.__table__]
+        )
+    repo = AddressesRepo(async_sessionmaker(engine))
+
+    results: Dict[str, Any] = {}
+    for size in sizes:
+        users = await populate(engine, size)
+
+        def user_id() -> int:
+            return random.randint(1, users)
+
+        def address_id() -> int:
+            return random.randint(1, size)
+
+        results[f"rows_{size}"] = {
+            "get": await latency(lambda: repo.get(address_id())),
+            "get_all": await latency(lambda: repo.get_all(user_id=user_id())),
+            "get_page": await latency(lambda: repo.get_page(user_id())),
+            "count": await latency(lambda: repo.count(user_id=user_id())),
+            "count_user": await latency(lambda: repo.count_user(user_id())),
+            "create": await latency(
+                lambda: repo.create(
+                    user_id=user_id(), sol_address="bench", name="bench", active=True
+                )
+            ),
+            "update": await latency(
+                lambda: repo.update(address_id(), active=random.random() < 0.5)
+            ),
+        }
+
+    await engine.dispose()
+    return results
+
+
+def run(sizes: tuple = (1000, 10000, 100000)) -> Dict[str, Any]:
+    dsn = os.getenv("BENCH_POSTGRES_DSN")
+    if not dsn:
+        return {"skipped": "BENCH_POSTGRES_DSN is not set"}
+    return asyncio.run(measure(dsn, sizes))
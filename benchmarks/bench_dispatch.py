@@ -0,0 +1,92 @@
+"""Payload decode plus fan-out, per payload and end to end through Redis pub/sub."""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from fakeredis import aioredis as fakeredis
+
+from benchmarks.common import bench_config, stub_bot, timeit
+from bot import TgBot
+from tgbot.messages.texts import transaction_msg
+from tgbot.services.activity import ActivityTracker
+from tgbot.services.filters import filter_registry
+from tgbot.services.notifier import Notification, Notifier
+from tgbot.services.tracing import Trace
+
+CHANNEL = "solana_transactions"
+ADDRESS = "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM"
+COUNTERPARTY = "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU"
+
+
+def payload(i: int, fanout: int) -> bytes:
+    now = datetime.now(timezone.utc).isoformat()
+    return json.dumps(
+        {
+            "address": ADDRESS,
+            "chat_ids": list(range(1, fanout + 1)),
+            "signature": f"{i:064d}",
+            "amount": 1.5,
+            "from_addr": COUNTERPARTY,
+            "to_addr": ADDRESS,
+            "timestamp": now,
+            "published_at": now,
+            "trace_id": f"{i:032x}",
+        }
+    ).encode()
+
+
+def decode_and_fan_out(raw: bytes) -> List[Notification]:
+    """The synchronous part of the consumer loop for one payload"""
+    data = json.loads(raw)
+    trace = Trace.from_payload(data, time.time())
+    text = transaction_msg(data)
+    chat_ids = filter_registry.recipients(data, data["chat_ids"])
+    return [Notification(chat_id, text, trace) for chat_id in chat_ids]
+
+
+async def consume(payloads: int, fanout: int) -> Dict[str, Any]:
+    """Payloads published to a fake Redis until the stub session sent them all"""
+    bot = TgBot(bench_config())
+    bot.redis = fakeredis.FakeRedis()
+    bot.pubsub = bot.redis.pubsub()
+    await bot.pubsub.subscribe(CHANNEL)
+    telegram = stub_bot()
+    bot.notifier = Notifier(telegram, maxsize=payloads * fanout)
+    bot.activity = ActivityTracker(bot.redis)
+    bot.notifier.start()
+    consumer = asyncio.create_task(bot.process_transaction_updates())
+
+    messages = [payload(i, fanout) for i in range(payloads)]
+    expected = payloads * fanout
+
+    start = time.perf_counter()
+    for message in messages:
+        await bot.redis.publish(CHANNEL, message)
+    while telegram.session.calls < expected:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    consumer.cancel()
+    await asyncio.gather(consumer, return_exceptions=True)
+    await bot.notifier.stop()
+    await bot.pubsub.unsubscribe()
+    await bot.redis.aclose()
+    return {
+        "payloads_per_s": payloads / elapsed,
+        "notifications_per_s": expected / elapsed,
+    }
+
+
+def run(payloads: int = 5000, fanouts: tuple = (1, 10, 100)) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for fanout in fanouts:
+        raw = [payload(i, fanout) for i in range(1000)]
+        timing = timeit(lambda: [decode_and_fan_out(r) for r in raw], repeat=5)
+        results[f"fanout_{fanout}"] = {
+            "decode_fanout_us": timing["best_s"] / len(raw) * 1e6,
+            **asyncio.run(consume(payloads // fanout or 1, fanout)),
+        }
+    return results
@@ -0,0 +1,58 @@
+"""Enrichment latency and RPC requests, batched vs one getTransaction per call."""
+
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import percentile
+from benchmarks.mock_rpc import RECEIVER, MockRPC
+from tgbot.services.enrichment import Enricher
+from tgbot.services.solana_rpc import SolanaRPC
+
+
+async def enrich_all(
+    transactions: int, rate: float, latency: float, window: float, batch_size: int
+) -> Dict[str, Any]:
+    server = MockRPC(latency=latency)
+    await server.start()
+    enricher = Enricher(
+        SolanaRPC(server.url), window=window, batch_size=batch_size, timeout=30
+    )
+
+    latencies: List[float] = []
+    enriched = 0
+
+    async def one(i: int) -> None:
+        nonlocal enriched
+        start = time.perf_counter()
+        data = await enricher.enrich({"address": RECEIVER, "signature": f"sig{i}"})
+        latencies.append(time.perf_counter() - start)
+        enriched += bool(data.get("amount"))
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(transactions):
+        tasks.append(asyncio.create_task(one(i)))
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    await enricher.close()
+    await server.stop()
+    return {
+        "tx_per_s": transactions / elapsed,
+        "p50_s": percentile(latencies, 0.5),
+        "p99_s": percentile(latencies, 0.99),
+        "rpc_requests": server.requests,
+        "enriched": enriched,
+    }
+
+
+def run(
+    transactions: int = 2000, rate: float = 1000, latency: float = 0.05
+) -> Dict[str, Any]:
+    params = dict(transactions=transactions, rate=rate, latency=latency)
+    return {
+        "unbatched": asyncio.run(enrich_all(**params, window=0, batch_size=1)),
+        "batched": asyncio.run(enrich_all(**params, window=0.05, batch_size=100)),
+    }
@@ -0,0 +1,63 @@
+"""Bulk line ingestion throughput in rows per second, needs BENCH_POSTGRES_DSN."""
+
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Dict
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from tgbot.database.models import Line
+from tgbot.database.orm import LinesRepo
+
+
+class SilentMessage:
+    async def edit_text(self, text: str, **kwargs: Any) -> None:
+        pass
+
+
+def generate_lines(count: int) -> set:
+    prefix = uuid.uuid4().hex[:8]
+    return {
+        f"https://site{i % 997}.com/login:{prefix}user{i}:pass{i * 7}"
+        for i in range(count)
+    }
+
+
+async def ingest(dsn: str, rows: int) -> Dict[str, Any]:
+    engine = create_async_engine(dsn)
+    async with engine.begin() as conn:
+        await conn.run_sync(Line.metadata.create_all, tables=[Line.__table__])
+
+    repo = LinesRepo(async_sessionmaker(engine))
+    lines = generate_lines(rows)
+
+    start = time.perf_counter()
+    added, exists, _ = await repo.insert_lines_check_existence(
+        lines, SilentMessage(), "en", rows, 0
+    )
+    fresh = time.perf_counter() - start
+
+    # the same lines again, every row hits the existence check
+    start = time.perf_counter()
+    added_again, exists_again, _ = await repo.insert_lines_check_existence(
+        lines, SilentMessage(), "en", rows, 0
+    )
+    existing = time.perf_counter() - start
+
+    await engine.dispose()
+    return {
+        "rows": rows,
+        "new_rows_per_s": added / fresh,
+        "existing_rows_per_s": exists_again / existing,
+        "added": added,
+        "exists_on_rerun": exists_again,
+    }
+
+
+def run(rows: int = 200000) -> Dict[str, Any]:
+    dsn = os.getenv("BENCH_POSTGRES_DSN")
+    if not dsn:
+        return {"skipped": "BENCH_POSTGRES_DSN is not set"}
+    return asyncio.run(ingest(dsn, rows))
@@ -0,0 +1,70 @@
+"""Per-call cost of logging a per-recipient event on the event loop thread."""
+
+import logging
+import os
+import tempfile
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Any, Dict
+
+from benchmarks.common import timeit
+from tgbot.services.log_setup import LOG_FORMAT, EventAggregator, JsonFormatter
+
+CALLS = 20000
+
+
+def isolated_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(f"benchmarks.logging.{name}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def per_call(logger_call) -> float:
+    result = timeit(lambda: [logger_call(i) for i in range(CALLS)], repeat=3)
+    return result["best_s"] / CALLS
+
+
+def run() -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # the old setup: a handler doing the I/O on the calling thread
+        file_handler = logging.FileHandler(os.path.join(tmp, "sync.log"))
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        sync_logger = isolated_logger("sync", file_handler)
+        results["sync_handler_us"] = (
+            per_call(lambda i: sync_logger.info(f"Target [ID:{i}]: success")) * 1e6
+        )
+
+        # queue handler, the listener thread owns the file handler
+        log_queue: SimpleQueue = SimpleQueue()
+        json_handler = logging.FileHandler(os.path.join(tmp, "queued.log"))
+        json_handler.setFormatter(JsonFormatter())
+        listener = QueueListener(log_queue, json_handler)
+        listener.start()
+        queued_logger = isolated_logger("queued", QueueHandler(log_queue))
+        results["queue_handler_us"] = (
+            per_call(lambda i: queued_logger.info("Target [ID:%s]: success", i)) * 1e6
+        )
+        listener.stop()
+
+        # aggregated events only log a summary per window
+        aggregator = EventAggregator(queued_logger)
+        listener = QueueListener(log_queue, json_handler)
+        listener.start()
+        results["aggregated_us"] = (
+            per_call(
+                lambda i: aggregator.add(
+                    "sends failed", "TelegramForbiddenError", "Target [ID:%s]", i
+                )
+            )
+            * 1e6
+        )
+        aggregator.flush()
+        listener.stop()
+
+        file_handler.close()
+        json_handler.close()
+
+    return results
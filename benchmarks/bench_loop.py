@@ -0,0 +1,56 @@
+"""Notification throughput of the Notifier under the default loop and uvloop."""
+
+import asyncio
+import time
+from typing import Any, Dict
+
+from benchmarks.common import stub_bot
+from tgbot.services.notifier import Notification, Notifier
+
+
+async def notification_throughput(
+    notifications: int, workers: int, latency: float
+) -> float:
+    bot = stub_bot(latency)
+    notifier = Notifier(bot, workers=workers, maxsize=notifications)
+    notifier.start()
+
+    start = time.perf_counter()
+    for i in range(notifications):
+        await notifier.submit(Notification(i + 1, "transaction for the address: x"))
+    await notifier.queue.join()
+    elapsed = time.perf_counter() - start
+
+    await notifier.stop()
+    return notifications / elapsed
+
+
+def run_with_policy(policy: Any, **kwargs: Any) -> float:
+    previous = asyncio.get_event_loop_policy()
+    asyncio.set_event_loop_policy(policy)
+    try:
+        return asyncio.run(notification_throughput(**kwargs))
+    finally:
+        asyncio.set_event_loop_policy(previous)
+
+
+def run(
+    notifications: int = 20000, workers: int = 8, latency: float = 0.0005
+) -> Dict[str, Any]:
+    params = dict(notifications=notifications, workers=workers, latency=latency)
+    results: Dict[str, Any] = {
+        "asyncio_msgs_per_s": run_with_policy(
+            asyncio.DefaultEventLoopPolicy(), **params
+        )
+    }
+
+    try:
+        import uvloop
+    except ImportError:
+        results["uvloop_msgs_per_s"] = None
+    else:
+        results["uvloop_msgs_per_s"] = run_with_policy(
+            uvloop.EventLoopPolicy(), **params
+        )
+
+    return results
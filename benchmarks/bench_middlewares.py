@@ -0,0 +1,133 @@
+"""
+Per-update cost of the outer middleware pipeline, against a bare dispatcher.
+
+Users live in an in-memory repository unless BENCH_POSTGRES_DSN is set,
+then the database stage reads them from Postgres like in production. The
+dev mode run measures the updates of non-admins the pipeline drops.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from aiogram import Dispatcher, Router
+from aiogram.types import Chat, Message, Update, User as TelegramUser
+from fakeredis import aioredis as fakeredis
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks.common import bench_config, stub_bot
+from bot import TgBot
+from tgbot.database.models import Address, User
+from tgbot.database.orm import AsyncORM
+from tgbot.misc.readiness import readiness
+
+USERS = 1000
+
+
+class MemoryUsersRepo:
+    """The part of UsersRepo the database stage uses, kept in a dict"""
+
+    def __init__(self):
+        self.users: Dict[int, User] = {}
+
+    async def get(self, id: int) -> Optional[User]:
+        return self.users.get(id)
+
+    async def create(self, **kwargs: Any) -> User:
+        user = User(**kwargs)
+        self.users[user.id] = user
+        return user
+
+    async def update(self, id: int, **kwargs: Any) -> User:
+        user = self.users[id]
+        for key, value in kwargs.items():
+            setattr(user, key, value)
+        return user
+
+
+def message_update(i: int) -> Update:
+    user_id = i % USERS + 1
+    return Update(
+        update_id=i,
+        message=Message(
+            message_id=i,
+            date=datetime.now(),
+            chat=Chat(id=user_id, type="private"),
+            from_user=TelegramUser(
+                id=user_id, is_bot=False, first_name="bench", username=f"u{user_id}"
+            ),
+            text="/start",
+        ),
+    )
+
+
+def dispatcher(with_middlewares: bool, dev: bool = False) -> Dispatcher:
+    router = Router(name="bench")
+
+    @router.message()
+    async def noop(message: Message) -> None:
+        pass
+
+    config = bench_config()
+    config.misc.dev = dev
+    bot = TgBot(config)
+    bot.redis = fakeredis.FakeRedis()
+    bot.dp = Dispatcher()
+    bot.dp.include_router(router)
+    if with_middlewares:
+        bot.register_middlewares()
+    return bot.dp
+
+
+async def updates_per_second(
+    with_middlewares: bool, updates: int, dev: bool = False
+) -> float:
+    dp = dispatcher(with_middlewares, dev)
+    bot = stub_bot()
+    batch = [message_update(i) for i in range(updates)]
+
+    # the first round creates the users
+    for update in batch[:USERS]:
+        await dp.feed_update(bot, update)
+
+    start = time.perf_counter()
+    for update in batch:
+        await dp.feed_update(bot, update)
+    return updates / (time.perf_counter() - start)
+
+
+async def measure(updates: int) -> Dict[str, Any]:
+    dsn = os.getenv("BENCH_POSTGRES_DSN")
+    engine = None
+    if dsn:
+        engine = create_async_engine(dsn)
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                User.metadata.create_all, tables=[User.__table__, Address.__table__]
+            )
+        AsyncORM.set_session_factory(async_sessionmaker(engine))
+        AsyncORM.init_models()
+    else:
+        AsyncORM.users = MemoryUsersRepo()
+    readiness.set("db")
+
+    bare = await updates_per_second(False, updates)
+    chain = await updates_per_second(True, updates)
+    rejected = await updates_per_second(True, updates, dev=True)
+    if engine:
+        await engine.dispose()
+
+    return {
+        "users": "postgres" if dsn else "memory",
+        "bare_updates_per_s": bare,
+        "chain_updates_per_s": chain,
+        "chain_overhead_us": (1 / chain - 1 / bare) * 1e6,
+        "dev_rejected_updates_per_s": rejected,
+        "dev_rejected_overhead_us": (1 / rejected - 1 / bare) * 1e6,
+    }
+
+
+def run(updates: int = 10000) -> Dict[str, Any]:
+    return asyncio.run(measure(updates))
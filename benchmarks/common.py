@@ -0,0 +1,117 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage, TelegramMethod
+from aiogram.types import Chat, Message
+
+from tgbot.config import (
+    Config,
+    Health,
+    History,
+    Misc,
+    Postgres,
+    Redis,
+    Solana,
+    TelegramSession,
+    TgBot,
+)
+
+BENCH_TOKEN = "123456789:AAbenchmarkbenchmarkbenchmarkbenchm"
+
+
+class StubSession(BaseSession):
+    """Bot session that answers every call locally after `latency` seconds"""
+
+    def __init__(self, latency: float = 0.0, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.calls = 0
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None
+    ) -> Any:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if isinstance(method, SendMessage):
+            return Message(
+                message_id=self.calls,
+                date=datetime.now(),
+                chat=Chat(id=int(method.chat_id), type="private"),
+                text=method.text,
+            )
+        return True
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[Dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def stub_bot(latency: float = 0.0) -> Bot:
+    return Bot(token=BENCH_TOKEN, session=StubSession(latency))
+
+
+def bench_config(admin_ids: Optional[List[int]] = None) -> Config:
+    """Config of a bot that never leaves the process"""
+    return Config(
+        tg_bot=TgBot(token=BENCH_TOKEN, admin_ids=admin_ids or [1]),
+        telegram_session=TelegramSession(),
+        postgres=Postgres(
+            db_name="bench", db_user="bench", db_pass="bench", db_host="localhost"
+        ),
+        redis=Redis(
+            redis_pass=None,
+            redis_port=6379,
+            redis_host="localhost",
+            redis_tx_channel="solana_transactions",
+            redis_cmd_channel="wallet_commands",
+        ),
+        history=History(enabled=False),
+        solana=Solana(http_url="http://127.0.0.1:8899"),
+        health=Health(),
+        misc=Misc(dev=False),
+    )
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(int(len(ordered) * q), len(ordered) - 1)
+    return ordered[index]
+
+
+def timeit(func, repeat: int = 5, number: int = 1) -> Dict[str, float]:
+    """Best and mean seconds per call of a sync function"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        runs.append((time.perf_counter() - start) / number)
+    return {"best_s": min(runs), "mean_s": sum(runs) / len(runs)}
+
+
+async def atimeit(func, repeat: int = 5, number: int = 1) -> Dict[str, float]:
+    """Best and mean seconds per call of a coroutine function"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        runs.append((time.perf_counter() - start) / number)
+    return {"best_s": min(runs), "mean_s": sum(runs) / len(runs)}
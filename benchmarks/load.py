@@ -0,0 +1,234 @@
+"""
+End-to-end load test: synthetic tracker -> Redis -> bot -> mock Bot API.
+
+A publisher emits transactions on solana_transactions at a fixed rate, the
+wallets are picked with a Zipf skew and the top `whales` wallets have
+`whale_subscribers` subscribers each. The bot side is the production
+consumer and Notifier over a real AiohttpSession pointed at MockTelegram.
+Without --redis-url the pub/sub runs on fakeredis inside the process.
+
+    python -m benchmarks.load --rate 50 --duration 30 --whales 1
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from fakeredis import aioredis as fakeredis
+from redis import asyncio as aioredis
+
+from benchmarks.common import BENCH_TOKEN, bench_config, percentile
+from benchmarks.mock_telegram import MockTelegram
+from bot import TgBot
+from tgbot.config import TelegramSession
+from tgbot.services.activity import ActivityTracker
+from tgbot.services.notifier import Notifier
+from tgbot.services.telegram_session import TunedAiohttpSession
+
+CHANNEL = "solana_transactions"
+SIGNATURE = re.compile(r"solscan\.io/tx/(\w+)")
+
+
+class Publisher:
+    """Synthetic tracker publishing transactions of skewed wallets"""
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        wallets: int = 1000,
+        skew: float = 1.1,
+        subscribers: Tuple[int, int] = (1, 3),
+        whales: int = 0,
+        whale_subscribers: int = 1000,
+    ):
+        self.redis = redis
+        self.wallets = [f"{i:044d}" for i in range(wallets)]
+        # wallet i is picked with a weight of 1 / (i + 1) ** skew
+        self.weights = list(
+            itertools.accumulate(1 / (i + 1) ** skew for i in range(wallets))
+        )
+
+        chat_ids = itertools.count(1)
+        self.chat_ids: Dict[str, List[int]] = {}
+        for rank, wallet in enumerate(self.wallets):
+            count = whale_subscribers if rank < whales else random.randint(*subscribers)
+            self.chat_ids[wallet] = [next(chat_ids) for _ in range(count)]
+
+        self.published_at: Dict[str, float] = {}
+        self.expected = 0
+
+    async def run(self, rate: float, duration: float) -> None:
+        total = int(rate * duration)
+        start = time.perf_counter()
+        for i in range(total):
+            # scheduled sends, a slow publish does not lower the rate
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            wallet = random.choices(self.wallets, cum_weights=self.weights)[0]
+            signature = f"sig{i}"
+            now = time.time()
+            published_at = datetime.fromtimestamp(now, timezone.utc).isoformat()
+            self.published_at[signature] = now
+            self.expected += len(self.chat_ids[wallet])
+            await self.redis.publish(
+                CHANNEL,
+                json.dumps(
+                    {
+                        "address": wallet,
+                        "chat_ids": self.chat_ids[wallet],
+                        "signature": signature,
+                        "amount": round(random.uniform(0.01, 100), 4),
+                        "timestamp": published_at,
+                        "published_at": published_at,
+                        "trace_id": signature,
+                    }
+                ),
+            )
+
+
+def report(
+    publisher: Publisher, telegram: MockTelegram, started_at: float
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    delivered = set()
+    for delivery in telegram.deliveries:
+        match = SIGNATURE.search(delivery.text)
+        if not match or match.group(1) not in publisher.published_at:
+            continue
+        delivered.add((delivery.chat_id, match.group(1)))
+        latencies.append(delivery.at - publisher.published_at[match.group(1)])
+
+    last = max((d.at for d in telegram.deliveries), default=started_at)
+    lost = publisher.expected - len(delivered)
+    return {
+        "transactions": len(publisher.published_at),
+        "expected_messages": publisher.expected,
+        "delivered_messages": len(delivered),
+        "duplicates": len(latencies) - len(delivered),
+        "lost_messages": lost,
+        "loss_ratio": lost / publisher.expected if publisher.expected else 0.0,
+        "msgs_per_s": len(delivered) / max(last - started_at, 1e-9),
+        "p50_s": percentile(latencies, 0.5),
+        "p99_s": percentile(latencies, 0.99),
+        "throttled_requests": telegram.throttled,
+    }
+
+
+async def run_load(
+    rate: float,
+    duration: float,
+    drain: float,
+    wallets: int,
+    skew: float,
+    whales: int,
+    whale_subscribers: int,
+    latency: float,
+    global_rate: float,
+    chat_rate: float,
+    workers: int,
+    redis_url: Optional[str] = None,
+) -> Dict[str, Any]:
+    telegram = MockTelegram(latency, global_rate, chat_rate)
+    await telegram.start()
+
+    redis = await aioredis.from_url(redis_url) if redis_url else fakeredis.FakeRedis()
+    bot = TgBot(bench_config())
+    bot.redis = redis
+    bot.pubsub = redis.pubsub()
+    await bot.pubsub.subscribe(CHANNEL)
+    bot.bot = Bot(
+        token=BENCH_TOKEN,
+        parse_mode="HTML",
+        session=TunedAiohttpSession(
+            TelegramSession(api_url=telegram.url, file_url=telegram.url)
+        ),
+    )
+    bot.notifier = Notifier(bot.bot, workers=workers)
+    bot.activity = ActivityTracker(redis)
+    bot.notifier.start()
+    consumer = asyncio.create_task(bot.process_transaction_updates())
+
+    publisher = Publisher(
+        redis, wallets, skew, whales=whales, whale_subscribers=whale_subscribers
+    )
+    started_at = time.time()
+    await publisher.run(rate, duration)
+
+    # wait for the backlog until everything arrived or the drain time is over
+    deadline = time.monotonic() + drain
+    while time.monotonic() < deadline:
+        if len(telegram.deliveries) >= publisher.expected:
+            break
+        await asyncio.sleep(0.1)
+
+    result = report(publisher, telegram, started_at)
+    result["queued_at_end"] = bot.notifier.queue.qsize()
+
+    consumer.cancel()
+    await asyncio.gather(consumer, return_exceptions=True)
+    await bot.notifier.stop()
+    await bot.pubsub.unsubscribe()
+    await bot.bot.session.close()
+    await redis.aclose()
+    await telegram.stop()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end load test of the bot")
+    parser.add_argument("--rate", type=float, default=20, help="transactions/s")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument(
+        "--drain", type=float, default=60, help="seconds to wait for the backlog"
+    )
+    parser.add_argument("--wallets", type=int, default=1000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument("--whales", type=int, default=0)
+    parser.add_argument("--whale-subscribers", type=int, default=1000)
+    parser.add_argument(
+        "--latency", type=float, default=0.03, help="mean Bot API latency"
+    )
+    parser.add_argument(
+        "--global-rate", type=float, default=30, help="messages/s, 0 is unlimited"
+    )
+    parser.add_argument(
+        "--chat-rate", type=float, default=1, help="messages/s per chat, 0 is unlimited"
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Notifier workers")
+    parser.add_argument("--redis-url", help="a real Redis instead of fakeredis")
+    parser.add_argument("-o", "--output", help="save the report as json")
+    args = parser.parse_args()
+
+    result = asyncio.run(
+        run_load(
+            rate=args.rate,
+            duration=args.duration,
+            drain=args.drain,
+            wallets=args.wallets,
+            skew=args.skew,
+            whales=args.whales,
+            whale_subscribers=args.whale_subscribers,
+            latency=args.latency,
+            global_rate=args.global_rate,
+            chat_rate=args.chat_rate,
+            workers=args.workers,
+            redis_url=args.redis_url,
+        )
+    )
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Local Solana JSON-RPC server answering getTransaction and getMultipleAccounts with
+synthetic data.
+
+Run it standalone and point the bot at it with
+SOLANA_HTTP_URL=http://localhost:8899:
+
+    python -m benchmarks.mock_rpc --port 8899 --latency 0.08
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+SENDER = "Sender1111111111111111111111111111111111111"
+RECEIVER = "Receiver111111111111111111111111111111111111"
+MINT = "Mint111111111111111111111111111111111111111"
+
+
+def fake_mint(mint: str) -> Dict[str, Any]:
+    return {
+        "data": {
+            "program": "spl-token-2022",
+            "parsed": {
+                "type": "mint",
+                "info": {
+                    "decimals": 6,
+                    "extensions": [
+                        {
+                            "extension": "tokenMetadata",
+                            "state": {"symbol": f"T{mint[-3:]}"},
+                        }
+                    ],
+                },
+            },
+        }
+    }
+
+
+def fake_transaction(signature: str) -> Dict[str, Any]:
+    lamports = int.from_bytes(hashlib.md5(signature.encode()).digest()[:4], "big")
+    return {
+        "slot": 250_000_000,
+        "blockTime": 1_700_000_000,
+        "meta": {
+            "err": None,
+            "fee": 5000,
+            "preBalances": [10_000_000_000, 0],
+            "postBalances": [10_000_000_000 - lamports - 5000, lamports],
+            "preTokenBalances": [],
+            "postTokenBalances": [
+                {
+                    "accountIndex": 1,
+                    "mint": MINT,
+                    "owner": RECEIVER,
+                    "uiTokenAmount": {"amount": str(lamports), "decimals": 6},
+                }
+            ],
+        },
+        "transaction": {
+            "signatures": [signature],
+            "message": {
+                "accountKeys": [
+                    {"pubkey": SENDER, "signer": True, "writable": True},
+                    {"pubkey": RECEIVER, "signer": False, "writable": True},
+                ]
+            },
+        },
+    }
+
+
+class MockRPC:
+    """
+    JSON-RPC server with injected latency and failures.
+
+    Every HTTP request waits `latency` seconds, a batch costs the same as a
+    single call like on a real node. With `failure_rate` some requests
+    answer with HTTP 503.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        failure_rate: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.calls = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _answer(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        self.calls += 1
+        reply: Dict[str, Any] = {"jsonrpc": "2.0", "id": call.get("id")}
+        if call.get("method") == "getTransaction":
+            reply["result"] = fake_transaction(call["params"][0])
+        elif call.get("method") == "getMultipleAccounts":
+            reply["result"] = {
+                "context": {"slot": 250_000_000},
+                "value": [fake_mint(mint) for mint in call["params"][0]],
+            }
+        else:
+            reply["error"] = {"code": -32601, "message": "Method not found"}
+        return reply
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        payload = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            return web.Response(status=503)
+
+        if isinstance(payload, list):
+            replies: List[Dict[str, Any]] = [self._answer(call) for call in payload]
+            return web.json_response(replies)
+        return web.json_response(self._answer(payload))
+
+    async def start(self) -> None:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # the real port when 0 was asked for
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def serve(args: argparse.Namespace) -> None:
+    server = MockRPC(args.latency, args.failure_rate, args.host, args.port)
+    await server.start()
+    print(f"mock Solana RPC on {server.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Solana JSON-RPC server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    asyncio.run(serve(parser.parse_args()))
@@ -0,0 +1,198 @@
+"""
+Local stand-in for the Telegram Bot API server, the role tracker_nginx plays
+in production.
+
+sendMessage and sendPhoto answer after a configurable latency and enforce
+Telegram's flood limits with token buckets, one for the whole bot and one
+per chat. A request over a limit gets the same 429 with `retry_after` that
+Telegram sends. Run it standalone and point a bot session at it:
+
+    python -m benchmarks.mock_telegram --port 8081 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+@dataclass
+class TokenBucket:
+    rate: float
+    burst: float
+    tokens: float = 0.0
+    updated_at: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self):
+        self.tokens = self.burst
+
+    def take(self) -> float:
+        """0 when a token was taken, otherwise seconds until the next one"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+@dataclass
+class Delivery:
+    method: str
+    chat_id: int
+    text: str
+    at: float
+
+
+class MockTelegram:
+    """
+    Bot API server keeping every accepted message in `deliveries`.
+
+    `global_rate` and `chat_rate` are messages per second, 0 disables the
+    limit. `latency` is the mean of an exponential delay with a floor of
+    half of it, so a few requests take much longer like on the real API.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.03,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.host = host
+        self.port = port
+        self.deliveries: List[Delivery] = []
+        self.requests = 0
+        self.throttled = 0
+        self._global = TokenBucket(global_rate, global_rate) if global_rate else None
+        self._chats: Dict[int, TokenBucket] = {}
+        self._message_id = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _retry_after(self, chat_id: int) -> int:
+        waits = []
+        if self._global:
+            waits.append(self._global.take())
+        if self.chat_rate:
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                bucket = self._chats[chat_id] = TokenBucket(
+                    self.chat_rate, self.chat_burst
+                )
+            waits.append(bucket.take())
+        wait = max(waits, default=0.0)
+        # Telegram rounds up to whole seconds
+        return math.ceil(wait) if wait else 0
+
+    async def _delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency / 2 + random.expovariate(2 / self.latency))
+
+    def _message(self, chat_id: int, **content: Any) -> Dict[str, Any]:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            **content,
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        await self._delay()
+
+        if method not in ("sendMessage", "sendPhoto"):
+            return web.json_response({"ok": True, "result": True})
+
+        chat_id = int(params.get("chat_id", 0))
+        retry_after = self._retry_after(chat_id)
+        if retry_after:
+            self.throttled += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                },
+                status=429,
+            )
+
+        if method == "sendMessage":
+            text = str(params.get("text", ""))
+            result = self._message(chat_id, text=text)
+        else:
+            text = str(params.get("caption", ""))
+            photo = {
+                "file_id": f"photo{self._message_id}",
+                "file_unique_id": f"photo{self._message_id}",
+                "width": 800,
+                "height": 600,
+            }
+            result = self._message(chat_id, caption=text, photo=[photo])
+
+        self.deliveries.append(Delivery(method, chat_id, text, time.time()))
+        return web.json_response({"ok": True, "result": result})
+
+    async def start(self) -> None:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # the real port when 0 was asked for
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def serve(args: argparse.Namespace) -> None:
+    server = MockTelegram(
+        args.latency,
+        args.global_rate,
+        args.chat_rate,
+        args.chat_burst,
+        args.host,
+        args.port,
+    )
+    await server.start()
+    print(f"mock Telegram Bot API on {server.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Telegram Bot API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.03, help="seconds")
+    parser.add_argument(
+        "--global-rate", type=float, default=30, help="messages/s, 0 is unlimited"
+    )
+    parser.add_argument(
+        "--chat-rate", type=float, default=1, help="messages/s per chat, 0 is unlimited"
+    )
+    parser.add_argument("--chat-burst", type=float, default=3)
+    asyncio.run(serve(parser.parse_args()))
@@ -2,25 +2,47 @@ import asyncio
 import json
 import logging
 import signal
+import time
+from logging.handlers import QueueListener
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Set
 
-import betterlogging as bl
 from aiogram import Bot, Dispatcher
-from aiogram.client.session.aiohttp import AiohttpSession
-from aiogram.client.telegram import TelegramAPIServer
 from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+from aiogram.types import CallbackQuery, Message
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from aiohttp import web
 from redis import asyncio as aioredis
 
 from tgbot.config import Config, load_config
 from tgbot.handlers import routers_list
-from tgbot.middlewares.config import ConfigMiddleware
-from tgbot.middlewares.database import DatabaseMiddleware
-from tgbot.middlewares.dev import DeveloperMiddleware
-from tgbot.services import broadcaster
+from tgbot.middlewares.config import inject_config
+from tgbot.middlewares.database import load_user
+from tgbot.middlewares.dev import admins_only, has_user
+from tgbot.middlewares.metrics import (
+    HandlerMetricsMiddleware,
+    RequestMetricsMiddleware,
+    StageMetrics,
+)
+from tgbot.middlewares.pipeline import PipelineMiddleware, Stage
+from tgbot.messages.texts import transaction_msg
+from tgbot.misc.readiness import readiness
+from tgbot.services import broadcaster, handoff, log_setup, watchlist
+from tgbot.services.activity import ActivityTracker
+from tgbot.services.enrichment import Enricher
+from tgbot.services.filters import filter_registry
+from tgbot.services.live_dashboard import live_dashboard
+from tgbot.services.health import HealthChecker
+from tgbot.services.history import HistoryWriter
+from tgbot.services.loop_monitor import LoopLagMonitor, install_uvloop
+from tgbot.services.metrics import PUBSUB_MESSAGES, metrics_handler, probe_redis
 from tgbot.services.migration import init_db_and_migrations
+from tgbot.services.notifier import Notification, Notifier
+from tgbot.services.startup import StartupOrchestrator
+from tgbot.services.telegram_session import TunedAiohttpSession
+from tgbot.services.stats import stats_sampler
+from tgbot.services.token_metadata import TokenMetadataCache
+from tgbot.services.tracing import Trace
 
 
 class TgBot:
@@ -31,6 +53,27 @@ class TgBot:
         self.redis: Optional[aioredis.Redis] = None
         self.pubsub: Optional[aioredis.client.PubSub] = None
         self.app: Optional[web.Application] = None
+        self.runner: Optional[web.AppRunner] = None
+        self.consumer_task: Optional[asyncio.Task] = None
+        self.replay_task: Optional[asyncio.Task] = None
+        # monotonic time of the last pubsub poll, wall clock of the last message
+        self.consumer_heartbeat = time.monotonic()
+        self.last_message_at: Optional[float] = None
+        self.notifier: Optional[Notifier] = None
+        self.history = HistoryWriter(config.history)
+        self.activity: Optional[ActivityTracker] = None
+        self.enricher: Optional[Enricher] = (
+            Enricher.from_config(config.solana)
+            if config.solana.enrichment_enabled
+            else None
+        )
+        # transactions waiting for enrichment, the consumer blocks beyond that
+        self.enrich_slots = asyncio.Semaphore(1000)
+        self.enrich_tasks: Set[asyncio.Task] = set()
+        self.log_listener: Optional[QueueListener] = None
+        self.loop_monitor = LoopLagMonitor(threshold=config.misc.loop_lag_threshold)
+        self.health = HealthChecker(config.health, self)
+        self.stopping = False
         self.logger = logging.getLogger(__name__)
 
     async def setup_redis(self) -> None:
@@ -38,6 +81,9 @@ class TgBot:
             self.redis = await aioredis.from_url(self.config.redis.dsn(1))
             self.pubsub = self.redis.pubsub()
             await self.pubsub.subscribe("solana_transactions")
+            self.activity = ActivityTracker(self.redis)
+            if self.enricher:
+                self.enricher.tokens = TokenMetadataCache(self.redis, self.enricher.rpc)
         except Exception as e:
             self.logger.error(f"Failed to setup Redis: {e}")
             raise
@@ -48,72 +94,181 @@ class TgBot:
             key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
         )
 
-        session = AiohttpSession(
-            api=TelegramAPIServer.from_base("http://tracker_nginx:80")
-        )
+        session = TunedAiohttpSession(self.config.telegram_session)
+        session.middleware(RequestMetricsMiddleware())
         self.bot = Bot(
             token=self.config.tg_bot.token, parse_mode="HTML", session=session
         )
         self.dp = Dispatcher(storage=storage)
+        self.notifier = Notifier(self.bot)
+        live_dashboard.setup(
+            self.bot,
+            self.config.misc.live_refresh_interval,
+            seed_from_history=self.config.history.enabled,
+        )
 
         # Register handlers
         self.dp.include_routers(*routers_list)
         self.register_middlewares()
 
     def register_middlewares(self) -> None:
-        middleware_types = [
-            ConfigMiddleware(self.config, self.redis),
-            DatabaseMiddleware(),
-            DeveloperMiddleware(),
+        # cheapest first, an update dropped early never reaches the database
+        user_events = (Message, CallbackQuery)
+        stages = [Stage("from_user", has_user, user_events)]
+        if self.config.misc.dev:
+            stages.append(
+                Stage(
+                    "developer", admins_only(self.config.tg_bot.admin_ids), user_events
+                )
+            )
+        stages += [
+            Stage("config", inject_config(self.config, self.redis)),
+            Stage("database", load_user, user_events),
         ]
 
-        for middleware_type in middleware_types:
-            self.dp.message.outer_middleware(middleware_type)
-            self.dp.callback_query.outer_middleware(middleware_type)
+        pipeline = PipelineMiddleware(stages, hooks=[StageMetrics()])
+        self.dp.message.outer_middleware(pipeline)
+        self.dp.callback_query.outer_middleware(pipeline)
+
+        self.dp.message.middleware(HandlerMetricsMiddleware())
+        self.dp.callback_query.middleware(HandlerMetricsMiddleware())
 
     async def setup_webhook(self) -> None:
         self.app = web.Application()
         webhook_handler = SimpleRequestHandler(dispatcher=self.dp, bot=self.bot)
         webhook_handler.register(self.app, path="/webhook")
+        self.app.router.add_get("/metrics", metrics_handler)
+        self.health.register(self.app)
         setup_application(self.app, self.dp, bot=self.bot)
 
-    async def on_startup(self) -> None:
+    async def run_migrations(self) -> None:
+        postgres = self.config.postgres
         await init_db_and_migrations(
-            database_url=f"postgresql+asyncpg://{self.config.postgres.db_user}:{self.config.postgres.db_pass}"
-            f"@{self.config.postgres.db_host}:5432/{self.config.postgres.db_name}",
+            database_url=postgres.url(),
             alembic_cfg_path=str(Path(__file__).parent / "alembic.ini"),
+            replica_urls=postgres.replica_urls,
+            sticky_seconds=postgres.sticky_seconds,
+            replica_retry=postgres.replica_retry,
         )
+        readiness.set("db")
+
+    async def start_http_site(self) -> None:
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "0.0.0.0", 80)
+        await site.start()
+
+    async def register_webhook(self) -> None:
+        # set_webhook replaces the previous one, pending updates are kept
+        await self.bot.set_webhook("http://tracker_tg_bot/webhook")
+
+    async def start_pubsub_consumer(self) -> None:
+        self.notifier.start()
+        # notifications stopping processes could not send, polled until shutdown
+        self.replay_task = asyncio.create_task(
+            handoff.consume(self.redis, self.notifier)
+        )
+        self.activity.start()
+        self.consumer_task = asyncio.create_task(self.process_transaction_updates())
+        asyncio.create_task(probe_redis(self.redis))
+        stats_sampler.start()
+        asyncio.create_task(log_setup.flush_aggregators())
+
+    async def notify_admins(self) -> None:
         await broadcaster.broadcast(
             self.bot, self.config.tg_bot.admin_ids, "Бот запущен"
         )
-        await self.bot.delete_webhook()
-        await self.bot.set_webhook("http://tracker_tg_bot/webhook")
+
+    async def on_startup(self) -> None:
+        orchestrator = StartupOrchestrator(self.logger)
+        orchestrator.add_step("http_site", self.start_http_site)
+        orchestrator.add_step(
+            "webhook", self.register_webhook, depends_on=("http_site",)
+        )
+        orchestrator.add_step("pubsub_consumer", self.start_pubsub_consumer)
+        orchestrator.add_step("migrations", self.run_migrations)
+        orchestrator.add_step("history", self.history.start, depends_on=("migrations",))
+        orchestrator.add_step(
+            "filters", filter_registry.load, depends_on=("migrations",)
+        )
+        orchestrator.add_step(
+            "live_dashboard", live_dashboard.load, depends_on=("history",)
+        )
+        orchestrator.add_step(
+            "notify_admins",
+            self.notify_admins,
+            depends_on=("webhook",),
+            background=True,
+        )
+        await orchestrator.run()
 
     async def on_shutdown(self) -> None:
+        """
+        Stop the intake, drain the pending notifications, then release the rest.
+
+        What could not be sent within SHUTDOWN_TIMEOUT is pushed to a Redis
+        list and replayed by the next process, Redis is closed last.
+        """
+        deadline = time.monotonic() + self.config.misc.shutdown_timeout
+
+        # no new transactions, the ones waiting for enrichment still go out
+        for task in (self.consumer_task, self.replay_task):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if self.pubsub:
+            await self.pubsub.unsubscribe()
+        if self.enrich_tasks:
+            await asyncio.wait(
+                self.enrich_tasks, timeout=max(deadline - time.monotonic(), 0)
+            )
+
+        unsent = broadcaster.stop_broadcasts()
+        if self.notifier:
+            unsent += await self.notifier.drain(max(deadline - time.monotonic(), 0))
+        if unsent:
+            await self.hand_off(unsent)
+
+        await self.history.stop()
+        if self.activity:
+            await self.activity.stop()
+        if self.enricher:
+            await self.enricher.close()
+        await stats_sampler.stop()
+        await live_dashboard.stop()
+        watchlist.shutdown_executor()
+        if self.runner:
+            await self.runner.cleanup()
         if self.bot:
             await self.bot.session.close()
-        if self.redis:
-            await self.redis.close()
         if self.pubsub:
-            await self.pubsub.unsubscribe()
+            await self.pubsub.aclose()
+        if self.redis:
+            await self.redis.aclose()
+
+    async def hand_off(self, notifications: List[Notification]) -> None:
+        try:
+            await handoff.save(self.redis, notifications)
+        except Exception as e:
+            self.logger.error(
+                f"Lost {len(notifications)} notifications on shutdown: {e}"
+            )
+        else:
+            self.logger.info(f"Handed off {len(notifications)} unsent notifications")
 
     def setup_logging(self) -> None:
-        bl.basic_colorized_config(level=logging.INFO)
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s",
+        self.log_listener = log_setup.setup_logging(
+            level=logging.INFO, json_output=self.config.misc.log_json
         )
         self.logger.info("Starting bot")
 
     async def start(self) -> None:
         try:
             self.setup_logging()
+            self.loop_monitor.start()
             await self.setup_redis()
             await self.setup_bot()
             await self.setup_webhook()
-            await self.on_startup()
-
-            asyncio.create_task(self.process_transaction_updates())
 
             # graceful shutdown
             for sig in (signal.SIGTERM, signal.SIGINT):
@@ -121,10 +276,7 @@ class TgBot:
                     sig, lambda s=sig: asyncio.create_task(self.shutdown(s))
                 )
 
-            runner = web.AppRunner(self.app)
-            await runner.setup()
-            site = web.TCPSite(runner, "0.0.0.0", 80)
-            await site.start()
+            await self.on_startup()
 
             await asyncio.Event().wait()
 
@@ -134,6 +286,9 @@ class TgBot:
 
     async def shutdown(self, signal: Optional[signal.Signals] = None) -> None:
         self.logger.info(f"Received exit signal {signal.name if signal else 'Unknown'}")
+        if self.stopping:
+            return
+        self.stopping = True
         await self.on_shutdown()
         tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
         [task.cancel() for task in tasks]
@@ -145,37 +300,82 @@ class TgBot:
         while True:
             try:
                 message = await self.pubsub.get_message(timeout=1)
+                self.consumer_heartbeat = time.monotonic()
                 if not message or message["type"] != "message":
                     continue
 
-                data = json.loads(message["data"])
+                received_at = time.time()
+                self.last_message_at = received_at
+                PUBSUB_MESSAGES.labels("solana_transactions").inc()
 
-                text = f"transaction for the address: {data['address']}"
-
-                for chat_id in data["chat_ids"]:
-                    try:
-                        await self.bot.send_message(
-                            chat_id=chat_id,
-                            text=text,
-                            disable_web_page_preview=True,
-                        )
-                    except Exception as e:
-                        self.logger.error(f"Error sending notification: {e}")
+                start = time.perf_counter()
+                data = json.loads(message["data"])
+                trace = Trace.from_payload(data, received_at)
+                trace.span("decode", time.perf_counter() - start)
+
+                if self.enricher:
+                    # enrichment waits for a batch, the consumer must not
+                    await self.enrich_slots.acquire()
+                    task = asyncio.create_task(
+                        self.enrich_and_dispatch(data, trace, received_at)
+                    )
+                    self.enrich_tasks.add(task)
+                    task.add_done_callback(self.enrich_tasks.discard)
+                else:
+                    await self.dispatch_transaction(data, trace, received_at)
 
             except Exception as e:
                 self.logger.error(f"Error processing transaction: {e}")
 
-            await asyncio.sleep(0.1)
+    async def enrich_and_dispatch(
+        self, data: dict, trace: Trace, received_at: float
+    ) -> None:
+        try:
+            start = time.perf_counter()
+            data = await self.enricher.enrich(data)
+            trace.span("enrich", time.perf_counter() - start)
+
+            await self.dispatch_transaction(data, trace, received_at)
+        except Exception as e:
+            self.logger.error(f"Error processing transaction: {e}")
+        finally:
+            self.enrich_slots.release()
+
+    async def dispatch_transaction(
+        self, data: dict, trace: Trace, received_at: float
+    ) -> None:
+        start = time.perf_counter()
+        text = transaction_msg(data)
+        chat_ids = filter_registry.recipients(data, data["chat_ids"])
+        # chats in the live mode get their dashboard edited instead
+        chat_ids = live_dashboard.split(data, chat_ids)
+        notifications = [Notification(chat_id, text, trace) for chat_id in chat_ids]
+        trace.span("fanout", time.perf_counter() - start)
+
+        for notification in notifications:
+            await self.notifier.submit(notification)
+            # a full queue slows the consumer down, it is not stuck
+            self.consumer_heartbeat = time.monotonic()
+
+        self.history.add(data, received_at)
+        self.activity.record(data["address"], data.get("amount") or 0.0)
 
 
 def main():
     config = load_config(".env")
+    if config.misc.use_uvloop:
+        install_uvloop()
+
     bot = TgBot(config)
 
     try:
         asyncio.run(bot.start())
     except (KeyboardInterrupt, SystemExit):
         logging.error("Bot stopped")
+    finally:
+        if bot.log_listener:
+            log_setup.EventAggregator.flush_all()
+            bot.log_listener.stop()
 
 
 if __name__ == "__main__":
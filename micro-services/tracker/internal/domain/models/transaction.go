@@ -12,3 +12,13 @@ type Transaction struct {
     Amount     float64   `json:"amount,omitempty"`
     SlotNumber uint64    `json:"slot_number"`
 }
+
+// TransactionNotification is the payload published to the transactions channel.
+// TraceID and PublishedAt let the bot measure the latency of every hop.
+type TransactionNotification struct {
+    *Transaction
+    Address     string    `json:"address"`
+    ChatIDs     []int64   `json:"chat_ids"`
+    TraceID     string    `json:"trace_id"`
+    PublishedAt time.Time `json:"published_at"`
+}
@@ -10,6 +10,7 @@ import (
     "github.com/say8hi/walletTracker/internal/domain/repositories"
     "github.com/say8hi/walletTracker/pkg/logger"
     "github.com/say8hi/walletTracker/pkg/metrics"
+    "github.com/say8hi/walletTracker/pkg/tracing"
 )
 
 type WalletManager struct {
@@ -159,12 +160,12 @@ func (wm *WalletManager) handleWalletTransactions(ctx context.Context, address s
             }
             wm.mu.RUnlock()
 
-            notification := struct {
-                *models.Transaction
-                ChatIDs []int64 `json:"chat_ids"`
-            }{
+            notification := models.TransactionNotification{
                 Transaction: tx,
-                ChatIDs:    chatIDs,
+                Address:     address,
+                ChatIDs:     chatIDs,
+                TraceID:     tracing.NewTraceID(),
+                PublishedAt: time.Now().UTC(),
             }
 
             if err := wm.publisher.PublishTransaction(ctx, notification); err != nil {
@@ -0,0 +1,15 @@
+package tracing
+
+import (
+    "crypto/rand"
+    "encoding/hex"
+)
+
+// NewTraceID returns a random 128-bit trace id in hex
+func NewTraceID() string {
+    buf := make([]byte, 16)
+    if _, err := rand.Read(buf); err != nil {
+        return ""
+    }
+    return hex.EncodeToString(buf)
+}
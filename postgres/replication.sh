@@ -0,0 +1,5 @@
+#!/bin/bash
+# Runs once on an empty data directory, lets tracker_db_replica stream from tracker_db.
+# An existing database needs the same line in pg_hba.conf and a reload.
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
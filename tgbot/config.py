@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 from environs import Env
 
@@ -16,12 +16,67 @@ class TgBot:
         return TgBot(token=token, admin_ids=admin_ids)
 
 
+@dataclass
+class TelegramSession:
+    # the Bot API server, tracker_nginx or the local server directly
+    api_url: str = "http://tracker_nginx:80"
+    # files of the local server are served by nginx from its volume
+    file_url: str = "http://tracker_nginx:80"
+    # connect over this unix socket instead of TCP, api_url only sets the Host
+    unix_socket: Optional[str] = None
+    connections: int = 100
+    # 0 is unlimited
+    connections_per_host: int = 0
+    keepalive_timeout: float = 30.0
+    dns_ttl: int = 300
+
+    @staticmethod
+    def from_env(env: Env):
+        api_url = env.str("TELEGRAM_API_URL", "http://tracker_nginx:80")
+        file_url = env.str("TELEGRAM_FILE_URL", "http://tracker_nginx:80")
+        unix_socket = env.str("TELEGRAM_API_SOCKET", None) or None
+        connections = env.int("TELEGRAM_CONNECTIONS", 100)
+        connections_per_host = env.int("TELEGRAM_CONNECTIONS_PER_HOST", 0)
+        keepalive_timeout = env.float("TELEGRAM_KEEPALIVE_TIMEOUT", 30.0)
+        dns_ttl = env.int("TELEGRAM_DNS_TTL", 300)
+
+        return TelegramSession(
+            api_url=api_url,
+            file_url=file_url,
+            unix_socket=unix_socket,
+            connections=connections,
+            connections_per_host=connections_per_host,
+            keepalive_timeout=keepalive_timeout,
+            dns_ttl=dns_ttl,
+        )
+
+
 @dataclass
 class Postgres:
     db_name: str
     db_user: str
     db_pass: str
     db_host: str
+    db_port: int = 5432
+    # read replicas as host or host:port, reads are spread over them
+    replica_hosts: List[str] = field(default_factory=list)
+    # seconds the reads of a user stay on the primary after a write of theirs
+    sticky_seconds: float = 5.0
+    # seconds a failed replica is skipped before it is tried again
+    replica_retry: float = 30.0
+
+    def url(self, host: Optional[str] = None) -> str:
+        host = host or f"{self.db_host}:{self.db_port}"
+        if ":" not in host:
+            host = f"{host}:{self.db_port}"
+        return (
+            f"postgresql+asyncpg://{self.db_user}:{self.db_pass}"
+            f"@{host}/{self.db_name}"
+        )
+
+    @property
+    def replica_urls(self) -> List[str]:
+        return [self.url(host) for host in self.replica_hosts]
 
     @staticmethod
     def from_env(env: Env):
@@ -29,8 +84,19 @@ class Postgres:
         db_user = env.str("POSTGRES_USER")
         db_pass = env.str("POSTGRES_PASSWORD")
         db_host = env.str("POSTGRES_HOST")
+        db_port = env.int("POSTGRES_PORT", 5432)
+        replica_hosts = env.list("POSTGRES_REPLICA_HOSTS", [])
+        sticky_seconds = env.float("POSTGRES_STICKY_SECONDS", 5.0)
+        replica_retry = env.float("POSTGRES_REPLICA_RETRY", 30.0)
         return Postgres(
-            db_name=db_name, db_user=db_user, db_pass=db_pass, db_host=db_host
+            db_name=db_name,
+            db_user=db_user,
+            db_pass=db_pass,
+            db_host=db_host,
+            db_port=db_port,
+            replica_hosts=replica_hosts,
+            sticky_seconds=sticky_seconds,
+            replica_retry=replica_retry,
         )
 
 
@@ -65,22 +131,126 @@ class Redis:
         )
 
 
+@dataclass
+class History:
+    enabled: bool = True
+    # a buffered batch is written once it has batch_size rows or is flush_ms old
+    batch_size: int = 500
+    flush_ms: int = 1000
+    retention_days: int = 30
+
+    @staticmethod
+    def from_env(env: Env):
+        enabled = env.bool("HISTORY_ENABLED", True)
+        batch_size = env.int("HISTORY_BATCH_SIZE", 500)
+        flush_ms = env.int("HISTORY_FLUSH_MS", 1000)
+        retention_days = env.int("HISTORY_RETENTION_DAYS", 30)
+
+        return History(
+            enabled=enabled,
+            batch_size=batch_size,
+            flush_ms=flush_ms,
+            retention_days=retention_days,
+        )
+
+
+@dataclass
+class Solana:
+    http_url: str
+    commitment: str = "confirmed"
+    enrichment_enabled: bool = False
+    # signatures are collected for this long and resolved in one batch
+    enrichment_window_ms: int = 50
+    enrichment_batch_size: int = 100
+    # seconds a notification waits for its transaction before it is sent as is
+    enrichment_timeout: float = 2.0
+
+    @staticmethod
+    def from_env(env: Env):
+        http_url = env.str("SOLANA_HTTP_URL", "https://api.mainnet-beta.solana.com")
+        commitment = env.str("SOLANA_COMMITMENT", "confirmed")
+        enrichment_enabled = env.bool("ENRICHMENT_ENABLED", False)
+        enrichment_window_ms = env.int("ENRICHMENT_WINDOW_MS", 50)
+        enrichment_batch_size = env.int("ENRICHMENT_BATCH_SIZE", 100)
+        enrichment_timeout = env.float("ENRICHMENT_TIMEOUT", 2.0)
+
+        return Solana(
+            http_url=http_url,
+            commitment=commitment,
+            enrichment_enabled=enrichment_enabled,
+            enrichment_window_ms=enrichment_window_ms,
+            enrichment_batch_size=enrichment_batch_size,
+            enrichment_timeout=enrichment_timeout,
+        )
+
+
+@dataclass
+class Health:
+    # liveness, seconds the pubsub consumer may go without polling
+    consumer_stall: float = 30.0
+    # readiness thresholds, a message age of 0 disables that check
+    max_message_age: float = 0.0
+    max_queue_depth: int = 5000
+    max_loop_lag: float = 1.0
+    # seconds for the DB and Redis probes of a readiness request
+    probe_timeout: float = 2.0
+
+    @staticmethod
+    def from_env(env: Env):
+        consumer_stall = env.float("HEALTH_CONSUMER_STALL", 30.0)
+        max_message_age = env.float("HEALTH_MAX_MESSAGE_AGE", 0.0)
+        max_queue_depth = env.int("HEALTH_MAX_QUEUE_DEPTH", 5000)
+        max_loop_lag = env.float("HEALTH_MAX_LOOP_LAG", 1.0)
+        probe_timeout = env.float("HEALTH_PROBE_TIMEOUT", 2.0)
+
+        return Health(
+            consumer_stall=consumer_stall,
+            max_message_age=max_message_age,
+            max_queue_depth=max_queue_depth,
+            max_loop_lag=max_loop_lag,
+            probe_timeout=probe_timeout,
+        )
+
+
 @dataclass
 class Misc:
     dev: Optional[bool]
+    use_uvloop: bool = False
+    loop_lag_threshold: float = 0.25
+    log_json: bool = False
+    # seconds a shutdown keeps sending before the rest is handed off via Redis
+    shutdown_timeout: float = 20.0
+    # seconds between two edits of a chat's live dashboard message
+    live_refresh_interval: float = 5.0
 
     @staticmethod
     def from_env(env: Env):
         dev = env.str("IN_DEVELOPMENT")
+        use_uvloop = env.bool("USE_UVLOOP", False)
+        loop_lag_threshold = env.float("LOOP_LAG_THRESHOLD", 0.25)
+        log_json = env.bool("LOG_JSON", False)
+        shutdown_timeout = env.float("SHUTDOWN_TIMEOUT", 20.0)
+        live_refresh_interval = env.float("LIVE_REFRESH_INTERVAL", 5.0)
 
-        return Misc(dev=dev)
+        return Misc(
+            dev=dev,
+            use_uvloop=use_uvloop,
+            loop_lag_threshold=loop_lag_threshold,
+            log_json=log_json,
+            shutdown_timeout=shutdown_timeout,
+            live_refresh_interval=live_refresh_interval,
+        )
 
 
 @dataclass
 class Config:
     tg_bot: TgBot
+    telegram_session: TelegramSession
     postgres: Postgres
     redis: Redis
+    history: History
+    solana: Solana
+    health: Health
     misc: Misc
 
 
@@ -90,7 +260,11 @@ def load_config(path: Optional[str] = None) -> Config:
 
     return Config(
         tg_bot=TgBot.from_env(env),
+        telegram_session=TelegramSession.from_env(env),
         postgres=Postgres.from_env(env),
         redis=Redis.from_env(env),
+        history=History.from_env(env),
+        solana=Solana.from_env(env),
+        health=Health.from_env(env),
         misc=Misc.from_env(env),
     )
@@ -1,5 +1,8 @@
 from sqlalchemy.orm import DeclarativeBase
 
+# tables whose DDL is managed in code, e.g. partitioned tables alembic can't model
+UNMANAGED_TABLE_PREFIXES = ("transactions",)
+
 
 class Base(DeclarativeBase):
 
@@ -13,3 +16,10 @@ class Base(DeclarativeBase):
                 cols.append(f"{col}={getattr(self, col)}")
 
         return f"<{self.__class__.__name__} {', '.join(cols)}>"
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """Alembic autogenerate filter, keeps the unmanaged tables out of migrations"""
+    if type_ == "table" and name.startswith(UNMANAGED_TABLE_PREFIXES):
+        return False
+    return True
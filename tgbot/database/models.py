@@ -1,6 +1,15 @@
 import datetime
 from typing import Annotated
-from sqlalchemy import BigInteger, ForeignKey, text
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    ForeignKey,
+    Index,
+    LargeBinary,
+    SmallInteger,
+    Text,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .database import Base
 
@@ -18,6 +27,13 @@ class User(Base):
     balance: Mapped[float] = mapped_column(default=0)
     registered_at: Mapped[created_at]
 
+    # "messages" or "live", see tgbot.services.live_dashboard
+    notify_mode: Mapped[str] = mapped_column(
+        default="messages", server_default="messages"
+    )
+    # the pinned message of the live mode
+    live_message_id: Mapped[int | None] = mapped_column(BigInteger)
+
     addresses: Mapped[list["Address"]] = relationship(
         back_populates="user",
         primaryjoin="User.id == Address.user_id",
@@ -27,6 +43,12 @@ class User(Base):
 
 class Address(Base):
     __tablename__ = "addresses"
+    __table_args__ = (
+        # keyset pagination of a user's addresses
+        Index("ix_addresses_user_id_id", "user_id", "id"),
+        # subscribers of an address, for reloading its filters
+        Index("ix_addresses_sol_address", "sol_address"),
+    )
 
     id: Mapped[intpk]
     user_id: Mapped[int] = mapped_column(
@@ -37,6 +59,41 @@ class Address(Base):
     active: Mapped[bool]
     created_at: Mapped[created_at]
 
+    # notification filters, see tgbot.services.filters
+    min_amount: Mapped[float] = mapped_column(default=0, server_default="0")
+    # bitmask of DIRECTION_IN and DIRECTION_OUT
+    directions: Mapped[int] = mapped_column(SmallInteger, default=3, server_default="3")
+    # UTC hours, quiet_from <= hour < quiet_to, may wrap over midnight
+    quiet_from: Mapped[int | None] = mapped_column(SmallInteger)
+    quiet_to: Mapped[int | None] = mapped_column(SmallInteger)
+
     user: Mapped["User"] = relationship(
         back_populates="addresses",
     )
+
+
+class Line(Base):
+    __tablename__ = "lines"
+    __table_args__ = (
+        # lets `line LIKE 'prefix%'` use an index scan regardless of collation
+        Index(
+            "ix_lines_line_prefix", "line", postgresql_ops={"line": "text_pattern_ops"}
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    line: Mapped[str] = mapped_column(Text)
+    # md5 of the line, the unique index is what bulk inserts conflict on
+    line_hash: Mapped[bytes] = mapped_column(LargeBinary(16), unique=True)
+    created_at: Mapped[created_at]
+
+
+class WalletActivityDaily(Base):
+    """Per-wallet daily totals, rolled up from the hourly Redis buckets"""
+
+    __tablename__ = "wallet_activity_daily"
+
+    address: Mapped[str] = mapped_column(primary_key=True)
+    day: Mapped[datetime.date] = mapped_column(Date, primary_key=True)
+    tx_count: Mapped[int] = mapped_column(BigInteger, default=0)
+    volume: Mapped[float] = mapped_column(default=0)
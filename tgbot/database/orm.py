@@ -1,18 +1,54 @@
-from typing import Generic, List, Type, TypeVar
-from sqlalchemy import and_, desc, select
-from sqlalchemy.orm import joinedload, sessionmaker
+import asyncio
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from hashlib import md5
+from itertools import islice
+from typing import (
+    AsyncIterator,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
+from aiogram import exceptions
+from aiogram.types import Message
+from sqlalchemy import Row, and_, desc, func, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import NoResultFound
 from tgbot.database.database import Base
+from tgbot.database.routing import ReadRouter
+from tgbot.messages.texts import result_msg
 
-from .models import Address, User
+from .models import Address, Line, User, WalletActivityDaily
 
 T = TypeVar("T", bound=Base)
 
 
 class CRUDBase(Generic[T]):
-    def __init__(self, model: Type[T], session_factory: sessionmaker):
+    # column holding the id of the user a row belongs to, keeps their reads
+    # on the primary for a while after they changed it
+    owner_field = "user_id"
+
+    def __init__(
+        self,
+        model: Type[T],
+        session_factory: sessionmaker,
+        router: Optional[ReadRouter] = None,
+    ):
         self.model = model
         self.session_factory = session_factory
+        self.router = router or ReadRouter(session_factory)
+
+    def _owner(self, values: dict) -> Optional[int]:
+        owner = values.get(self.owner_field)
+        return owner if isinstance(owner, int) else None
 
     async def create(self, **kwargs) -> T:
         async with self.session_factory() as session:
@@ -20,10 +56,11 @@ class CRUDBase(Generic[T]):
             session.add(obj)
             await session.commit()
             await session.refresh(obj)
-            return obj
+        self.router.mark_write(self._owner(kwargs))
+        return obj
 
     async def get(self, id: int) -> T:
-        async with self.session_factory() as session:
+        async def run(session):
             query = select(self.model).filter_by(id=id)
             result = await session.execute(query)
             try:
@@ -31,21 +68,24 @@ class CRUDBase(Generic[T]):
             except NoResultFound:
                 return None
 
+        return await self.router.read(run)
+
     async def get_all(self, **kwargs) -> List[T]:
-        async with self.session_factory() as session:
-            filters = []
-            for key, value in kwargs.items():
-                if isinstance(value, (tuple, list)):
-                    filters.append(getattr(self.model, key).in_(value))
-                else:
-                    filters.append(getattr(self.model, key) == value)
+        filters = []
+        for key, value in kwargs.items():
+            if isinstance(value, (tuple, list)):
+                filters.append(getattr(self.model, key).in_(value))
+            else:
+                filters.append(getattr(self.model, key) == value)
 
-            query = (
-                select(self.model).filter(and_(*filters)).order_by(desc(self.model.id))
-            )
+        query = select(self.model).filter(and_(*filters)).order_by(desc(self.model.id))
+
+        async def run(session):
             result = await session.execute(query)
             return result.scalars().all()
 
+        return await self.router.read(run, self._owner(kwargs))
+
     async def update(self, id: int, **kwargs) -> T | None:
         async with self.session_factory() as session:
             query = select(self.model).filter_by(id=id)
@@ -57,9 +97,10 @@ class CRUDBase(Generic[T]):
 
                 await session.commit()
                 await session.refresh(obj)
-                return obj
             except NoResultFound:
                 return None
+        self.router.mark_write(getattr(obj, self.owner_field, None))
+        return obj
 
     async def delete(self, id: int) -> bool:
         async with self.session_factory() as session:
@@ -69,47 +110,556 @@ class CRUDBase(Generic[T]):
                 obj = result.scalars().one()
                 await session.delete(obj)
                 await session.commit()
-                return True
             except NoResultFound:
                 return False
+        self.router.mark_write(getattr(obj, self.owner_field, None))
+        return True
 
     async def count(self, **kwargs) -> int:
-        async with self.session_factory() as session:
-            query = select(self.model).filter_by(**kwargs)
+        query = select(func.count()).select_from(self.model).filter_by(**kwargs)
+
+        async def run(session):
             result = await session.execute(query)
-            return len(result.scalars().all())
+            return result.scalar_one()
+
+        return await self.router.read(run, self._owner(kwargs))
 
 
 class UsersRepo(CRUDBase[User]):
-    def __init__(self, session):
-        super().__init__(User, session)
+    owner_field = "id"
+
+    def __init__(self, session, router: Optional[ReadRouter] = None):
+        super().__init__(User, session, router)
 
     async def get(self, id: int) -> User:
-        async with self.session_factory() as session:
-            query = (
-                select(self.model).filter_by(id=id).options(joinedload(User.addresses))
-            )
+        """User without the addresses, page them with AddressesRepo.get_page"""
+
+        async def run(session):
+            query = select(self.model).filter_by(id=id)
             result = await session.execute(query)
-            unique_result = result.unique()
 
             try:
-                return unique_result.scalars().one()
+                return result.scalars().one()
             except NoResultFound:
                 return None
 
+        return await self.router.read(run, id)
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+# encoded lines longer than this would not fit into a btree index entry
+MAX_LINE_BYTES = 1024
+
+
+def _hash_lines(lines: List[str]) -> List[Tuple[str, bytes]]:
+    records = []
+    for line in lines:
+        encoded = line.encode()
+        if len(encoded) <= MAX_LINE_BYTES:
+            records.append((line, md5(encoded).digest()))
+    return records
+
+
+class LinesRepo(CRUDBase[Line]):
+    # rows per COPY + INSERT round, also the progress granularity
+    batch_size = 50000
+    # seconds between progress message edits
+    progress_interval = 3
+
+    def __init__(self, session):
+        super().__init__(Line, session)
+
+    async def insert_lines_check_existence(
+        self,
+        lines: Iterable[str],
+        msg: Message,
+        lang: str,
+        all_len: int,
+        dubls: int,
+    ) -> Tuple[int, int, int]:
+        """
+        Bulk insert unique lines, returns (added, already existing, too long).
+
+        Every batch is streamed into a temp staging table with COPY and moved
+        into `lines` with one set-based INSERT ... ON CONFLICT on the hash
+        index, so the existence check never goes row by row. Lines over
+        MAX_LINE_BYTES are skipped and counted separately.
+        """
+        added = exists = skipped = 0
+        last_report = time.monotonic()
+
+        async with self.session_factory() as session:
+            connection = await session.connection()
+            raw_connection = await connection.get_raw_connection()
+            driver = raw_connection.driver_connection
+
+            await driver.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS lines_staging "
+                "(line text NOT NULL, line_hash bytea NOT NULL)"
+            )
+
+            for batch in batched(lines, self.batch_size):
+                records = await asyncio.to_thread(_hash_lines, batch)
+                async with driver.transaction():
+                    await driver.copy_records_to_table(
+                        "lines_staging",
+                        records=records,
+                        columns=("line", "line_hash"),
+                    )
+                    status = await driver.execute(
+                        "INSERT INTO lines (line, line_hash) "
+                        "SELECT line, line_hash FROM lines_staging "
+                        "ON CONFLICT (line_hash) DO NOTHING"
+                    )
+                    await driver.execute("TRUNCATE lines_staging")
+
+                # status is "INSERT 0 <rows>"
+                batch_added = int(status.split()[-1])
+                added += batch_added
+                exists += len(records) - batch_added
+                skipped += len(batch) - len(records)
+
+                if time.monotonic() - last_report >= self.progress_interval:
+                    last_report = time.monotonic()
+                    await self._report(
+                        msg, all_len, added, dubls, exists, skipped, lang
+                    )
+
+        await self._report(msg, all_len, added, dubls, exists, skipped, lang)
+        return added, exists, skipped
+
+    @staticmethod
+    async def _report(
+        msg: Message,
+        all_len: int,
+        added: int,
+        dubls: int,
+        exists: int,
+        skipped: int,
+        lang: str,
+    ) -> None:
+        try:
+            await msg.edit_text(
+                result_msg(all_len, added, dubls, exists, lang, skipped)
+            )
+        except exceptions.TelegramBadRequest:
+            # message is not modified or was deleted, progress is best effort
+            pass
+
+    async def get_all_lines_startswith(self, prefix: str) -> List[Line]:
+        async with self.session_factory() as session:
+            query = select(self.model).where(
+                self.model.line.startswith(prefix, autoescape=True)
+            )
+            result = await session.execute(query)
+            return result.scalars().all()
+
+    async def iter_lines_startswith(
+        self, prefix: str, batch_size: int = 5000
+    ) -> AsyncIterator[List[str]]:
+        """Lines starting with prefix in batches, read with a server-side cursor"""
+        async with self.session_factory() as session:
+            query = (
+                select(self.model.line)
+                .where(self.model.line.startswith(prefix, autoescape=True))
+                .execution_options(yield_per=batch_size)
+            )
+            result = await session.stream_scalars(query)
+            async for batch in result.partitions(batch_size):
+                yield batch
+
+    async def del_all(self) -> None:
+        async with self.session_factory() as session:
+            await session.execute(text("TRUNCATE lines"))
+            await session.commit()
+
+
+class AddressesRepo(CRUDBase[Address]):
+    # rows per INSERT statement of bulk_create
+    batch_size = 5000
+
+    def __init__(self, session, router: Optional[ReadRouter] = None):
+        super().__init__(Address, session, router)
+
+    async def get_user_sol_addresses(self, user_id: int) -> Set[str]:
+        async with self.session_factory() as session:
+            query = select(self.model.sol_address).filter_by(user_id=user_id)
+            result = await session.execute(query)
+            return set(result.scalars().all())
+
+    async def get_subscriptions(self, user_ids: Sequence[int]) -> List[Row]:
+        """(user_id, sol_address) rows of the addresses of several users"""
+        async with self.session_factory() as session:
+            query = select(self.model.user_id, self.model.sol_address).where(
+                self.model.user_id.in_(user_ids)
+            )
+            result = await session.execute(query)
+            return list(result.all())
+
+    async def get_owned(self, user_id: int, id: int) -> Address | None:
+        async with self.session_factory() as session:
+            query = select(self.model).filter_by(id=id, user_id=user_id)
+            result = await session.execute(query)
+            return result.scalars().one_or_none()
+
+    async def get_page(
+        self,
+        user_id: int,
+        before_id: int | None = None,
+        after_id: int | None = None,
+        limit: int = 10,
+    ) -> List[Address]:
+        """
+        Keyset page over (user_id, id), newest first.
+
+        With after_id the page is taken from the newer side of the cursor, it
+        is still returned newest first.
+        """
+        async with self.session_factory() as session:
+            query = select(self.model).filter_by(user_id=user_id)
+            if after_id is not None:
+                query = query.where(self.model.id > after_id).order_by(self.model.id)
+            else:
+                if before_id is not None:
+                    query = query.where(self.model.id < before_id)
+                query = query.order_by(desc(self.model.id))
+
+            result = await session.execute(query.limit(limit))
+            addresses = list(result.scalars().all())
+
+        if after_id is not None:
+            addresses.reverse()
+        return addresses
+
+    async def count_user(self, user_id: int) -> Tuple[int, int]:
+        """Total and active addresses of a user"""
+        async with self.session_factory() as session:
+            query = select(func.count(), func.count().filter(self.model.active)).filter(
+                self.model.user_id == user_id
+            )
+            result = await session.execute(query)
+            total, active = result.one()
+            return total, active
+
+    async def get_filter_rules(self, sol_address: Optional[str] = None) -> List[Row]:
+        """
+        Active subscriptions with a non default filter, optionally of one address.
+
+        Rows are (sol_address, user_id, min_amount, directions, quiet_from,
+        quiet_to).
+        """
+        async with self.session_factory() as session:
+            query = select(
+                self.model.sol_address,
+                self.model.user_id,
+                self.model.min_amount,
+                self.model.directions,
+                self.model.quiet_from,
+                self.model.quiet_to,
+            ).where(
+                self.model.active,
+                (self.model.min_amount > 0)
+                | (self.model.directions != 3)
+                | self.model.quiet_from.is_not(None),
+            )
+            if sol_address is not None:
+                query = query.where(self.model.sol_address == sol_address)
+
+            result = await session.execute(query)
+            return list(result.all())
+
+    async def bulk_create(
+        self, user_id: int, entries: List[Tuple[str, str]], active: bool = True
+    ) -> int:
+        """Insert (sol_address, name) pairs for a user in batches"""
+        async with self.session_factory() as session:
+            for batch in batched(entries, self.batch_size):
+                await session.execute(
+                    insert(self.model),
+                    [
+                        {
+                            "user_id": user_id,
+                            "sol_address": sol_address,
+                            "name": name,
+                            "active": active,
+                        }
+                        for sol_address, name in batch
+                    ],
+                )
+            await session.commit()
+        self.router.mark_write(user_id)
+        return len(entries)
+
+
+class TransactionsRepo:
+    """
+    Transaction history, a table partitioned by day on received_at.
+
+    Alembic can't model partitioned tables, so the DDL lives here and the
+    table is excluded from autogenerate (see `include_object`). Retention
+    drops whole partitions instead of running DELETEs. Rows outside every
+    daily partition land in the DEFAULT partition, so a COPY never fails
+    when the maintenance falls behind.
+    """
+
+    table = "transactions"
+    columns = (
+        "address",
+        "signature",
+        "slot",
+        "block_time",
+        "from_addr",
+        "to_addr",
+        "amount",
+        "received_at",
+    )
+
+    def __init__(self, session_factory: sessionmaker):
+        self.session_factory = session_factory
+
+    @classmethod
+    def partition_name(cls, day: date) -> str:
+        return f"{cls.table}_p{day:%Y%m%d}"
+
+    @classmethod
+    def default_partition(cls) -> str:
+        return f"{cls.table}_default"
+
+    async def ensure_schema(self) -> None:
+        async with self.session_factory() as session:
+            await session.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                    # identity columns of partitioned tables need Postgres 17
+                    "id bigserial, "
+                    "address text NOT NULL, "
+                    "signature text NOT NULL, "
+                    "slot bigint NOT NULL, "
+                    "block_time timestamptz, "
+                    "from_addr text, "
+                    "to_addr text, "
+                    "amount double precision, "
+                    "received_at timestamptz NOT NULL"
+                    ") PARTITION BY RANGE (received_at)"
+                )
+            )
+            await session.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {self.default_partition()} "
+                    f"PARTITION OF {self.table} DEFAULT"
+                )
+            )
+            # rows arrive in received_at order, a BRIN index stays tiny
+            await session.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{self.table}_received_at "
+                    f"ON {self.table} USING brin (received_at)"
+                )
+            )
+            await session.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{self.table}_address_slot "
+                    f"ON {self.table} (address, slot)"
+                )
+            )
+            await session.commit()
+
+    async def ensure_partitions(self, first_day: date, days: int) -> None:
+        """
+        Create the daily partitions of [first_day, first_day + days).
+
+        A day that already has rows in the DEFAULT partition can't be created
+        with PARTITION OF, so the partition is created empty, the day's rows
+        are moved into it and it is attached, all in one transaction.
+        """
+        default = self.default_partition()
+        async with self.session_factory() as session:
+            for offset in range(days):
+                day = first_day + timedelta(days=offset)
+                name = self.partition_name(day)
+                exists = await session.scalar(
+                    text("SELECT to_regclass(:name)"), {"name": name}
+                )
+                if exists:
+                    continue
+
+                start = datetime.combine(day, dt_time(), timezone.utc)
+                end = start + timedelta(days=1)
+                await session.execute(
+                    text(
+                        f"CREATE TABLE {name} "
+                        f"(LIKE {self.table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                    )
+                )
+                await session.execute(
+                    text(
+                        f"WITH moved AS (DELETE FROM {default} "
+                        "WHERE received_at >= :start AND received_at < :end "
+                        f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+                    ),
+                    {"start": start, "end": end},
+                )
+                await session.execute(
+                    text(
+                        f"ALTER TABLE {self.table} ATTACH PARTITION {name} "
+                        f"FOR VALUES FROM ('{start.isoformat()}') "
+                        f"TO ('{end.isoformat()}')"
+                    )
+                )
+            await session.commit()
+
+    async def drop_partitions_before(self, day: date) -> List[str]:
+        """Drop the daily partitions older than day, returns their names"""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                text(
+                    "SELECT child.relname FROM pg_inherits "
+                    "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                    "WHERE parent.relname = :table"
+                ),
+                {"table": self.table},
+            )
+            oldest = self.partition_name(day)
+            # names sort by date, transactions_pYYYYMMDD
+            expired = sorted(
+                name
+                for name in result.scalars().all()
+                if len(name) == len(oldest) and name < oldest
+            )
+
+            for name in expired:
+                await session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            # rows of days that never got a partition, usually none
+            await session.execute(
+                text(
+                    f"DELETE FROM {self.default_partition()} "
+                    "WHERE received_at < :before"
+                ),
+                {"before": datetime.combine(day, dt_time(), timezone.utc)},
+            )
+            await session.commit()
+        return expired
+
+    async def copy_rows(self, records: Sequence[tuple]) -> None:
+        """COPY rows in the order of `columns` into the partitioned table"""
+        async with self.session_factory() as session:
+            connection = await session.connection()
+            raw_connection = await connection.get_raw_connection()
+            driver = raw_connection.driver_connection
+
+            async with driver.transaction():
+                await driver.copy_records_to_table(
+                    self.table, records=records, columns=self.columns
+                )
+
+    async def get_page(
+        self,
+        address: str,
+        before: Optional[Tuple[int, int]] = None,
+        limit: int = 10,
+    ) -> List[Row]:
+        """Keyset page of an address, newest slot first, before is (slot, id)"""
+        query = (
+            "SELECT id, signature, slot, block_time, from_addr, to_addr, amount "
+            f"FROM {self.table} WHERE address = :address "
+        )
+        params = {"address": address, "limit": limit}
+        if before:
+            query += "AND (slot, id) < (:slot, :id) "
+            params.update(slot=before[0], id=before[1])
+        query += "ORDER BY slot DESC, id DESC LIMIT :limit"
+
+        async with self.session_factory() as session:
+            result = await session.execute(text(query), params)
+            return list(result.all())
+
+    async def get_since(self, addresses: Sequence[str], since: datetime) -> List[Row]:
+        """Rows of the addresses received since the given time, oldest first"""
+        query = text(
+            "SELECT address, signature, from_addr, to_addr, amount, received_at "
+            f"FROM {self.table} "
+            "WHERE received_at >= :since AND address = ANY(:addresses) "
+            "ORDER BY received_at"
+        )
+        async with self.session_factory() as session:
+            result = await session.execute(
+                query, {"since": since, "addresses": list(addresses)}
+            )
+            return list(result.all())
+
+
+class ActivityRepo(CRUDBase[WalletActivityDaily]):
+    def __init__(self, session):
+        super().__init__(WalletActivityDaily, session)
+
+    async def add_daily(self, rows: List[Tuple[date, str, int, float]]) -> None:
+        """Add (day, address, tx_count, volume) rows onto the daily totals"""
+        async with self.session_factory() as session:
+            for batch in batched(rows, 5000):
+                query = pg_insert(self.model).values(
+                    [
+                        {
+                            "day": day,
+                            "address": address,
+                            "tx_count": tx_count,
+                            "volume": volume,
+                        }
+                        for day, address, tx_count, volume in batch
+                    ]
+                )
+                query = query.on_conflict_do_update(
+                    index_elements=[self.model.address, self.model.day],
+                    set_={
+                        "tx_count": self.model.tx_count + query.excluded.tx_count,
+                        "volume": self.model.volume + query.excluded.volume,
+                    },
+                )
+                await session.execute(query)
+            await session.commit()
+
+    async def get_days(self, address: str, days: int) -> List[WalletActivityDaily]:
+        """The last days of an address, newest first"""
+        since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+        async with self.session_factory() as session:
+            query = (
+                select(self.model)
+                .where(self.model.address == address, self.model.day >= since)
+                .order_by(desc(self.model.day))
+            )
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
 
 class AsyncORM:
     session_factory: sessionmaker
+    router: Optional[ReadRouter] = None
 
     # models
     users: UsersRepo
-    addresses: CRUDBase[Address]
+    addresses: AddressesRepo
+    lines: LinesRepo
+    transactions: TransactionsRepo
+    activity: ActivityRepo
 
     @classmethod
     def set_session_factory(cls, session_factory):
         cls.session_factory = session_factory
 
+    @classmethod
+    def set_router(cls, router: ReadRouter):
+        cls.router = router
+
     @classmethod
     def init_models(cls):
-        cls.users = UsersRepo(cls.session_factory)
-        cls.addresses = CRUDBase(Address, cls.session_factory)
+        router = cls.router or ReadRouter(cls.session_factory)
+        cls.users = UsersRepo(cls.session_factory, router)
+        cls.addresses = AddressesRepo(cls.session_factory, router)
+        cls.lines = LinesRepo(cls.session_factory)
+        cls.transactions = TransactionsRepo(cls.session_factory)
+        cls.activity = ActivityRepo(cls.session_factory)
@@ -0,0 +1,128 @@
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+R = TypeVar("R")
+
+# errors of an unreachable or broken replica, the read is repeated on the primary
+REPLICA_ERRORS = (InterfaceError, OperationalError, OSError, TimeoutError)
+# entries of the sticky map before the expired ones are dropped
+STICKY_PRUNE_SIZE = 10_000
+
+logger = logging.getLogger(__name__)
+
+
+def _ignore(label: str) -> None:
+    pass
+
+
+def is_replica_error(error: Exception) -> bool:
+    """
+    A connection level failure of the replica.
+
+    Query errors such as ProgrammingError or IntegrityError would fail on the
+    primary just the same, they don't take the replica out of rotation.
+    """
+    if isinstance(error, REPLICA_ERRORS):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+@dataclass
+class Replica:
+    name: str
+    session_factory: sessionmaker
+    # monotonic time until which the replica is skipped after a failure
+    down_until: float = 0.0
+
+
+class ReadRouter:
+    """
+    Sends repository reads to the read replicas and everything else to the primary.
+
+    Replicas are picked round-robin. A user who wrote something reads from
+    the primary for `sticky_seconds` so they never see a replica that has
+    not caught up with their own change. A replica failing a read is skipped
+    for `retry_after` seconds and the read is repeated on the primary.
+
+    `on_read` gets "replica" or "primary" for every served read,
+    `on_replica_failure` the name of a failed replica.
+    """
+
+    def __init__(
+        self,
+        primary: sessionmaker,
+        replicas: Optional[List[Replica]] = None,
+        sticky_seconds: float = 5.0,
+        retry_after: float = 30.0,
+        on_read: Optional[Callable[[str], None]] = None,
+        on_replica_failure: Optional[Callable[[str], None]] = None,
+    ):
+        self.primary = primary
+        self.replicas = replicas or []
+        self.sticky_seconds = sticky_seconds
+        self.retry_after = retry_after
+        self.on_read = on_read or _ignore
+        self.on_replica_failure = on_replica_failure or _ignore
+        self._next = itertools.cycle(self.replicas)
+        self._written: Dict[int, float] = {}
+
+    def mark_write(self, user_id: Optional[int]) -> None:
+        if not self.replicas or user_id is None:
+            return
+        now = time.monotonic()
+        self._written[user_id] = now + self.sticky_seconds
+        if len(self._written) > STICKY_PRUNE_SIZE:
+            self._written = {
+                key: until for key, until in self._written.items() if until > now
+            }
+
+    def is_sticky(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        until = self._written.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    def pick(self, user_id: Optional[int] = None) -> Optional[Replica]:
+        """The replica for the next read, None when it has to go to the primary"""
+        if not self.replicas or self.is_sticky(user_id):
+            return None
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = next(self._next)
+            if replica.down_until <= now:
+                return replica
+        return None
+
+    async def read(
+        self,
+        run: Callable[[AsyncSession], Awaitable[R]],
+        user_id: Optional[int] = None,
+    ) -> R:
+        replica = self.pick(user_id)
+        if replica is not None:
+            try:
+                async with replica.session_factory() as session:
+                    result = await run(session)
+                self.on_read("replica")
+                return result
+            except Exception as e:
+                if not is_replica_error(e):
+                    raise
+                replica.down_until = time.monotonic() + self.retry_after
+                self.on_replica_failure(replica.name)
+                logger.warning(
+                    f"Replica {replica.name} failed a read, using the primary "
+                    f"for {self.retry_after}s: {type(e).__name__}: {e}"
+                )
+
+        async with self.primary() as session:
+            result = await run(session)
+        self.on_read("primary")
+        return result
@@ -1,9 +1,18 @@
 import asyncio
+from datetime import datetime, timezone
+from typing import Optional
 
-from aiogram import F, Router
-from aiogram.filters import Command
+from aiogram import F, Router, html
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, InaccessibleMessage, Message
+from aiogram.types import (
+    BufferedInputFile,
+    CallbackQuery,
+    InaccessibleMessage,
+    Message,
+)
+from redis.asyncio.client import Redis
 
 from tgbot.database.orm import AsyncORM
 from tgbot.filters.admin import AdminFilter
@@ -11,13 +20,17 @@ from tgbot.keyboards.inline import (
     admin_menu,
     back_admin,
     choose_menu,
+    stats_menu,
 )
 from tgbot.misc.states import (
     BroadcastState,
 )
+from tgbot.services.activity import top_wallets, wallet_summary
 from tgbot.services.broadcaster import broadcast
+from tgbot.services.profiler import MAX_DURATION, Profile, loop_profiler
+from tgbot.services.stats import StatsSnapshot, stats_sampler
 
-admin_router = Router()
+admin_router = Router(name="admin")
 admin_router.message.filter(AdminFilter())
 
 
@@ -39,6 +52,161 @@ async def wipe_all_lines_from_db(message: Message):
     await message.answer("Все строки были успешно удалены.")
 
 
+# ======================================================================================================================
+# Activity
+@admin_router.message(Command("top"))
+async def top_wallets_handler(message: Message, command: CommandObject, redis: Redis):
+    limit = int(command.args) if command.args and command.args.isdigit() else 10
+    wallets = await top_wallets(redis, min(limit, 50))
+    if not wallets:
+        await message.answer("За последние 24ч активности не было")
+        return
+
+    lines = [
+        f"{place}. <code>{address}</code> — {count}"
+        for place, (address, count) in enumerate(wallets, start=1)
+    ]
+    await message.answer("<b>Самые активные кошельки за 24ч</b>\n\n" + "\n".join(lines))
+
+
+@admin_router.message(Command("wallet"))
+async def wallet_summary_handler(
+    message: Message, command: CommandObject, redis: Redis
+):
+    address = (command.args or "").strip()
+    if not address:
+        await message.answer("Использование: <code>/wallet адрес</code>")
+        return
+
+    summary = await wallet_summary(redis, address)
+    days = await AsyncORM.activity.get_days(address, 7)
+
+    rank = (
+        f"{summary.rank + 1} из {summary.wallets}" if summary.rank is not None else "-"
+    )
+    last_seen = f"{summary.last_seen:%Y-%m-%d %H:%M} UTC" if summary.last_seen else "-"
+    hourly = " ".join(str(count) for count in summary.hourly)
+    text = (
+        f"<b>Кошелек</b> <code>{address}</code>\n"
+        f"├─Транзакций за 24ч: <code>{summary.tx_24h}</code>\n"
+        f"├─Объем за 24ч: <code>{summary.volume_24h:g}</code> SOL\n"
+        f"├─Место в топе: <code>{rank}</code>\n"
+        f"├─Последняя активность: <code>{last_seen}</code>\n"
+        f"└─По часам: <code>{hourly}</code>"
+    )
+    if days:
+        text += "\n\n<b>По дням</b>\n" + "\n".join(
+            f"{day.day:%Y-%m-%d}: <code>{day.tx_count}</code> / "
+            f"<code>{day.volume:g}</code> SOL"
+            for day in days
+        )
+    await message.answer(text)
+
+
+# ======================================================================================================================
+# Stats
+def _ms(seconds: Optional[float]) -> str:
+    return f"{seconds * 1000:.1f} мс" if seconds is not None else "-"
+
+
+def _percent(ratio: Optional[float]) -> str:
+    return f"{ratio:.0%}" if ratio is not None else "-"
+
+
+def stats_text(stats: StatsSnapshot) -> str:
+    db_pool = f"{stats.db_pool[0]} из {stats.db_pool[1]}" if stats.db_pool else "-"
+    return (
+        f"<b>Состояние бота</b> за {stats.window:.0f}с\n\n"
+        f"<b>Уведомления</b>\n"
+        f"├─Входящие: <code>{stats.intake_per_s:.1f}/с</code>\n"
+        f"├─Очередь: <code>{stats.queue_depth}</code>\n"
+        f"├─Отправка: <code>{stats.sent_per_s:.1f}/с</code>\n"
+        f"├─429: <code>{stats.throttled}</code>, ошибки: <code>{stats.failed}</code>\n"
+        f"└─Задержка p50/p99: <code>{_ms(stats.send_p50)} / {_ms(stats.send_p99)}</code>\n\n"
+        f"<b>Runtime</b>\n"
+        f"├─Лаг event loop p50/p99: <code>{_ms(stats.loop_lag_p50)} / {_ms(stats.loop_lag_p99)}</code>\n"
+        f"├─Пул БД: <code>{db_pool}</code>\n"
+        f"└─Redis RTT: <code>{_ms(stats.redis_rtt)}</code>\n\n"
+        f"<b>Кэши</b>\n"
+        f"├─Транзакции: <code>{_percent(stats.enrichment_hit_rate)}</code>\n"
+        f"├─Токены: <code>{_percent(stats.token_hit_rate)}</code>\n"
+        f"└─Страницы адресов: <code>{_percent(stats.page_hit_rate)}</code>\n\n"
+        f"<i>Обновлено {datetime.now(timezone.utc):%H:%M:%S} UTC</i>"
+    )
+
+
+@admin_router.message(Command("stats"))
+async def stats_handler(message: Message):
+    await message.answer(stats_text(stats_sampler.snapshot()), reply_markup=stats_menu)
+
+
+@admin_router.callback_query(F.data == "stats", AdminFilter())
+async def stats_refresh(call: CallbackQuery):
+    if not call.message or isinstance(call.message, InaccessibleMessage):
+        await call.answer("Произошла ошибка!")
+        return
+
+    try:
+        await call.message.edit_text(
+            stats_text(stats_sampler.snapshot()), reply_markup=stats_menu
+        )
+    except TelegramBadRequest:
+        # refreshed twice within a second, the text did not change
+        pass
+    await call.answer()
+
+
+# ======================================================================================================================
+# Profiler
+def _short(name: str, width: int = 60) -> str:
+    return html.quote(name if len(name) <= width else "…" + name[-width + 1 :])
+
+
+def profile_text(profile: Profile, limit: int = 10) -> str:
+    ticks = max(profile.ticks, 1)
+    roots = profile.roots(limit)
+    root_lines = "\n".join(
+        f"{'└' if place == len(roots) else '├'}─<code>{_short(root)}</code> — "
+        f"{count / ticks:.0%}"
+        for place, (root, count) in enumerate(roots, 1)
+    )
+    function_lines = "\n".join(
+        f"{place}. <code>{_short(name)}</code> — "
+        f"{own / ticks:.0%} / {total / ticks:.0%}"
+        for place, (name, own, total) in enumerate(profile.top(limit), 1)
+    )
+    return (
+        f"<b>Профиль</b> за {profile.duration:.0f}с, срезов: <code>{profile.ticks}</code>\n\n"
+        f"<b>Обработчики и задачи</b> (доля времени)\n{root_lines or '-'}\n\n"
+        f"<b>Функции</b> (собственное / общее время)\n{function_lines or '-'}"
+    )
+
+
+@admin_router.message(Command("profile"))
+async def profile_handler(message: Message, command: CommandObject):
+    # imported here, the handlers package imports this module
+    from tgbot.handlers import routers_list
+
+    if loop_profiler.running:
+        await message.answer("Профилирование уже запущено")
+        return
+
+    seconds = int(command.args) if command.args and command.args.isdigit() else 10
+    seconds = max(1, min(seconds, MAX_DURATION))
+    await message.answer(f"Профилирую event loop {seconds}с…")
+
+    profile = await loop_profiler.profile(seconds, routers_list)
+    finished_at = datetime.now(timezone.utc)
+    await message.answer_document(
+        BufferedInputFile(
+            profile.collapsed().encode(),
+            filename=f"profile-{finished_at:%Y%m%d-%H%M%S}.folded",
+        ),
+        caption="Свёрнутые стеки для flamegraph.pl или speedscope",
+    )
+    await message.answer(profile_text(profile))
+
+
 # ======================================================================================================================
 # Broadcast
 @admin_router.callback_query(F.data == "broadcast")
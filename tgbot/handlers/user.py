@@ -1,21 +1,44 @@
-import json
-from aiogram import F, Router
-from aiogram.filters import CommandStart
+import os
+import tempfile
+from typing import Any, Dict, List
+
+from aiogram import F, Router, html
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, InaccessibleMessage, Message
 from redis.asyncio.client import Redis
-from base58 import b58decode
 
-from tgbot.database.models import User
+from tgbot.config import Config
+from tgbot.database.models import Address, User
 from tgbot.database.orm import AsyncORM
 from tgbot.keyboards.inline import (
+    AddressPage,
+    HistoryPage,
     cancel_menu,
+    profile_menu,
     support_menu,
 )
 from tgbot.keyboards.reply import main_menu
 from tgbot.misc.states import AddNewAddress
+from tgbot.services.activity import activity_line
+from tgbot.services.address_pages import page_cache, render_address_page
+from tgbot.services.filters import (
+    DIRECTION_ANY,
+    DIRECTION_IN,
+    DIRECTION_OUT,
+    filter_registry,
+)
+from tgbot.services.history import render_history_page
+from tgbot.services.live_dashboard import NOTIFY_LIVE, live_dashboard
+from tgbot.services.watchlist import (
+    ImportSummary,
+    import_watchlist,
+    parse_watchlist_file_async,
+    parse_watchlist_lines,
+    publish_wallet_commands,
+)
 
-user_router = Router()
+user_router = Router(name="user")
 
 
 @user_router.callback_query(F.data == "cancel")
@@ -48,50 +71,113 @@ async def support_handler(message: Message, user: User):
 @user_router.message(F.text == "➕New address")
 async def add_new_address(message: Message, state: FSMContext):
     msg = await message.answer(
-        "Send me a new addresses",
+        "Send me new addresses, one <code>address name</code> per line,\n"
+        "or a CSV/TXT file with an address and a name in every row",
         reply_markup=cancel_menu(),
     )
     await state.set_state(AddNewAddress.receive_value)
     await state.update_data(edit_msg_id=msg.message_id)
 
 
-@user_router.message(AddNewAddress.receive_value)
-async def add_new_address_receive_value(
-    message: Message, state: FSMContext, redis: Redis
+def import_summary_text(summary: ImportSummary) -> str:
+    text = (
+        "<b>Import finished</b>\n"
+        f"├─Added: <code>{summary.added}</code>\n"
+        f"├─Already tracked: <code>{summary.already_tracked}</code>\n"
+        f"├─Duplicates: <code>{summary.duplicates}</code>\n"
+        f"└─Wrong address format: <code>{summary.invalid}</code>"
+    )
+    if summary.invalid_examples:
+        examples = "\n".join(
+            f"<code>{html.quote(example)}</code>"
+            for example in summary.invalid_examples
+        )
+        text += f"\n\n❗️Rejected, for example:\n{examples}"
+    return text
+
+
+@user_router.message(AddNewAddress.receive_value, F.document)
+async def add_new_address_receive_file(
+    message: Message, state: FSMContext, redis: Redis, config: Config
 ):
-    if not message.text or not message.bot:
+    if not message.bot or not message.from_user:
         return
 
     data = await state.get_data()
     edit_msg_id = data["edit_msg_id"]
 
-    addresses = message.text.split("\n")
-    addresses_dict = {}
-    for address in addresses:
-        sol_address, name = address.split()
-        try:
-            # b58decode(sol_address)
-            if len(sol_address) != 44:
-                raise ValueError
-        except Exception:
-            await message.answer(f"❗️{sol_address}\n└─Wrong address format")
-            continue
+    await message.bot.edit_message_text(
+        chat_id=message.chat.id,
+        message_id=edit_msg_id,
+        text="⏳Importing the file...",
+    )
+
+    path = os.path.join(
+        tempfile.gettempdir(), f"watchlist_{message.document.file_unique_id}"
+    )
+    try:
+        await message.bot.download(message.document, destination=path)
+        parsed = await parse_watchlist_file_async(path)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+    summary = await import_watchlist(
+        message.from_user.id,
+        message.chat.id,
+        parsed,
+        redis,
+        config.redis.redis_cmd_channel,
+    )
+    await state.clear()
+    await message.bot.edit_message_text(
+        chat_id=message.chat.id,
+        message_id=edit_msg_id,
+        text=import_summary_text(summary),
+        reply_markup=cancel_menu("close"),
+    )
 
-        addresses_dict[name] = sol_address
 
-        command = {"action": "add", "address": sol_address, "chat_id": message.chat.id}
+@user_router.message(AddNewAddress.receive_value)
+async def add_new_address_receive_value(
+    message: Message, state: FSMContext, redis: Redis, config: Config
+):
+    if not message.text or not message.bot or not message.from_user:
+        return
 
-        await redis.publish("wallet_commands", json.dumps(command))
+    data = await state.get_data()
+    edit_msg_id = data["edit_msg_id"]
+
+    parsed = parse_watchlist_lines(message.text.split("\n"))
+    summary = await import_watchlist(
+        message.from_user.id,
+        message.chat.id,
+        parsed,
+        redis,
+        config.redis.redis_cmd_channel,
+    )
 
+    await state.clear()
     await message.delete()
     await message.bot.edit_message_text(
         chat_id=message.chat.id,
         message_id=edit_msg_id,
-        text="Successfully added",
+        text=import_summary_text(summary),
         reply_markup=cancel_menu("close"),
     )
 
 
+async def profile_text(user: User) -> str:
+    total, active = await AsyncORM.addresses.count_user(user.id)
+    mode = "live dashboard" if user.notify_mode == NOTIFY_LIVE else "messages"
+    return (
+        f"👤<b>{html.quote(user.username)}</b>\n"
+        f"├─Tracked addresses: <code>{total}</code>\n"
+        f"├─Active: <code>{active}</code>\n"
+        f"└─Notifications: <code>{mode}</code>"
+    )
+
+
 @user_router.callback_query(F.data == "personal_acc")
 @user_router.message(F.text == "👤Profile")
 async def personal_acc_handler(event: Message | CallbackQuery, user: User):
@@ -100,5 +186,217 @@ async def personal_acc_handler(event: Message | CallbackQuery, user: User):
         method_dict[CallbackQuery] = event.message.edit_text
 
     await method_dict[type(event)](
-        "profile",
+        await profile_text(user),
+        reply_markup=profile_menu(user.notify_mode == NOTIFY_LIVE),
+    )
+
+
+@user_router.callback_query(F.data == "live_toggle")
+async def live_toggle_handler(call: CallbackQuery, user: User):
+    if user.notify_mode == NOTIFY_LIVE:
+        await live_dashboard.disable(user.id)
+        answer = "Back to a message per transaction"
+    else:
+        # sends and pins the dashboard message
+        await live_dashboard.enable(user.id)
+        answer = "Transactions now update the pinned dashboard"
+
+    user = await AsyncORM.users.get(user.id)
+    if call.message and not isinstance(call.message, InaccessibleMessage):
+        await call.message.edit_text(
+            await profile_text(user),
+            reply_markup=profile_menu(user.notify_mode == NOTIFY_LIVE),
+        )
+    await call.answer(answer)
+
+
+@user_router.message(F.text == "⚙️Manage addresses")
+async def manage_addresses_handler(message: Message, user: User):
+    page = await render_address_page(user.id)
+    await message.answer(page.text, reply_markup=page.reply_markup)
+
+
+async def show_address_page(
+    call: CallbackQuery, user_id: int, callback_data: AddressPage
+):
+    page = await render_address_page(user_id, callback_data.d, callback_data.c)
+    if call.message and not isinstance(call.message, InaccessibleMessage):
+        if (
+            call.message.html_text != page.text
+            or call.message.reply_markup != page.reply_markup
+        ):
+            await call.message.edit_text(page.text, reply_markup=page.reply_markup)
+
+
+@user_router.callback_query(AddressPage.filter(F.a == "p"))
+async def address_page_handler(
+    call: CallbackQuery, callback_data: AddressPage, user: User
+):
+    await show_address_page(call, user.id, callback_data)
+    await call.answer()
+
+
+@user_router.callback_query(AddressPage.filter(F.a == "i"))
+async def address_info_handler(
+    call: CallbackQuery, callback_data: AddressPage, user: User, redis: Redis
+):
+    address = await AsyncORM.addresses.get_owned(user.id, callback_data.i)
+    if not address:
+        page_cache.invalidate(user.id)
+        await show_address_page(call, user.id, callback_data)
+        await call.answer("Address not found")
+        return
+
+    await call.answer(
+        f"{address.name}\n{address.sol_address}\n"
+        f"{'Active' if address.active else 'Paused'}\n"
+        f"{await activity_line(redis, address.sol_address)}",
+        show_alert=True,
+    )
+
+
+@user_router.callback_query(AddressPage.filter(F.a.in_({"t", "r"})))
+async def address_change_handler(
+    call: CallbackQuery,
+    callback_data: AddressPage,
+    user: User,
+    redis: Redis,
+    config: Config,
+):
+    address = await AsyncORM.addresses.get_owned(user.id, callback_data.i)
+    if not address:
+        answer = "Address not found"
+    elif callback_data.a == "t":
+        await AsyncORM.addresses.update(address.id, active=not address.active)
+        await publish_wallet_commands(
+            redis,
+            config.redis.redis_cmd_channel,
+            "remove" if address.active else "add",
+            [address.sol_address],
+            call.from_user.id,
+        )
+        answer = "Paused" if address.active else "Resumed"
+    else:
+        await AsyncORM.addresses.delete(address.id)
+        if address.active:
+            await publish_wallet_commands(
+                redis,
+                config.redis.redis_cmd_channel,
+                "remove",
+                [address.sol_address],
+                call.from_user.id,
+            )
+        answer = "Removed"
+
+    if address:
+        await filter_registry.reload(address.sol_address)
+    page_cache.invalidate(user.id)
+    await show_address_page(call, user.id, callback_data)
+    await call.answer(answer)
+
+
+@user_router.message(Command("history"))
+async def history_handler(message: Message, command: CommandObject, user: User):
+    sol_address = (command.args or "").strip()
+    if not sol_address:
+        await message.answer("Usage: <code>/history address</code>")
+        return
+
+    addresses = await AsyncORM.addresses.get_all(
+        user_id=user.id, sol_address=sol_address
+    )
+    if not addresses:
+        await message.answer("You don't track this address")
+        return
+
+    text, reply_markup = await render_history_page(addresses[0])
+    await message.answer(text, reply_markup=reply_markup, disable_web_page_preview=True)
+
+
+@user_router.callback_query(HistoryPage.filter())
+async def history_page_handler(
+    call: CallbackQuery, callback_data: HistoryPage, user: User
+):
+    address = await AsyncORM.addresses.get_owned(user.id, callback_data.a)
+    if not address:
+        await call.answer("Address not found")
+        return
+
+    before = (callback_data.s, callback_data.i) if callback_data.i else None
+    text, reply_markup = await render_history_page(address, before)
+    if call.message and not isinstance(call.message, InaccessibleMessage):
+        await call.message.edit_text(
+            text, reply_markup=reply_markup, disable_web_page_preview=True
+        )
+    await call.answer()
+
+
+DIRECTION_NAMES = {DIRECTION_IN: "in", DIRECTION_OUT: "out", DIRECTION_ANY: "any"}
+
+
+def filter_text(address: Address) -> str:
+    quiet = (
+        f"{address.quiet_from:02d}:00-{address.quiet_to:02d}:00 UTC"
+        if address.quiet_from is not None
+        else "off"
+    )
+    return (
+        f"🔔<b>{html.quote(address.name)}</b>\n<code>{address.sol_address}</code>\n"
+        f"├─Minimum amount: <code>{address.min_amount:g}</code> SOL\n"
+        f"├─Direction: <code>{DIRECTION_NAMES[address.directions]}</code>\n"
+        f"└─Quiet hours: <code>{quiet}</code>\n\n"
+        "Change with <code>/filter address min=0.5 dir=in|out|any quiet=22-7|off</code>"
     )
+
+
+def parse_filter_args(args: List[str]) -> Dict[str, Any]:
+    """`min=`, `dir=` and `quiet=` options as Address column values"""
+    values: Dict[str, Any] = {}
+    for arg in args:
+        key, _, value = arg.partition("=")
+        if key == "min":
+            min_amount = float(value)
+            if not 0 <= min_amount < float("inf"):
+                raise ValueError(value)
+            values["min_amount"] = min_amount
+        elif key == "dir":
+            directions = {name: bit for bit, name in DIRECTION_NAMES.items()}
+            values["directions"] = directions[value]
+        elif key == "quiet" and value == "off":
+            values["quiet_from"] = values["quiet_to"] = None
+        elif key == "quiet":
+            quiet_from, quiet_to = (int(hour) % 24 for hour in value.split("-"))
+            if quiet_from == quiet_to:
+                raise ValueError(value)
+            values["quiet_from"], values["quiet_to"] = quiet_from, quiet_to
+        else:
+            raise ValueError(arg)
+    return values
+
+
+@user_router.message(Command("filter"))
+async def filter_handler(message: Message, command: CommandObject, user: User):
+    args = (command.args or "").split()
+    if not args:
+        await message.answer(
+            "Usage: <code>/filter address min=0.5 dir=in|out|any quiet=22-7|off</code>"
+        )
+        return
+
+    addresses = await AsyncORM.addresses.get_all(user_id=user.id, sol_address=args[0])
+    if not addresses:
+        await message.answer("You don't track this address")
+        return
+
+    address = addresses[0]
+    if len(args) > 1:
+        try:
+            values = parse_filter_args(args[1:])
+        except (KeyError, ValueError):
+            await message.answer("❗️Wrong filter, see <code>/filter address</code>")
+            return
+
+        address = await AsyncORM.addresses.update(address.id, **values)
+        await filter_registry.reload(address.sol_address)
+
+    await message.answer(filter_text(address))
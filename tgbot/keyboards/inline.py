@@ -1,6 +1,11 @@
+from typing import List, Optional, Tuple
+
+from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from tgbot.database.models import Address
+
 admin_menu = InlineKeyboardMarkup(
     inline_keyboard=[
         [
@@ -19,6 +24,7 @@ admin_menu = InlineKeyboardMarkup(
             )
         ],
         [InlineKeyboardButton(text="🔎Поиск запроса", callback_data="find_strings")],
+        [InlineKeyboardButton(text="📊Статистика", callback_data="stats")],
         [InlineKeyboardButton(text="✖️Закрыть", callback_data="close")],
     ]
 )
@@ -55,6 +61,14 @@ back_admin = InlineKeyboardMarkup(
 )
 
 
+stats_menu = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="🔄Обновить", callback_data="stats")],
+        [InlineKeyboardButton(text="🔙Назад", callback_data="back_admin")],
+    ]
+)
+
+
 choose_menu = InlineKeyboardMarkup(
     inline_keyboard=[
         [
@@ -63,3 +77,131 @@ choose_menu = InlineKeyboardMarkup(
         [InlineKeyboardButton(text="🔙Назад", callback_data="back_admin")],
     ]
 )
+
+
+class AddressPage(CallbackData, prefix="ap"):
+    """
+    Address browser callback, kept short for the 64 byte limit.
+
+    a - action: p page, i info, t toggle, r remove
+    d - page direction from the cursor: o older, n newer
+    c - keyset cursor, an address id, 0 is the first page
+    i - address id of the action
+    """
+
+    a: str
+    d: str = "o"
+    c: int = 0
+    i: int = 0
+
+
+def profile_menu(live: bool) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="📋My addresses", callback_data=AddressPage(a="p").pack()
+                )
+            ],
+            [
+                InlineKeyboardButton(
+                    text="✉️Messages per transaction" if live else "📊Live dashboard",
+                    callback_data="live_toggle",
+                )
+            ],
+        ]
+    )
+
+
+def address_page_menu(
+    addresses: List[Address],
+    direction: str,
+    cursor: int,
+    has_newer: bool,
+    has_older: bool,
+) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+
+    for address in addresses:
+        builder.row(
+            InlineKeyboardButton(
+                text=f"{'🟢' if address.active else '⚪️'}{address.name}",
+                callback_data=AddressPage(
+                    a="i", d=direction, c=cursor, i=address.id
+                ).pack(),
+            ),
+            InlineKeyboardButton(
+                text="⏸" if address.active else "▶️",
+                callback_data=AddressPage(
+                    a="t", d=direction, c=cursor, i=address.id
+                ).pack(),
+            ),
+            InlineKeyboardButton(
+                text="🗑",
+                callback_data=AddressPage(
+                    a="r", d=direction, c=cursor, i=address.id
+                ).pack(),
+            ),
+        )
+
+    navigation = []
+    if has_newer and addresses:
+        navigation.append(
+            InlineKeyboardButton(
+                text="«",
+                callback_data=AddressPage(a="p", d="n", c=addresses[0].id).pack(),
+            )
+        )
+    if has_older and addresses:
+        navigation.append(
+            InlineKeyboardButton(
+                text="»",
+                callback_data=AddressPage(a="p", d="o", c=addresses[-1].id).pack(),
+            )
+        )
+    if navigation:
+        builder.row(*navigation)
+
+    builder.row(InlineKeyboardButton(text="✖️Close", callback_data="cancel"))
+    return builder.as_markup()
+
+
+class HistoryPage(CallbackData, prefix="hp"):
+    """
+    Transaction history callback.
+
+    a - address id
+    s, i - keyset cursor (slot, row id), 0 is the latest page
+    """
+
+    a: int
+    s: int = 0
+    i: int = 0
+
+
+def history_menu(
+    address_id: int, next_cursor: Optional[Tuple[int, int]], is_first: bool
+) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+
+    navigation = []
+    if not is_first:
+        navigation.append(
+            InlineKeyboardButton(
+                text="⏮Latest", callback_data=HistoryPage(a=address_id).pack()
+            )
+        )
+    if next_cursor:
+        navigation.append(
+            InlineKeyboardButton(
+                text="Older »",
+                callback_data=HistoryPage(
+                    a=address_id, s=next_cursor[0], i=next_cursor[1]
+                ).pack(),
+            )
+        )
+    if navigation:
+        builder.row(*navigation)
+
+    builder.row(InlineKeyboardButton(text="✖️Close", callback_data="cancel"))
+    return builder.as_markup()
@@ -0,0 +1,51 @@
+from aiogram import html
+
+
+def result_msg(
+    all_len: int, added: int, dubls: int, exists: int, lang: str, skipped: int = 0
+) -> str:
+    if lang == "ru":
+        return (
+            "<b>Проверка файла</b>\n"
+            f"├─Всего строк: <code>{all_len}</code>\n"
+            f"├─Дубликатов в файле: <code>{dubls}</code>\n"
+            f"├─Уже в базе: <code>{exists}</code>\n"
+            + (f"├─Слишком длинных: <code>{skipped}</code>\n" if skipped else "")
+            + f"└─Добавлено: <code>{added}</code>"
+        )
+
+    return (
+        "<b>File check</b>\n"
+        f"├─Total lines: <code>{all_len}</code>\n"
+        f"├─Duplicates in file: <code>{dubls}</code>\n"
+        f"├─Already in database: <code>{exists}</code>\n"
+        + (f"├─Too long, skipped: <code>{skipped}</code>\n" if skipped else "")
+        + f"└─Added: <code>{added}</code>"
+    )
+
+
+def transaction_msg(data: dict) -> str:
+    address = data["address"]
+    text = f"transaction for the address: <code>{address}</code>"
+
+    amount = data.get("amount")
+    if amount:
+        if data.get("to_addr") == address:
+            text += f"\n└─Received <b>{amount:g} SOL</b> from <code>{data.get('from_addr')}</code>"
+        elif data.get("from_addr") == address:
+            text += (
+                f"\n└─Sent <b>{amount:g} SOL</b> to <code>{data.get('to_addr')}</code>"
+            )
+        else:
+            text += f"\n└─Amount: <b>{amount:g} SOL</b>"
+
+    token_amount = data.get("token_amount")
+    if token_amount:
+        action = "Received" if token_amount > 0 else "Sent"
+        symbol = html.quote(str(data.get("token_symbol")))
+        text += f"\n└─{action} <b>{abs(token_amount):g} {symbol}</b>"
+
+    signature = data.get("signature")
+    if signature:
+        text += f'\n<a href="https://solscan.io/tx/{signature}">Solscan</a>'
+    return text
@@ -1,22 +1,18 @@
-from typing import Callable, Dict, Any, Awaitable
+from typing import Any, Dict
 
-from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
+from redis.asyncio.client import Redis
 
+from tgbot.config import Config
+from tgbot.middlewares.pipeline import StageFunc
 
-class ConfigMiddleware(BaseMiddleware):
-    def __init__(self, config, redis) -> None:
-        self.config = config
-        self.redis = redis
 
-    async def __call__(
-        self,
-        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
-        event: TelegramObject,
-        data: Dict[str, Any],
-    ) -> Any:
-        data["config"] = self.config
-        data["redis"] = self.redis
+def inject_config(config: Config, redis: Redis) -> StageFunc:
+    """Stage putting the config and the Redis client into the handler data"""
 
-        result = await handler(event, data)
-        return result
+    def stage(event: TelegramObject, data: Dict[str, Any]) -> bool:
+        data["config"] = config
+        data["redis"] = redis
+        return True
+
+    return stage
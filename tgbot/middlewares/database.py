@@ -1,33 +1,28 @@
-from typing import Callable, Dict, Any, Awaitable
+from typing import Any, Dict
 
-from aiogram import BaseMiddleware
-from aiogram.types import CallbackQuery, Message, TelegramObject
+from aiogram.types import CallbackQuery, Message
 
 from tgbot.database.orm import AsyncORM
+from tgbot.misc.readiness import readiness
 
+# how long an update may wait for the database during startup
+DB_READY_TIMEOUT = 30
 
-class DatabaseMiddleware(BaseMiddleware):
-    async def __call__(
-        self,
-        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
-        event: Message | CallbackQuery,
-        data: Dict[str, Any],
-    ) -> Any:
-        if not event.from_user:
-            return
-
-        user = await AsyncORM.users.get(event.from_user.id)
-        if not user:
-            user = await AsyncORM.users.create(
-                id=event.from_user.id,
-                username=event.from_user.username,
-            )
-
-        if user and event.from_user.username != user.username:
-            user = await AsyncORM.users.update(
-                user.id, username=event.from_user.username
-            )
-
-        data["user"] = user
-        result = await handler(event, data)
-        return result
+
+async def load_user(event: Message | CallbackQuery, data: Dict[str, Any]) -> bool:
+    """Stage loading or creating the sender, runs after the cheap checks"""
+    if not await readiness.wait("db", DB_READY_TIMEOUT):
+        return False
+
+    user = await AsyncORM.users.get(event.from_user.id)
+    if not user:
+        user = await AsyncORM.users.create(
+            id=event.from_user.id,
+            username=event.from_user.username,
+        )
+
+    if user and event.from_user.username != user.username:
+        user = await AsyncORM.users.update(user.id, username=event.from_user.username)
+
+    data["user"] = user
+    return True
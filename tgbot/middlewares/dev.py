@@ -1,24 +1,20 @@
-from typing import Callable, Dict, Any, Awaitable
+from typing import Any, Dict, Iterable
 
-from aiogram import BaseMiddleware
-from aiogram.types import CallbackQuery, Message, TelegramObject
+from aiogram.types import CallbackQuery, Message
 
-from tgbot.config import Config
+from tgbot.middlewares.pipeline import StageFunc
 
 
-class DeveloperMiddleware(BaseMiddleware):
-    async def __call__(
-        self,
-        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
-        event: Message | CallbackQuery,
-        data: Dict[str, Any],
-    ) -> Any:
-        if not event.from_user:
-            return
+def has_user(event: Message | CallbackQuery, data: Dict[str, Any]) -> bool:
+    """Stage dropping updates without a sender, e.g. channel posts"""
+    return event.from_user is not None
 
-        config: Config = data["config"]
-        if config.misc.dev and event.from_user.id not in config.tg_bot.admin_ids:
-            return
 
-        result = await handler(event, data)
-        return result
+def admins_only(admin_ids: Iterable[int]) -> StageFunc:
+    """Stage of the dev mode, drops the updates of everyone but the admins"""
+    admins = frozenset(admin_ids)
+
+    def stage(event: Message | CallbackQuery, data: Dict[str, Any]) -> bool:
+        return event.from_user.id in admins
+
+    return stage
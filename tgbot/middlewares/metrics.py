@@ -0,0 +1,84 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject
+from prometheus_client import Histogram
+
+from tgbot.services.metrics import (
+    MIDDLEWARE_LATENCY,
+    MIDDLEWARE_REJECTED,
+    TELEGRAM_API_ERRORS,
+    TELEGRAM_API_LATENCY,
+    UPDATE_ERRORS,
+    UPDATE_LATENCY,
+)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware, records the handler latency per router and handler"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        router = data.get("event_router")
+        router_name = router.name if router else "unknown"
+        handler_name = handler_object.callback.__name__ if handler_object else "unknown"
+
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            UPDATE_ERRORS.labels(router_name, handler_name, type(e).__name__).inc()
+            raise
+        finally:
+            UPDATE_LATENCY.labels(router_name, handler_name).observe(
+                time.perf_counter() - start
+            )
+
+
+class StageMetrics:
+    """Hook of PipelineMiddleware, records the time and rejections of each stage"""
+
+    def __init__(self):
+        self._latency: Dict[str, Histogram] = {}
+
+    def __call__(self, stage: str, seconds: float, passed: bool) -> None:
+        latency = self._latency.get(stage)
+        if latency is None:
+            latency = self._latency[stage] = MIDDLEWARE_LATENCY.labels(stage)
+        latency.observe(seconds)
+        if not passed:
+            MIDDLEWARE_REJECTED.labels(stage).inc()
+
+
+class RequestMetricsMiddleware(BaseRequestMiddleware):
+    """Session middleware, records the Telegram API latency and errors"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        method_name = type(method).__name__
+        start = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            TELEGRAM_API_ERRORS.labels(method_name, type(e).__name__).inc()
+            raise
+        finally:
+            TELEGRAM_API_LATENCY.labels(method_name).observe(
+                time.perf_counter() - start
+            )
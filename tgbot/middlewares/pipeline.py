@@ -0,0 +1,81 @@
+import inspect
+import time
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+# a stage returns False to drop the update, it may put values into `data`
+StageFunc = Callable[[TelegramObject, Dict[str, Any]], Union[bool, Awaitable[bool]]]
+# called after every stage with its name, own time and result
+StageHook = Callable[[str, float, bool], None]
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    func: StageFunc
+    # event classes the stage runs for, None runs it for every event
+    event_types: Optional[Tuple[Type[TelegramObject], ...]] = None
+    is_async: bool = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "is_async", inspect.iscoroutinefunction(self.func))
+
+    def applies_to(self, event_type: Type[TelegramObject]) -> bool:
+        return self.event_types is None or issubclass(event_type, self.event_types)
+
+
+class PipelineMiddleware(BaseMiddleware):
+    """
+    Outer middleware running the stages in order, the first one returning
+    False drops the update without calling the rest.
+
+    Keep the cheap synchronous checks first, a rejected update then never
+    reaches the database. Synchronous stages are called without an await.
+    """
+
+    def __init__(self, stages: Sequence[Stage], hooks: Sequence[StageHook] = ()):
+        self.stages = tuple(stages)
+        self.hooks = tuple(hooks)
+        self._stages_by_type: Dict[Type[TelegramObject], Tuple[Stage, ...]] = {}
+
+    def stages_for(self, event_type: Type[TelegramObject]) -> Tuple[Stage, ...]:
+        stages = self._stages_by_type.get(event_type)
+        if stages is None:
+            stages = self._stages_by_type[event_type] = tuple(
+                stage for stage in self.stages if stage.applies_to(event_type)
+            )
+        return stages
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        hooks = self.hooks
+        for stage in self.stages_for(type(event)):
+            start = time.perf_counter() if hooks else 0.0
+            passed = stage.func(event, data)
+            if stage.is_async:
+                passed = await passed
+            if hooks:
+                elapsed = time.perf_counter() - start
+                for hook in hooks:
+                    hook(stage.name, elapsed, passed)
+            if not passed:
+                return None
+
+        return await handler(event, data)
@@ -0,0 +1,38 @@
+import asyncio
+from typing import Dict
+
+
+class Readiness:
+    """Named readiness flags set by the startup steps."""
+
+    def __init__(self):
+        self._events: Dict[str, asyncio.Event] = {}
+
+    def _event(self, name: str) -> asyncio.Event:
+        if name not in self._events:
+            self._events[name] = asyncio.Event()
+        return self._events[name]
+
+    def set(self, name: str) -> None:
+        self._event(name).set()
+
+    def clear(self, name: str) -> None:
+        self._event(name).clear()
+
+    def is_set(self, name: str) -> bool:
+        return self._event(name).is_set()
+
+    async def wait(self, name: str, timeout: float) -> bool:
+        """Wait until the flag is set, returns False on timeout"""
+        event = self._event(name)
+        if event.is_set():
+            return True
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+readiness = Readiness()
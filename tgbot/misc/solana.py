@@ -0,0 +1,30 @@
+import re
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_B58_INDEX = {char: index for index, char in enumerate(B58_ALPHABET)}
+
+# a 32 byte key is 32 to 44 base58 characters long
+_ADDRESS_RE = re.compile(r"[1-9A-HJ-NP-Za-km-z]{32,44}")
+
+PUBKEY_LENGTH = 32
+
+
+def is_valid_address(address: str) -> bool:
+    """
+    Check that the address is base58 of exactly 32 bytes.
+
+    Decodes into a Python int instead of building the byte string, leading
+    "1" characters are the leading zero bytes of the key.
+    """
+    if not _ADDRESS_RE.fullmatch(address):
+        return False
+
+    digits = address.lstrip("1")
+    zeros = len(address) - len(digits)
+
+    value = 0
+    index = _B58_INDEX
+    for char in digits:
+        value = value * 58 + index[char]
+
+    return zeros + (value.bit_length() + 7) // 8 == PUBKEY_LENGTH
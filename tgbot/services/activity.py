@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from redis.asyncio.client import Redis
+
+from tgbot.database.orm import AsyncORM
+from tgbot.misc.readiness import readiness
+from tgbot.services.metrics import REDIS_ERRORS
+
+# Every wallet is counted in two sorted sets per metric: the bucket of the
+# current hour and the rolling 24h set. Once an hour leaves the window its
+# bucket is subtracted from the 24h set with ZUNIONSTORE ... WEIGHTS 1 -1, so
+# the rolling totals are never recomputed from the buckets.
+METRICS = ("tx", "vol")
+WINDOW_HOURS = 24
+# buckets outlive the window, an hour is subtracted late after a downtime
+BUCKET_TTL = 48 * 3600
+# guards of the expire and rollup runs, shared by all bot instances
+GUARD_TTL = 72 * 3600
+# finished hours that are still rolled up into Postgres after a downtime
+ROLLUP_HOURS = 6
+
+LAST_SEEN_KEY = "activity:last"
+
+# KEYS: guard, rolling set, expired bucket; ARGV: guard ttl
+_EXPIRE_BUCKET = """
+if redis.call('SET', KEYS[1], 1, 'NX', 'EX', ARGV[1]) then
+    if redis.call('EXISTS', KEYS[3]) == 1 then
+        redis.call('ZUNIONSTORE', KEYS[2], 2, KEYS[2], KEYS[3], 'WEIGHTS', 1, -1)
+        redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', '0.000000001')
+    end
+    return 1
+end
+return 0
+"""
+
+
+def bucket_key(metric: str, hour: int) -> str:
+    return f"activity:{metric}:h:{hour}"
+
+
+def window_key(metric: str) -> str:
+    return f"activity:{metric}:24h"
+
+
+def current_hour() -> int:
+    return int(time.time() // 3600)
+
+
+@dataclass
+class WalletSummary:
+    address: str
+    tx_24h: int
+    volume_24h: float
+    # 0 is the most active wallet, None when there was no activity in 24h
+    rank: Optional[int]
+    wallets: int
+    last_seen: Optional[datetime]
+    # oldest first, one count per hour of the window
+    hourly: List[int]
+
+
+class ActivityTracker:
+    """
+    Rolling per-wallet transaction counters in Redis.
+
+    `record` only updates a local Counter, the counts are written with one
+    pipeline per `flush_interval`, so Redis sees one command per active
+    wallet instead of one per transaction.
+    """
+
+    def __init__(self, redis: Redis, flush_interval: float = 1.0):
+        self.redis = redis
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger(__name__)
+        self._tx: Counter = Counter()
+        self._volume: Counter = Counter()
+        self._last_seen: Dict[str, float] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._expire_bucket = redis.register_script(_EXPIRE_BUCKET)
+
+    def record(self, address: str, amount: float = 0.0) -> None:
+        self._tx[address] += 1
+        if amount:
+            self._volume[address] += abs(amount)
+        self._last_seen[address] = time.time()
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._flush_loop(), name="activity:flush"),
+            asyncio.create_task(self._maintenance_loop(), name="activity:maintenance"),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        await self.flush()
+
+    async def flush(self) -> None:
+        if not self._tx:
+            return
+
+        tx, self._tx = self._tx, Counter()
+        volume, self._volume = self._volume, Counter()
+        last_seen, self._last_seen = self._last_seen, {}
+        hour = current_hour()
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for metric, counts in (("tx", tx), ("vol", volume)):
+                    if not counts:
+                        continue
+                    for address, count in counts.items():
+                        pipe.zincrby(bucket_key(metric, hour), count, address)
+                        pipe.zincrby(window_key(metric), count, address)
+                    pipe.expire(bucket_key(metric, hour), BUCKET_TTL)
+                pipe.hset(LAST_SEEN_KEY, mapping=last_seen)
+                await pipe.execute()
+        except Exception as e:
+            REDIS_ERRORS.labels("activity").inc()
+            self.logger.error(f"Failed to flush activity of {len(tx)} wallets: {e}")
+            # merged back, the next flush retries
+            self._tx.update(tx)
+            self._volume.update(volume)
+            self._last_seen = {**last_seen, **self._last_seen}
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def expire_hours(self) -> None:
+        """Subtract the buckets that left the 24h window from the rolling sets"""
+        newest_expired = current_hour() - WINDOW_HOURS
+        oldest_bucket = current_hour() - BUCKET_TTL // 3600
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for hour in range(oldest_bucket, newest_expired + 1):
+                for metric in METRICS:
+                    await self._expire_bucket(
+                        keys=[
+                            f"activity:expired:{metric}:{hour}",
+                            window_key(metric),
+                            bucket_key(metric, hour),
+                        ],
+                        args=[GUARD_TTL],
+                        client=pipe,
+                    )
+            await pipe.execute()
+
+    async def rollup(self) -> None:
+        """Add the finished hour buckets onto the daily totals in Postgres"""
+        hour = current_hour()
+        for finished in range(hour - ROLLUP_HOURS, hour):
+            guard = f"activity:rolled:{finished}"
+            if not await self.redis.set(guard, 1, nx=True, ex=GUARD_TTL):
+                continue
+
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for metric in METRICS:
+                        pipe.zrange(
+                            bucket_key(metric, finished), 0, -1, withscores=True
+                        )
+                    tx, volume = await pipe.execute()
+
+                if not tx:
+                    continue
+
+                day = datetime.fromtimestamp(finished * 3600, timezone.utc).date()
+                volumes = {address: value for address, value in volume}
+                await AsyncORM.activity.add_daily(
+                    [
+                        (day, address.decode(), int(count), volumes.get(address, 0.0))
+                        for address, count in tx
+                    ]
+                )
+            except Exception:
+                await self.redis.delete(guard)
+                raise
+
+    async def _maintenance_loop(self, interval: float = 60) -> None:
+        while True:
+            try:
+                await self.expire_hours()
+                if readiness.is_set("db"):
+                    await self.rollup()
+            except Exception as e:
+                self.logger.error(f"Activity maintenance failed: {e}")
+            await asyncio.sleep(interval)
+
+
+async def top_wallets(redis: Redis, limit: int = 10) -> List[Tuple[str, int]]:
+    """The most active wallets of the last 24h, ZREVRANGE is O(log n + limit)"""
+    result = await redis.zrevrange(window_key("tx"), 0, limit - 1, withscores=True)
+    return [(address.decode(), int(count)) for address, count in result]
+
+
+async def wallet_summary(redis: Redis, address: str) -> WalletSummary:
+    """24h totals, rank and hourly counts of a wallet, each an O(log n) lookup"""
+    hour = current_hour()
+    hours = range(hour - WINDOW_HOURS + 1, hour + 1)
+
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.zscore(window_key("tx"), address)
+        pipe.zscore(window_key("vol"), address)
+        pipe.zrevrank(window_key("tx"), address)
+        pipe.zcard(window_key("tx"))
+        pipe.hget(LAST_SEEN_KEY, address)
+        for bucket_hour in hours:
+            pipe.zscore(bucket_key("tx", bucket_hour), address)
+        tx, volume, rank, wallets, last_seen, *hourly = await pipe.execute()
+
+    return WalletSummary(
+        address=address,
+        tx_24h=int(tx or 0),
+        volume_24h=float(volume or 0),
+        rank=rank,
+        wallets=wallets,
+        last_seen=(
+            datetime.fromtimestamp(float(last_seen), timezone.utc)
+            if last_seen
+            else None
+        ),
+        hourly=[int(count or 0) for count in hourly],
+    )
+
+
+async def activity_line(redis: Redis, address: str) -> str:
+    """Short 24h activity of an address for user facing messages"""
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.zscore(window_key("tx"), address)
+        pipe.zscore(window_key("vol"), address)
+        tx, volume = await pipe.execute()
+
+    if not tx:
+        return "24h: no activity"
+    return f"24h: {int(tx)} tx, {float(volume or 0):g} SOL"
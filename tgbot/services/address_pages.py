@@ -0,0 +1,104 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from aiogram import html
+from aiogram.types import InlineKeyboardMarkup
+
+from tgbot.database.orm import AsyncORM
+from tgbot.keyboards.inline import address_page_menu
+
+PAGE_SIZE = 8
+
+
+@dataclass(frozen=True)
+class RenderedPage:
+    text: str
+    reply_markup: InlineKeyboardMarkup
+
+
+class PageCache:
+    """
+    Rendered address pages per user, kept until the user's addresses change.
+
+    Users are evicted least recently used first once `max_users` is reached.
+    """
+
+    def __init__(self, max_users: int = 2000):
+        self.max_users = max_users
+        self._users: "OrderedDict[int, Dict[Tuple[str, int], RenderedPage]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, key: Tuple[str, int]) -> Optional[RenderedPage]:
+        pages = self._users.get(user_id)
+        page = pages.get(key) if pages else None
+        if page is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._users.move_to_end(user_id)
+        return page
+
+    def set(self, user_id: int, key: Tuple[str, int], page: RenderedPage) -> None:
+        if user_id not in self._users and len(self._users) >= self.max_users:
+            self._users.popitem(last=False)
+        self._users.setdefault(user_id, {})[key] = page
+        self._users.move_to_end(user_id)
+
+    def invalidate(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+
+
+page_cache = PageCache()
+
+
+async def render_address_page(
+    user_id: int, direction: str = "o", cursor: int = 0
+) -> RenderedPage:
+    key = (direction, cursor)
+    page = page_cache.get(user_id, key)
+    if page:
+        return page
+
+    if direction == "n":
+        addresses = await AsyncORM.addresses.get_page(
+            user_id, after_id=cursor, limit=PAGE_SIZE + 1
+        )
+        has_newer = len(addresses) > PAGE_SIZE
+        if not has_newer:
+            # back at the start, render the canonical first page
+            return await render_address_page(user_id)
+        addresses = addresses[1:]
+        has_older = True
+    else:
+        addresses = await AsyncORM.addresses.get_page(
+            user_id, before_id=cursor or None, limit=PAGE_SIZE + 1
+        )
+        has_older = len(addresses) > PAGE_SIZE
+        addresses = addresses[:PAGE_SIZE]
+        has_newer = cursor != 0
+
+    if addresses:
+        lines = [
+            f"{'🟢' if address.active else '⚪️'}<b>{html.quote(address.name)}</b>\n"
+            f"└─<code>{address.sol_address}</code>"
+            for address in addresses
+        ]
+        text = "📋<b>Your addresses</b>\n\n" + "\n".join(lines)
+    elif cursor:
+        text = "📋<b>Your addresses</b>\n\nNo more addresses"
+    else:
+        text = "📋<b>Your addresses</b>\n\nYou don't track any addresses yet"
+
+    page = RenderedPage(
+        text=text,
+        reply_markup=address_page_menu(
+            addresses, direction, cursor, has_newer, has_older
+        ),
+    )
+    page_cache.set(user_id, key, page)
+    return page
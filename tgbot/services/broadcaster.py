@@ -1,12 +1,61 @@
 import asyncio
 import logging
-from typing import List, Optional, Union
+from typing import List, Optional, Set, Union
 
 from aiogram import Bot
 from aiogram import exceptions
 from aiogram.types import InlineKeyboardMarkup, InputFile
 
 from tgbot.database.models import User
+from tgbot.services.log_setup import EventAggregator
+from tgbot.services.notifier import Notification
+
+send_events = EventAggregator(logging.getLogger(__name__))
+
+
+class BroadcastJob:
+    """Progress of a running broadcast, so a shutdown can hand off the rest"""
+
+    def __init__(
+        self,
+        users: List[Union[User, int]],
+        text: Optional[str],
+        photo_id: Optional[str],
+        disable_notification: bool,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+    ):
+        self.chat_ids = [user.id if isinstance(user, User) else user for user in users]
+        self.text = text or ""
+        self.photo_id = photo_id
+        self.disable_notification = disable_notification
+        self.reply_markup = reply_markup
+        self.position = 0
+        self.stopped = False
+
+    def remaining(self) -> List[Notification]:
+        # the recipient being sent to right now is included, better twice than never
+        return [
+            Notification(
+                chat_id,
+                self.text,
+                photo=self.photo_id,
+                disable_notification=self.disable_notification,
+                reply_markup=self.reply_markup,
+            )
+            for chat_id in self.chat_ids[self.position :]
+        ]
+
+
+running_broadcasts: Set[BroadcastJob] = set()
+
+
+def stop_broadcasts() -> List[Notification]:
+    """Stop the running broadcasts, returns their unsent messages"""
+    remaining = []
+    for job in running_broadcasts:
+        job.stopped = True
+        remaining.extend(job.remaining())
+    return remaining
 
 
 async def send_message(
@@ -34,21 +83,43 @@ async def send_message(
             reply_markup=reply_markup,
         )
     except exceptions.TelegramBadRequest as e:
-        logging.error("Telegram server says - Bad Request: chat not found")
+        send_events.add(
+            "sends failed",
+            "TelegramBadRequest",
+            "Target [ID:%s]: Telegram server says - Bad Request: %s",
+            user_id,
+            e.message,
+        )
     except exceptions.TelegramForbiddenError:
-        logging.error(f"Target [ID:{user_id}]: got TelegramForbiddenError")
+        send_events.add(
+            "sends failed",
+            "TelegramForbiddenError",
+            "Target [ID:%s]: got TelegramForbiddenError",
+            user_id,
+        )
     except exceptions.TelegramRetryAfter as e:
-        logging.error(
-            f"Target [ID:{user_id}]: Flood limit is exceeded. Sleep {e.retry_after} seconds."
+        send_events.add(
+            "sends throttled",
+            "TelegramRetryAfter",
+            "Target [ID:%s]: Flood limit is exceeded. Sleep %s seconds.",
+            user_id,
+            e.retry_after,
         )
         await asyncio.sleep(e.retry_after)
         return await send_message(
             bot, user_id, text, disable_notification, reply_markup
         )  # Recursive call
-    except exceptions.TelegramAPIError:
-        logging.exception(f"Target [ID:{user_id}]: failed")
+    except exceptions.TelegramAPIError as e:
+        send_events.add(
+            "sends failed",
+            type(e).__name__,
+            "Target [ID:%s]: failed - %s",
+            user_id,
+            e,
+            level=logging.ERROR,
+        )
     else:
-        logging.info(f"Target [ID:{user_id}]: success")
+        send_events.add("sends succeeded", "ok")
         return True
     return False
 
@@ -62,12 +133,16 @@ async def broadcast(
     reply_markup: Optional[InlineKeyboardMarkup] = None,
 ) -> int:
     count = 0
+    job = BroadcastJob(users, text, photo_id, disable_notification, reply_markup)
+    running_broadcasts.add(job)
     try:
-        for user in users:
+        for user_id in job.chat_ids:
+            if job.stopped:
+                break
             if not photo_id:
                 if await send_message(
                     bot,
-                    user.id if isinstance(user, User) else user,
+                    user_id,
                     text,
                     disable_notification,
                     reply_markup,
@@ -76,7 +151,7 @@ async def broadcast(
             else:
                 try:
                     await bot.send_photo(
-                        user.id if isinstance(user, User) else user,
+                        user_id,
                         photo=photo_id,
                         caption=text,
                         disable_notification=disable_notification,
@@ -85,10 +160,12 @@ async def broadcast(
                     count += 1
                 except Exception:
                     pass
+            job.position += 1
             await asyncio.sleep(
                 0.05
             )  # 20 messages per second (Limit: 30 messages per second)
     finally:
+        running_broadcasts.discard(job)
         logging.info(f"BROADCAST: {count} messages successful sent.")
 
     return count
@@ -1,19 +1,77 @@
+import asyncio
 import os
-import re
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import (
+    IO,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import aiofiles
+import aiofiles.os
 from aiogram.types import Message
 from tgbot.database.orm import AsyncORM
 from tgbot.messages.texts import result_msg
+from tgbot.services.matcher import MultiPatternMatcher
 
+# bytes of lines read at once, a chunk is also the unit of work of a worker process
+CHUNK_SIZE = 8 * 1024 * 1024
+WRITE_BUFFER_SIZE = 1024 * 1024
 
-async def check_file(path_to_file: str, msg: Message, lang: str):
+# f_url, log, f_pass
+ParsedLine = Tuple[str, str, str]
+# raw line, parsed line, matched UrlLogPass patterns, matched LogPass patterns
+LineMatch = Tuple[str, ParsedLine, Tuple[str, ...], Tuple[str, ...]]
+
+
+def iter_line_chunks(
+    path_to_file: str, chunk_size: int = CHUNK_SIZE
+) -> Iterator[List[str]]:
+    """Read a file as lists of lines of about `chunk_size` bytes"""
     with open(path_to_file, "r", encoding="utf-8", errors="replace") as f:
-        lines = f.readlines()
+        while True:
+            lines = f.readlines(chunk_size)
+            if not lines:
+                return
+            yield lines
 
-    all_len = len(lines)
+
+def parse_line(line: str) -> Optional[ParsedLine]:
+    """
+    Split a `url:log:pass` line, the url itself may contain colons.
+
+    Same result as the `^(.*):(.*):(.*)$` regex, but without the regex engine.
+    """
+    parts = line.replace("\x00", "").rstrip("\n").rsplit(":", 2)
+    if len(parts) != 3:
+        return None
+    return parts[0], parts[1], parts[2]
+
+
+def _read_unique_lines(path_to_file: str) -> Tuple[int, Set[str]]:
+    all_len = 0
+    unique_lines: Set[str] = set()
+    for lines in iter_line_chunks(path_to_file):
+        all_len += len(lines)
+        # Postgres text can't hold NUL, one such line would fail a whole batch
+        unique_lines.update(line.replace("\x00", "").rstrip("\r\n") for line in lines)
+    return all_len, unique_lines
+
+
+async def check_file(path_to_file: str, msg: Message, lang: str):
+    all_len, unique_lines = await asyncio.to_thread(_read_unique_lines, path_to_file)
     if all_len < 15000:
         return None
 
-    unique_lines = set(lines)
     unique_len = len(unique_lines)
     dubls = all_len - unique_len
 
@@ -21,19 +79,98 @@ async def check_file(path_to_file: str, msg: Message, lang: str):
         result_msg(all_len, 0, dubls, 0, lang),
     )
 
-    added, exists = await AsyncORM.lines.insert_lines_check_existence(
+    added, exists, skipped = await AsyncORM.lines.insert_lines_check_existence(
         unique_lines, msg, lang, all_len, dubls
     )
 
-    return all_len, added, dubls, exists
+    return all_len, added, dubls, exists, skipped
+
 
+class WriterPool:
+    """Keeps buffered append handles open, closing the least recently used ones"""
+
+    def __init__(self, max_open: int = 256, buffer_size: int = WRITE_BUFFER_SIZE):
+        self.max_open = max_open
+        self.buffer_size = buffer_size
+        self._files: "OrderedDict[str, IO[str]]" = OrderedDict()
+
+    def write(self, path: str, data: str) -> None:
+        f = self._files.get(path)
+        if f is None:
+            if len(self._files) >= self.max_open:
+                _, oldest = self._files.popitem(last=False)
+                oldest.close()
+            f = open(path, "a", buffering=self.buffer_size)
+            self._files[path] = f
+        else:
+            self._files.move_to_end(path)
+        f.write(data)
+
+    def close(self) -> None:
+        while self._files:
+            _, f = self._files.popitem()
+            f.close()
+
+    def __enter__(self) -> "WriterPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+# matchers of the current worker process, built once by _init_matchers
+_url_matcher: Optional[MultiPatternMatcher] = None
+_log_matcher: Optional[MultiPatternMatcher] = None
+
+
+def _init_matchers(url_format_list: List[str], log_format_list: List[str]) -> None:
+    global _url_matcher, _log_matcher
+    _url_matcher = MultiPatternMatcher(url_format_list)
+    _log_matcher = MultiPatternMatcher(log_format_list)
+
+
+def _scan_chunk(lines: List[str]) -> List[LineMatch]:
+    matches = []
+    for line in lines:
+        parsed = parse_line(line)
+        if not parsed:
+            continue
 
-def format_file(path_to_file: str, order_id: int, username: str):
-    with open("UrlLogPass_format.txt", "r") as f:
-        url_format_list = f.read().split("\n")
+        url_hits = _url_matcher.find_all(parsed[0])
+        log_hits = _log_matcher.find_all(parsed[0])
+        if url_hits or log_hits:
+            matches.append((line, parsed, url_hits, log_hits))
+    return matches
 
-    with open("LogPass_format.txt", "r") as f:
-        log_format_list = f.read().split("\n")
+
+def _map_bounded(
+    executor: Executor, func: Callable, chunks: Iterable, window: int
+) -> Iterator:
+    """Executor.map that keeps at most `window` chunks in flight"""
+    futures: Deque[Future] = deque()
+    for chunk in chunks:
+        futures.append(executor.submit(func, chunk))
+        if len(futures) >= window:
+            yield futures.popleft().result()
+    while futures:
+        yield futures.popleft().result()
+
+
+def _read_format_list(path: str) -> List[str]:
+    with open(path, "r") as f:
+        return [url for url in f.read().split("\n") if url]
+
+
+def format_file(path_to_file: str, order_id: int, username: str, processes: int = 1):
+    """
+    Sort the `url:log:pass` lines of a file by the urls from the format lists.
+
+    Works in a single streaming pass, with `processes` > 1 the chunks are
+    parsed and matched in a process pool. Blocking, use `aformat_file` from
+    the event loop.
+    """
+    url_format_list = _read_format_list("UrlLogPass_format.txt")
+    log_format_list = _read_format_list("LogPass_format.txt")
 
     target_dir = os.path.join("results", f"[{order_id}]requests_@{username}")
     url_format_dir = os.path.join(target_dir, "UrlLogPass")
@@ -43,61 +180,118 @@ def format_file(path_to_file: str, order_id: int, username: str):
         if not os.path.exists(dir):
             os.mkdir(dir)
 
-    with open(path_to_file, "r", encoding="utf-8", errors="replace") as f:
-        all_lines = f.readlines()
+    chunks = iter_line_chunks(path_to_file)
+    seen: Set[str] = set()
+
+    with WriterPool() as writers:
+        if processes > 1:
+            executor = ProcessPoolExecutor(
+                processes,
+                initializer=_init_matchers,
+                initargs=(url_format_list, log_format_list),
+            )
+            results = _map_bounded(executor, _scan_chunk, chunks, processes * 2)
+        else:
+            executor = None
+            _init_matchers(url_format_list, log_format_list)
+            results = map(_scan_chunk, chunks)
 
-    for line in set(all_lines):
-        regex = r"^(.*):(.*):(.*)$"
         try:
-            line = line.replace("\x00", "")
-            result = re.search(regex, line)
-            if not result:
-                continue
+            for matches in results:
+                for line, (f_url, log, f_pass), url_hits, log_hits in matches:
+                    if line in seen:
+                        continue
+                    seen.add(line)
 
-            f_url, log, f_pass = result.groups()
+                    # URL LOG PASS FORMAT
+                    for url in url_hits:
+                        writers.write(
+                            os.path.join(url_format_dir, f"{url}.txt"),
+                            f"{f_url}:{log}:{f_pass}\n",
+                        )
 
-            # URL LOG PASS FORMAT
-            for url in url_format_list:
-                if url not in f_url:
-                    continue
+                    # LOG PAS FORMAT
+                    for url in log_hits:
+                        writers.write(
+                            os.path.join(log_format_dir, f"{url}.txt"),
+                            f"{log}:{f_pass}\n",
+                        )
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
 
-                with open(os.path.join(url_format_dir, f"{url}.txt"), "a") as f_write:
-                    f_write.write(":".join([f_url, log, f_pass]) + "\n")
 
-            # LOG PAS FORMAT
-            for url in log_format_list:
-                if url not in f_url:
-                    continue
+async def aformat_file(
+    path_to_file: str, order_id: int, username: str, processes: int = 1
+):
+    """format_file off the event loop"""
+    await asyncio.to_thread(format_file, path_to_file, order_id, username, processes)
 
-                with open(os.path.join(log_format_dir, f"{url}.txt"), "a") as f_write:
-                    f_write.write(":".join([log, f_pass]) + "\n")
 
-        except Exception:
-            continue
+SAVE_TYPES = ("log_pass", "full")
 
 
-async def create_file_with_searched_lines(url, save_type):
-    lines = await AsyncORM.lines.get_all_lines_startswith(url)
-    result = ""
-    for line in lines:
-        data = line.line.split(":")
-        print(line, data)
-        if len(data) != 4:
-            continue
-
-        https, url, log, password = data
-        if save_type == "log_pass":
-            result += f"{log}:{password}"
-            continue
-        result += f"{https}:{url}:{log}:{password}"
+async def export_searched_lines(url: str) -> Dict[str, str]:
+    """
+    Export the lines starting with url in both formats in one pass.
 
-    url_for_name = url.split("//")[1].split("/")[0]
-    name = f"({len(lines)}) {url_for_name} {save_type.replace('_', ':')}.txt"
+    Rows come from a server-side cursor in batches and every batch is written
+    with a single buffered write, so memory stays flat for any result size.
+    Returns the file path per save type.
+    """
     if not os.path.exists("temp"):
         os.mkdir("temp")
 
-    path = os.path.join("temp", name)
-    with open(path, "w") as f:
-        f.write(result)
+    url_for_name = url.split("//")[-1].split("/")[0]
+    tmp_paths = {
+        save_type: os.path.join("temp", f"{uuid.uuid4().hex}.{save_type}.tmp")
+        for save_type in SAVE_TYPES
+    }
+    count = 0
+    exported = False
+
+    log_pass_file = await aiofiles.open(
+        tmp_paths["log_pass"], "w", buffering=WRITE_BUFFER_SIZE
+    )
+    full_file = await aiofiles.open(tmp_paths["full"], "w", buffering=WRITE_BUFFER_SIZE)
+    try:
+        async for batch in AsyncORM.lines.iter_lines_startswith(url):
+            log_pass_lines = []
+            full_lines = []
+            for line in batch:
+                data = line.split(":")
+                if len(data) != 4:
+                    continue
+
+                https, host, log, password = data
+                log_pass_lines.append(f"{log}:{password}\n")
+                full_lines.append(f"{https}:{host}:{log}:{password}\n")
+
+            count += len(full_lines)
+            await log_pass_file.write("".join(log_pass_lines))
+            await full_file.write("".join(full_lines))
+        exported = True
+    finally:
+        await log_pass_file.close()
+        await full_file.close()
+        if not exported:
+            for tmp_path in tmp_paths.values():
+                await aiofiles.os.remove(tmp_path)
+
+    paths = {}
+    for save_type, tmp_path in tmp_paths.items():
+        name = f"({count}) {url_for_name} {save_type.replace('_', ':')}.txt"
+        paths[save_type] = os.path.join("temp", name)
+        await aiofiles.os.replace(tmp_path, paths[save_type])
 
-    return path
+    return paths
+
+
+async def create_file_with_searched_lines(url, save_type):
+    paths = await export_searched_lines(url)
+    save_type = "log_pass" if save_type == "log_pass" else "full"
+    # only one format was asked for, the other export is not kept in temp/
+    for other_type, path in paths.items():
+        if other_type != save_type:
+            await aiofiles.os.remove(path)
+    return paths[save_type]
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from tgbot.config import Solana
+from tgbot.services.log_setup import EventAggregator
+from tgbot.services.metrics import ENRICHMENT_RESULTS
+from tgbot.services.solana_rpc import SolanaRPC
+from tgbot.services.token_metadata import TokenMetadataCache
+
+LAMPORTS_PER_SOL = 1_000_000_000
+
+# result of the signatures of a failed batch request
+_FAILED = object()
+
+
+def _account_keys(tx: Dict[str, Any]) -> List[str]:
+    keys = tx.get("transaction", {}).get("message", {}).get("accountKeys", [])
+    # jsonParsed keys are {"pubkey": ...} objects, json keys are plain strings
+    return [key["pubkey"] if isinstance(key, dict) else key for key in keys]
+
+
+def apply_transaction(data: Dict[str, Any], tx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fill the amount, counterparty and time of a payload from getTransaction.
+
+    The SOL balance change of the tracked address gives the amount and the
+    direction, the account with the largest opposite change is the
+    counterparty. Values the tracker already sent are kept.
+    """
+    enriched = dict(data)
+    if tx.get("blockTime") and not enriched.get("timestamp"):
+        enriched["timestamp"] = datetime.fromtimestamp(
+            tx["blockTime"], timezone.utc
+        ).isoformat()
+
+    meta = tx.get("meta") or {}
+    keys = _account_keys(tx)
+    pre, post = meta.get("preBalances", []), meta.get("postBalances", [])
+    address = data["address"]
+    if address not in keys or len(pre) != len(keys) or len(post) != len(keys):
+        return enriched
+
+    deltas = [after - before for before, after in zip(pre, post)]
+    own = deltas[keys.index(address)]
+    if not own:
+        return enriched
+
+    if own > 0:
+        counterparty = keys[min(range(len(deltas)), key=deltas.__getitem__)]
+        from_addr, to_addr = counterparty, address
+    else:
+        counterparty = keys[max(range(len(deltas)), key=deltas.__getitem__)]
+        from_addr, to_addr = address, counterparty
+
+    if not enriched.get("amount"):
+        enriched["amount"] = abs(own) / LAMPORTS_PER_SOL
+    if not enriched.get("from_addr") and not enriched.get("to_addr"):
+        enriched["from_addr"], enriched["to_addr"] = from_addr, to_addr
+    return enriched
+
+
+def token_change(tx: Dict[str, Any], owner: str) -> Optional[Tuple[str, int, int]]:
+    """(mint, raw amount change, decimals) of the largest token change of owner"""
+    meta = tx.get("meta") or {}
+    changes: Dict[str, int] = {}
+    decimals: Dict[str, int] = {}
+    for sign, balances in (
+        (-1, meta.get("preTokenBalances")),
+        (1, meta.get("postTokenBalances")),
+    ):
+        for balance in balances or []:
+            if balance.get("owner") != owner:
+                continue
+            mint = balance["mint"]
+            amount = balance.get("uiTokenAmount", {})
+            changes[mint] = changes.get(mint, 0) + sign * int(amount.get("amount", 0))
+            decimals[mint] = amount.get("decimals", 0)
+
+    changes = {mint: change for mint, change in changes.items() if change}
+    if not changes:
+        return None
+    mint = max(changes, key=lambda mint: abs(changes[mint]))
+    return mint, changes[mint], decimals[mint]
+
+
+def transaction_mints(tx: Dict[str, Any]) -> Set[str]:
+    meta = tx.get("meta") or {}
+    return {
+        balance["mint"]
+        for balances in (meta.get("preTokenBalances"), meta.get("postTokenBalances"))
+        for balance in balances or []
+    }
+
+
+class Enricher:
+    """
+    Resolves transactions with batched getTransaction calls.
+
+    Signatures are collected for `window` seconds or until `batch_size` of
+    them wait, then resolved with one JSON-RPC batch request. Results are
+    kept in an LRU keyed by signature, so a transaction touching several
+    tracked wallets is fetched once. A caller that waits longer than
+    `timeout` gets its payload back unchanged.
+    """
+
+    def __init__(
+        self,
+        rpc: SolanaRPC,
+        window: float = 0.05,
+        batch_size: int = 100,
+        timeout: float = 2.0,
+        cache_size: int = 10000,
+        tokens: Optional[TokenMetadataCache] = None,
+    ):
+        self.rpc = rpc
+        self.tokens = tokens
+        self.window = window
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.logger = logging.getLogger(__name__)
+        self.events = EventAggregator(self.logger)
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_config(cls, config: Solana) -> "Enricher":
+        return cls(
+            SolanaRPC(config.http_url, config.commitment),
+            window=config.enrichment_window_ms / 1000,
+            batch_size=config.enrichment_batch_size,
+            timeout=config.enrichment_timeout,
+        )
+
+    async def close(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        for task in self._batches:
+            task.cancel()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+        await self.rpc.close()
+
+    async def enrich(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        signature = data.get("signature")
+        if not signature:
+            return data
+
+        tx = self._cache.get(signature)
+        if tx is not None:
+            self._cache.move_to_end(signature)
+            ENRICHMENT_RESULTS.labels("hit").inc()
+            return self._apply(data, tx)
+
+        future = self._pending.get(signature)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[signature] = future
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(
+                    self.window, self._flush
+                )
+
+        try:
+            # shielded, a timed out waiter must not cancel the shared future
+            tx = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            ENRICHMENT_RESULTS.labels("timeout").inc()
+            return data
+
+        if tx is _FAILED:
+            ENRICHMENT_RESULTS.labels("error").inc()
+            return data
+        if tx is None:
+            ENRICHMENT_RESULTS.labels("missing").inc()
+            return data
+
+        ENRICHMENT_RESULTS.labels("miss").inc()
+        return self._apply(data, tx)
+
+    def _apply(self, data: Dict[str, Any], tx: Dict[str, Any]) -> Dict[str, Any]:
+        enriched = apply_transaction(data, tx)
+        change = token_change(tx, data["address"])
+        if change:
+            mint, amount, decimals = change
+            metadata = self.tokens.peek(mint) if self.tokens else None
+            if metadata:
+                decimals = metadata.decimals
+            enriched["token_mint"] = mint
+            enriched["token_amount"] = amount / 10**decimals
+            enriched["token_symbol"] = (
+                metadata.label if metadata else f"{mint[:4]}…{mint[-4:]}"
+            )
+        return enriched
+
+    def _flush(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.create_task(self._resolve(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _resolve(self, batch: Dict[str, asyncio.Future]) -> None:
+        try:
+            transactions = await self.rpc.get_transactions(list(batch))
+        except Exception as e:
+            self.events.add(
+                "transaction batches failed",
+                type(e).__name__,
+                "getTransaction batch of %s failed: %r",
+                len(batch),
+                e,
+            )
+            transactions = dict.fromkeys(batch, _FAILED)
+
+        if self.tokens:
+            # the notifications of this batch then render from the local tier
+            await self.tokens.prefetch(
+                mint
+                for tx in transactions.values()
+                if tx is not None and tx is not _FAILED
+                for mint in transaction_mints(tx)
+            )
+
+        for signature, future in batch.items():
+            tx = transactions.get(signature)
+            if tx is not None and tx is not _FAILED:
+                self._cache[signature] = tx
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            if not future.done():
+                future.set_result(tx)
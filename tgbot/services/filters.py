@@ -0,0 +1,156 @@
+import logging
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from tgbot.database.orm import AsyncORM
+from tgbot.services.metrics import NOTIFICATIONS_FILTERED
+
+DIRECTION_IN = 1
+DIRECTION_OUT = 2
+DIRECTION_ANY = DIRECTION_IN | DIRECTION_OUT
+
+# allow mask slots: 24 hours for incoming, outgoing and unknown direction
+_SLOT_OFFSET = {DIRECTION_IN: 0, DIRECTION_OUT: 24, DIRECTION_ANY: 48}
+
+
+@dataclass(frozen=True)
+class FilterRule:
+    chat_id: int
+    min_amount: float = 0.0
+    directions: int = DIRECTION_ANY
+    quiet_from: Optional[int] = None
+    quiet_to: Optional[int] = None
+
+    def quiet_hours(self) -> Set[int]:
+        if self.quiet_from is None or self.quiet_to is None:
+            return set()
+        if self.quiet_from <= self.quiet_to:
+            return set(range(self.quiet_from, self.quiet_to))
+        return set(range(self.quiet_from, 24)) | set(range(0, self.quiet_to))
+
+    def allows(self, direction: int, quiet_hours: Set[int], hour: int) -> bool:
+        # an unknown direction is never filtered out
+        if direction != DIRECTION_ANY and not self.directions & direction:
+            return False
+        return hour not in quiet_hours
+
+
+class CompiledFilters:
+    """
+    Filter rules of all subscribers of one address.
+
+    Subscribers are sorted by min_amount, so the ones whose threshold an
+    amount reaches are a prefix found by bisect. For every (direction, hour)
+    slot a bitmask over the sorted subscribers marks who wants it, so one
+    transaction is checked against all subscribers with a few int operations.
+    """
+
+    __slots__ = ("chat_ids", "thresholds", "slot_masks", "all_mask")
+
+    def __init__(self, rules: Iterable[FilterRule]):
+        rules = sorted(rules, key=lambda rule: rule.min_amount)
+        self.chat_ids: List[int] = [rule.chat_id for rule in rules]
+        self.thresholds: List[float] = [rule.min_amount for rule in rules]
+        self.all_mask = (1 << len(rules)) - 1
+
+        self.slot_masks: List[int] = [0] * 72
+        for i, rule in enumerate(rules):
+            quiet_hours = rule.quiet_hours()
+            for direction, offset in _SLOT_OFFSET.items():
+                for hour in range(24):
+                    if rule.allows(direction, quiet_hours, hour):
+                        self.slot_masks[offset + hour] |= 1 << i
+
+    def blocked(self, amount: Optional[float], direction: int, hour: int) -> List[int]:
+        """Chat ids whose rules reject the transaction"""
+        # an unknown amount reaches every threshold, like an unknown direction
+        if amount is None:
+            reached = self.all_mask
+        else:
+            reached = (1 << bisect_right(self.thresholds, amount)) - 1
+        blocked = self.all_mask & ~(
+            self.slot_masks[_SLOT_OFFSET[direction] + hour] & reached
+        )
+
+        chat_ids = []
+        while blocked:
+            low = blocked & -blocked
+            chat_ids.append(self.chat_ids[low.bit_length() - 1])
+            blocked ^= low
+        return chat_ids
+
+
+def transaction_direction(data: Dict[str, Any]) -> int:
+    address = data.get("address")
+    if data.get("to_addr") == address:
+        return DIRECTION_IN
+    if data.get("from_addr") == address:
+        return DIRECTION_OUT
+    return DIRECTION_ANY
+
+
+class FilterRegistry:
+    """
+    Compiled filters of every address that has a subscriber with a filter.
+
+    Addresses without filters are not stored at all, their transactions
+    skip the filtering entirely.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._compiled: Dict[str, CompiledFilters] = {}
+
+    @staticmethod
+    def _rules(rows: Sequence) -> Dict[str, List[FilterRule]]:
+        rules: Dict[str, List[FilterRule]] = defaultdict(list)
+        for sol_address, user_id, min_amount, directions, quiet_from, quiet_to in rows:
+            rules[sol_address].append(
+                FilterRule(user_id, min_amount, directions, quiet_from, quiet_to)
+            )
+        return rules
+
+    async def load(self) -> None:
+        rows = await AsyncORM.addresses.get_filter_rules()
+        self._compiled = {
+            sol_address: CompiledFilters(rules)
+            for sol_address, rules in self._rules(rows).items()
+        }
+        self.logger.info(
+            f"Loaded notification filters of {len(self._compiled)} addresses"
+        )
+
+    async def reload(self, sol_address: str) -> None:
+        """Recompile one address after its subscriptions changed"""
+        rows = await AsyncORM.addresses.get_filter_rules(sol_address)
+        rules = self._rules(rows).get(sol_address)
+        if rules:
+            self._compiled[sol_address] = CompiledFilters(rules)
+        else:
+            self._compiled.pop(sol_address, None)
+
+    def recipients(self, data: Dict[str, Any], chat_ids: List[int]) -> List[int]:
+        """The chat ids of a transaction payload that pass their filters"""
+        compiled = self._compiled.get(data["address"])
+        if compiled is None:
+            return chat_ids
+
+        amount = data.get("amount")
+        blocked = compiled.blocked(
+            None if amount is None else abs(amount),
+            transaction_direction(data),
+            datetime.now(timezone.utc).hour,
+        )
+        if not blocked:
+            return chat_ids
+
+        blocked_set = set(blocked)
+        recipients = [chat_id for chat_id in chat_ids if chat_id not in blocked_set]
+        NOTIFICATIONS_FILTERED.inc(len(chat_ids) - len(recipients))
+        return recipients
+
+
+filter_registry = FilterRegistry()
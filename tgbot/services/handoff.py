@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+from typing import List
+
+from aiogram.types import InlineKeyboardMarkup
+from redis.asyncio.client import Redis
+
+from tgbot.database.orm import batched
+from tgbot.services.log_setup import EventAggregator
+from tgbot.services.metrics import HANDOFF_NOTIFICATIONS
+from tgbot.services.notifier import Notification, Notifier
+
+# notifications a stopping process could not send, replayed by the next one
+HANDOFF_KEY = "notifications:handoff"
+BATCH_SIZE = 500
+# seconds between polls of the hand-off list
+POLL_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+poll_events = EventAggregator(logger)
+
+
+def dump_notification(notification: Notification) -> str:
+    return json.dumps(
+        {
+            "chat_id": notification.chat_id,
+            "text": notification.text,
+            "photo": notification.photo,
+            "disable_notification": notification.disable_notification,
+            "reply_markup": (
+                notification.reply_markup.model_dump(mode="json", exclude_none=True)
+                if notification.reply_markup
+                else None
+            ),
+        }
+    )
+
+
+def load_notification(raw: bytes) -> Notification:
+    data = json.loads(raw)
+    reply_markup = data.get("reply_markup")
+    return Notification(
+        chat_id=data["chat_id"],
+        text=data["text"],
+        photo=data.get("photo"),
+        disable_notification=data.get("disable_notification", False),
+        reply_markup=(
+            InlineKeyboardMarkup.model_validate(reply_markup) if reply_markup else None
+        ),
+    )
+
+
+async def save(redis: Redis, notifications: List[Notification]) -> None:
+    """Append unsent notifications to the hand-off list"""
+    for batch in batched(notifications, BATCH_SIZE):
+        await redis.rpush(HANDOFF_KEY, *map(dump_notification, batch))
+        HANDOFF_NOTIFICATIONS.labels("saved").inc(len(batch))
+
+
+async def replay(redis: Redis, notifier: Notifier) -> int:
+    """
+    Submit the notifications handed off by the previous process.
+
+    Entries are popped in batches, with several replicas each entry is
+    replayed by exactly one of them.
+    """
+    replayed = 0
+    while True:
+        batch = await redis.lpop(HANDOFF_KEY, BATCH_SIZE)
+        if not batch:
+            break
+
+        for i, raw in enumerate(batch):
+            try:
+                notification = load_notification(raw)
+            except (ValueError, KeyError) as e:
+                logger.error(f"Skipping a malformed hand-off entry: {e}")
+                continue
+
+            try:
+                await notifier.submit(notification)
+            except asyncio.CancelledError:
+                # stopped while the queue was full, the rest goes back in order
+                await redis.lpush(HANDOFF_KEY, *reversed(batch[i:]))
+                raise
+            HANDOFF_NOTIFICATIONS.labels("replayed").inc()
+            replayed += 1
+
+    if replayed:
+        logger.info(f"Replayed {replayed} notifications of the previous process")
+    return replayed
+
+
+async def consume(
+    redis: Redis, notifier: Notifier, interval: float = POLL_INTERVAL
+) -> None:
+    """
+    Replay hand-off entries for the life of the process.
+
+    In a rolling deploy the old process may still be draining when the new
+    one starts, so its entries arrive after the first replay finished.
+    """
+    while True:
+        try:
+            await replay(redis, notifier)
+        except Exception as e:
+            poll_events.add(
+                "hand-off polls failed",
+                type(e).__name__,
+                "Failed to replay handed off notifications: %s",
+                e,
+                level=logging.ERROR,
+            )
+        await asyncio.sleep(interval)
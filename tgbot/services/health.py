@@ -0,0 +1,126 @@
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from aiohttp import web
+from sqlalchemy import text
+
+from tgbot.config import Health
+from tgbot.database.orm import AsyncORM
+from tgbot.misc.readiness import readiness
+
+if TYPE_CHECKING:
+    from bot import TgBot
+
+
+@dataclass
+class Check:
+    ok: bool
+    value: Optional[float] = None
+    limit: Optional[float] = None
+    error: Optional[str] = None
+
+
+class HealthChecker:
+    """
+    Liveness and readiness of the bot for the container orchestrator.
+
+    Liveness only fails when the bot cannot recover by itself: the pubsub
+    consumer died or has not polled for `consumer_stall` seconds. Readiness
+    also fails while the bot is overloaded or a dependency is unreachable,
+    it recovers without a restart.
+    """
+
+    def __init__(self, config: Health, bot: "TgBot"):
+        self.config = config
+        self.bot = bot
+
+    def liveness(self) -> Dict[str, Check]:
+        consumer = self.bot.consumer_task
+        if consumer is None:
+            # still starting, the startup steps have their own timeouts
+            return {"consumer": Check(ok=True)}
+        if consumer.done():
+            return {"consumer": Check(ok=False, error="consumer task exited")}
+
+        stalled_for = time.monotonic() - self.bot.consumer_heartbeat
+        return {
+            "consumer": Check(
+                ok=stalled_for <= self.config.consumer_stall,
+                value=stalled_for,
+                limit=self.config.consumer_stall,
+            )
+        }
+
+    async def readiness(self) -> Dict[str, Check]:
+        db, redis = await asyncio.gather(self._probe_db(), self._probe_redis())
+        checks = {"db": db, "redis": redis, **self.liveness()}
+
+        if self.config.max_message_age:
+            last_message_at = self.bot.last_message_at
+            age = time.time() - last_message_at if last_message_at else None
+            checks["pubsub_message_age"] = Check(
+                ok=age is not None and age <= self.config.max_message_age,
+                value=age,
+                limit=self.config.max_message_age,
+            )
+
+        notifier = self.bot.notifier
+        depth = notifier.queue.qsize() if notifier else 0
+        checks["queue_depth"] = Check(
+            ok=depth <= self.config.max_queue_depth,
+            value=depth,
+            limit=self.config.max_queue_depth,
+        )
+
+        lag = self.bot.loop_monitor.last_lag
+        checks["loop_lag"] = Check(
+            ok=lag <= self.config.max_loop_lag,
+            value=lag,
+            limit=self.config.max_loop_lag,
+        )
+        return checks
+
+    async def _probe(self, probe) -> Check:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), self.config.probe_timeout)
+        except Exception as e:
+            return Check(ok=False, error=f"{type(e).__name__}: {e}")
+        return Check(ok=True, value=time.perf_counter() - start)
+
+    async def _probe_db(self) -> Check:
+        if not readiness.is_set("db"):
+            return Check(ok=False, error="migrations are not applied yet")
+
+        async def select_one() -> None:
+            async with AsyncORM.session_factory() as session:
+                await session.execute(text("SELECT 1"))
+
+        return await self._probe(select_one)
+
+    async def _probe_redis(self) -> Check:
+        if self.bot.redis is None:
+            return Check(ok=False, error="not connected")
+        return await self._probe(self.bot.redis.ping)
+
+    @staticmethod
+    def _response(checks: Dict[str, Check]) -> web.Response:
+        failed: List[str] = [name for name, check in checks.items() if not check.ok]
+        body = {
+            "status": "fail" if failed else "ok",
+            "failed": failed,
+            "checks": {name: asdict(check) for name, check in checks.items()},
+        }
+        return web.json_response(body, status=503 if failed else 200)
+
+    async def live_handler(self, request: web.Request) -> web.Response:
+        return self._response(self.liveness())
+
+    async def ready_handler(self, request: web.Request) -> web.Response:
+        return self._response(await self.readiness())
+
+    def register(self, app: web.Application) -> None:
+        app.router.add_get("/health/live", self.live_handler)
+        app.router.add_get("/health/ready", self.ready_handler)
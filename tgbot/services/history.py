@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import html
+from aiogram.types import InlineKeyboardMarkup
+
+from tgbot.config import History
+from tgbot.database.models import Address
+from tgbot.database.orm import AsyncORM
+from tgbot.keyboards.inline import history_menu
+from tgbot.services.log_setup import EventAggregator
+from tgbot.services.metrics import HISTORY_BUFFER, HISTORY_FLUSH_LATENCY, HISTORY_ROWS
+from tgbot.services.tracing import parse_timestamp
+
+# daily partitions created ahead of the current day
+PARTITIONS_AHEAD = 3
+# seconds between partition maintenance runs
+MAINTENANCE_INTERVAL = 3600
+
+# pubsub payload and the time it was received
+PendingTransaction = Tuple[Dict[str, Any], float]
+
+
+def _utc(timestamp: Optional[float]) -> Optional[datetime]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def to_record(data: Dict[str, Any], received_at: float) -> tuple:
+    """Transaction payload as a row in TransactionsRepo.columns order"""
+    return (
+        data["address"],
+        data.get("signature") or "",
+        data.get("slot_number") or 0,
+        _utc(parse_timestamp(data.get("timestamp"))),
+        data.get("from_addr"),
+        data.get("to_addr"),
+        data.get("amount"),
+        _utc(received_at),
+    )
+
+
+class HistoryWriter:
+    """
+    Write-behind buffer of the transaction history.
+
+    `add` only appends to a list, so the pubsub consumer never waits for the
+    database. A background task writes the buffer with one COPY once it holds
+    `batch_size` rows or `flush_ms` passed. Failed batches are retried, the
+    buffer is capped at `max_pending` rows and drops the oldest beyond that.
+    """
+
+    def __init__(self, config: History, max_pending: int = 100_000):
+        self.config = config
+        self.max_pending = max_pending
+        self.logger = logging.getLogger(__name__)
+        self.events = EventAggregator(self.logger)
+        self._pending: List[PendingTransaction] = []
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+        HISTORY_BUFFER.set_function(lambda: len(self._pending))
+
+    def add(self, data: Dict[str, Any], received_at: float) -> None:
+        if not self.config.enabled:
+            return
+
+        self._pending.append((data, received_at))
+        if len(self._pending) > self.max_pending:
+            dropped = len(self._pending) - self.max_pending
+            del self._pending[:dropped]
+            HISTORY_ROWS.labels("dropped").inc(dropped)
+            self.events.add(
+                "history rows dropped",
+                "buffer full",
+                "History buffer is full, dropping the oldest rows",
+            )
+        if len(self._pending) >= self.config.batch_size:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        """Create the table and partitions, then start the writer tasks"""
+        if not self.config.enabled:
+            return
+
+        await AsyncORM.transactions.ensure_schema()
+        await self.maintain_partitions()
+        self._tasks = [
+            asyncio.create_task(self._flush_loop(), name="history:flush"),
+            asyncio.create_task(self._maintenance_loop(), name="history:maintenance"),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        try:
+            await self.flush()
+        except Exception as e:
+            self.logger.error(
+                f"Failed to write {len(self._pending)} history rows on stop: {e}"
+            )
+
+    async def flush(self) -> None:
+        while self._pending:
+            batch = self._pending[: self.config.batch_size]
+            del self._pending[: len(batch)]
+            records = [to_record(data, received_at) for data, received_at in batch]
+
+            start = time.perf_counter()
+            try:
+                await AsyncORM.transactions.copy_rows(records)
+            except Exception:
+                # back in front of the rows added meanwhile, retried next flush
+                self._pending[:0] = batch
+                raise
+            HISTORY_FLUSH_LATENCY.observe(time.perf_counter() - start)
+            HISTORY_ROWS.labels("written").inc(len(batch))
+
+    async def _flush_loop(self) -> None:
+        interval = self.config.flush_ms / 1000
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                self.events.add(
+                    "history flushes failed",
+                    type(e).__name__,
+                    "Failed to write the transaction history: %s",
+                    e,
+                )
+                await asyncio.sleep(interval)
+
+    async def maintain_partitions(self) -> None:
+        today = datetime.now(timezone.utc).date()
+        await AsyncORM.transactions.ensure_partitions(today, PARTITIONS_AHEAD)
+
+        dropped = await AsyncORM.transactions.drop_partitions_before(
+            today - timedelta(days=self.config.retention_days)
+        )
+        for name in dropped:
+            self.logger.info(f"Dropped history partition {name}")
+
+    async def _maintenance_loop(self) -> None:
+        while True:
+            await asyncio.sleep(MAINTENANCE_INTERVAL)
+            try:
+                await self.maintain_partitions()
+            except Exception as e:
+                self.logger.error(f"History partition maintenance failed: {e}")
+
+
+HISTORY_PAGE_SIZE = 10
+
+
+async def render_history_page(
+    address: Address, before: Optional[Tuple[int, int]] = None
+) -> Tuple[str, InlineKeyboardMarkup]:
+    rows = await AsyncORM.transactions.get_page(
+        address.sol_address, before, limit=HISTORY_PAGE_SIZE + 1
+    )
+    next_cursor = None
+    if len(rows) > HISTORY_PAGE_SIZE:
+        rows = rows[:HISTORY_PAGE_SIZE]
+        next_cursor = (rows[-1].slot, rows[-1].id)
+
+    lines = []
+    for row in rows:
+        when = f"{row.block_time:%Y-%m-%d %H:%M} UTC" if row.block_time else "-"
+        amount = f", {row.amount:g} SOL" if row.amount else ""
+        lines.append(
+            f'<a href="https://solscan.io/tx/{row.signature}">'
+            f"{row.signature[:8]}…</a> slot <code>{row.slot}</code>\n"
+            f"└─{when}{amount}"
+        )
+
+    text = (
+        f"📜<b>{html.quote(address.name)}</b>\n<code>{address.sol_address}</code>\n\n"
+    )
+    text += "\n".join(lines) if lines else "No transactions yet"
+    return text, history_menu(address.id, next_cursor, before is None)
@@ -0,0 +1,311 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+
+from aiogram import Bot, exceptions, html
+
+from tgbot.database.orm import AsyncORM
+from tgbot.services.metrics import LIVE_DASHBOARD_EDITS
+
+NOTIFY_MESSAGES = "messages"
+NOTIFY_LIVE = "live"
+
+# transactions kept per chat, the dashboard shows the last hour of them
+MAX_EVENTS = 200
+WINDOW = 3600
+LATEST_SHOWN = 8
+ADDRESSES_SHOWN = 10
+
+# errors of an edit meaning the message has to be sent again
+_GONE_ERRORS = ("message to edit not found", "message can't be edited")
+
+
+@dataclass(frozen=True)
+class LiveEvent:
+    at: float
+    address: str
+    signature: Optional[str]
+    amount: float
+    # 1 received, -1 sent, 0 unknown
+    sign: int
+    token_amount: Optional[float] = None
+    token_symbol: Optional[str] = None
+
+    @classmethod
+    def from_payload(cls, data: dict, at: Optional[float] = None) -> "LiveEvent":
+        address = data["address"]
+        if data.get("to_addr") == address:
+            sign = 1
+        elif data.get("from_addr") == address:
+            sign = -1
+        else:
+            sign = 0
+        return cls(
+            at=time.time() if at is None else at,
+            address=address,
+            signature=data.get("signature"),
+            amount=abs(data.get("amount") or 0.0),
+            sign=sign,
+            token_amount=data.get("token_amount"),
+            token_symbol=data.get("token_symbol"),
+        )
+
+
+def _short(address: str) -> str:
+    return f"{address[:4]}…{address[-4:]}"
+
+
+def _amount(event: LiveEvent) -> str:
+    parts = []
+    if event.amount:
+        sign = {1: "+", -1: "-"}.get(event.sign, "")
+        parts.append(f"{sign}{event.amount:g} SOL")
+    if event.token_amount:
+        parts.append(f"{event.token_amount:+g} {html.quote(str(event.token_symbol))}")
+    return ", ".join(parts) or "-"
+
+
+def render_dashboard(events: List[LiveEvent], now: float) -> str:
+    """Dashboard text of a chat, only depends on the events of the last hour"""
+    recent = [event for event in events if event.at >= now - WINDOW]
+    text = "📊<b>Live activity</b>, last hour\n"
+    if not recent:
+        return text + "\nNo transactions yet"
+
+    counts: Dict[str, int] = {}
+    volume: Dict[str, float] = {}
+    for event in recent:
+        counts[event.address] = counts.get(event.address, 0) + 1
+        volume[event.address] = volume.get(event.address, 0.0) + event.amount
+
+    addresses = sorted(counts, key=counts.get, reverse=True)[:ADDRESSES_SHOWN]
+    text += f"\n<b>Addresses</b> ({len(counts)})\n"
+    for i, address in enumerate(addresses, 1):
+        branch = "└" if i == len(addresses) else "├"
+        text += (
+            f"{branch}─<code>{_short(address)}</code> — {counts[address]} tx, "
+            f"<b>{volume[address]:g} SOL</b>\n"
+        )
+
+    latest = recent[-LATEST_SHOWN:]
+    text += "\n<b>Latest</b>\n"
+    for event in reversed(latest):
+        at = datetime.fromtimestamp(event.at, timezone.utc)
+        line = f"{at:%H:%M:%S} <code>{_short(event.address)}</code> {_amount(event)}"
+        if event.signature:
+            line += f' <a href="https://solscan.io/tx/{event.signature}">tx</a>'
+        text += line + "\n"
+    return text.rstrip()
+
+
+@dataclass
+class ChatDashboard:
+    chat_id: int
+    message_id: Optional[int]
+    events: Deque[LiveEvent] = field(default_factory=lambda: deque(maxlen=MAX_EVENTS))
+    # what the message shows now, an identical render is not sent
+    text: Optional[str] = None
+    edited_at: float = 0.0
+    # set by every new event, cleared when a refresh starts rendering
+    dirty: bool = False
+    task: Optional[asyncio.Task] = None
+
+
+class LiveDashboard:
+    """
+    One pinned message per chat in the live mode, edited in place.
+
+    Transactions only update the chat's state, a refresh task per chat
+    renders it at most once per `refresh_interval` seconds, so any number
+    of transactions costs a chat at most 60 / refresh_interval edits a
+    minute. A render equal to what the message shows is not sent. When the
+    message was deleted it is sent and pinned again.
+    """
+
+    def __init__(self, refresh_interval: float = 5.0):
+        self.refresh_interval = refresh_interval
+        self.bot: Optional[Bot] = None
+        # the stored transaction history fills the boards after a restart
+        self.seed_from_history = False
+        self.logger = logging.getLogger(__name__)
+        self._boards: Dict[int, ChatDashboard] = {}
+
+    def setup(self, bot: Bot, refresh_interval: float, seed_from_history: bool) -> None:
+        self.bot = bot
+        self.refresh_interval = refresh_interval
+        self.seed_from_history = seed_from_history
+
+    async def load(self) -> None:
+        users = await AsyncORM.users.get_all(notify_mode=NOTIFY_LIVE)
+        for user in users:
+            self._boards[user.id] = ChatDashboard(user.id, user.live_message_id)
+        if self.seed_from_history and self._boards:
+            await self._seed()
+        self.logger.info(f"Loaded {len(users)} live dashboards")
+
+    async def _seed(self) -> None:
+        """
+        Fill the boards with the last hour of the stored history.
+
+        Otherwise the first edit after a restart would replace the pinned
+        hour with the few transactions received since the start.
+        """
+        chat_ids: Dict[str, List[int]] = defaultdict(list)
+        rows = await AsyncORM.addresses.get_subscriptions(list(self._boards))
+        for user_id, sol_address in rows:
+            chat_ids[sol_address].append(user_id)
+        if not chat_ids:
+            return
+
+        since = datetime.fromtimestamp(time.time() - WINDOW, timezone.utc)
+        rows = await AsyncORM.transactions.get_since(list(chat_ids), since)
+        for row in rows:
+            event = LiveEvent.from_payload(row._asdict(), row.received_at.timestamp())
+            for chat_id in chat_ids[row.address]:
+                self._boards[chat_id].events.append(event)
+        self.logger.info(f"Seeded the live dashboards with {len(rows)} transactions")
+
+    async def stop(self) -> None:
+        # pending refreshes are dropped, the messages keep their last state
+        tasks = [board.task for board in self._boards.values() if board.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def split(self, data: dict, chat_ids: List[int]) -> List[int]:
+        """Record the transaction for the live chats, returns the other chat ids"""
+        if not self._boards:
+            return chat_ids
+
+        event = None
+        others = []
+        for chat_id in chat_ids:
+            board = self._boards.get(chat_id)
+            if board is None:
+                others.append(chat_id)
+                continue
+            event = event or LiveEvent.from_payload(data)
+            self.add(board, event)
+        return others
+
+    def add(self, board: ChatDashboard, event: LiveEvent) -> None:
+        if event.signature and any(
+            known.signature == event.signature for known in board.events
+        ):
+            return
+        board.events.append(event)
+        board.dirty = True
+        if board.task is None:
+            board.task = asyncio.create_task(
+                self._refresh(board), name=f"live_dashboard:{board.chat_id}"
+            )
+
+    async def _refresh(self, board: ChatDashboard) -> None:
+        """
+        Merges everything that arrives until the next allowed edit.
+
+        A failed edit is retried after `refresh_interval`, otherwise the
+        message would stay stale until the next transaction of the chat.
+        """
+        try:
+            while board.dirty:
+                delay = board.edited_at + self.refresh_interval - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                board.dirty = False
+                try:
+                    await self._edit(board)
+                except Exception as e:
+                    LIVE_DASHBOARD_EDITS.labels("error").inc()
+                    self.logger.error(
+                        f"Failed to refresh the dashboard of {board.chat_id}, "
+                        f"retrying in {self.refresh_interval}s: {e}"
+                    )
+                    board.edited_at = time.monotonic()
+                    board.dirty = True
+        finally:
+            board.task = None
+
+    async def _edit(self, board: ChatDashboard) -> None:
+        text = render_dashboard(list(board.events), time.time())
+        board.edited_at = time.monotonic()
+        if text == board.text:
+            LIVE_DASHBOARD_EDITS.labels("unchanged").inc()
+            return
+
+        if board.message_id is None:
+            await self._recreate(board, text)
+            return
+
+        try:
+            await self.bot.edit_message_text(
+                text,
+                chat_id=board.chat_id,
+                message_id=board.message_id,
+                disable_web_page_preview=True,
+            )
+        except exceptions.TelegramRetryAfter as e:
+            LIVE_DASHBOARD_EDITS.labels("retry").inc()
+            # the next refresh waits out the flood limit
+            board.edited_at = time.monotonic() + e.retry_after - self.refresh_interval
+            board.dirty = True
+            return
+        except exceptions.TelegramForbiddenError:
+            # blocked by the user, the mode comes back with the next restart
+            LIVE_DASHBOARD_EDITS.labels("forbidden").inc()
+            self._boards.pop(board.chat_id, None)
+            return
+        except exceptions.TelegramBadRequest as e:
+            if "message is not modified" in e.message:
+                LIVE_DASHBOARD_EDITS.labels("unchanged").inc()
+            elif any(error in e.message for error in _GONE_ERRORS):
+                await self._recreate(board, text)
+                return
+            else:
+                raise
+        else:
+            LIVE_DASHBOARD_EDITS.labels("ok").inc()
+        board.text = text
+
+    async def _recreate(self, board: ChatDashboard, text: str) -> None:
+        """Send and pin a new dashboard message, the user deleted the old one"""
+        message = await self.bot.send_message(
+            board.chat_id, text, disable_web_page_preview=True
+        )
+        try:
+            await self.bot.pin_chat_message(
+                board.chat_id, message.message_id, disable_notification=True
+            )
+        except exceptions.TelegramAPIError as e:
+            self.logger.warning(f"Failed to pin the dashboard of {board.chat_id}: {e}")
+
+        board.message_id = message.message_id
+        board.text = text
+        LIVE_DASHBOARD_EDITS.labels("recreated").inc()
+        await AsyncORM.users.update(board.chat_id, live_message_id=message.message_id)
+
+    async def enable(self, chat_id: int) -> None:
+        board = self._boards.get(chat_id) or ChatDashboard(chat_id, None)
+        await self._recreate(board, render_dashboard(list(board.events), time.time()))
+        await AsyncORM.users.update(chat_id, notify_mode=NOTIFY_LIVE)
+        self._boards[chat_id] = board
+
+    async def disable(self, chat_id: int) -> None:
+        board = self._boards.pop(chat_id, None)
+        if board and board.task:
+            board.task.cancel()
+        if board and board.message_id:
+            try:
+                await self.bot.unpin_chat_message(chat_id, message_id=board.message_id)
+            except exceptions.TelegramAPIError:
+                pass
+        await AsyncORM.users.update(
+            chat_id, notify_mode=NOTIFY_MESSAGES, live_message_id=None
+        )
+
+
+live_dashboard = LiveDashboard()
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import logging
+import time
+import weakref
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Any, Dict, Optional, Tuple
+
+import betterlogging as bl
+
+LOG_FORMAT = (
+    "%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s"
+)
+
+# attributes every LogRecord has, everything else came in through `extra`
+_RECORD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__.keys()) | {
+    "message",
+    "asctime",
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """One json object per line, `extra` fields are added as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "source": f"{record.filename}:{record.lineno}",
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def setup_logging(
+    level: int = logging.INFO, json_output: bool = False
+) -> QueueListener:
+    """
+    Configure the root logger to only enqueue records.
+
+    The real handlers are owned by a listener thread, so slow log output never
+    blocks the event loop. The returned listener must be stopped on exit to
+    flush the remaining records.
+    """
+    root = logging.getLogger()
+
+    if json_output:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter())
+        handlers = [handler]
+    else:
+        bl.basic_colorized_config(level=level)
+        logging.basicConfig(level=level, format=LOG_FORMAT)
+        handlers = list(root.handlers)
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    log_queue: SimpleQueue = SimpleQueue()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class EventAggregator:
+    """
+    Rate limited logging for repetitive per-recipient events.
+
+    The first occurrence of an (event, reason) pair in a window is logged in
+    full, the rest are only counted and reported as one summary line per
+    window, e.g. "57 sends failed with TelegramForbiddenError in the last 10s".
+    The message uses logging %-style args, so it is only formatted when logged.
+    """
+
+    _instances: "weakref.WeakSet[EventAggregator]" = weakref.WeakSet()
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        window: float = 10.0,
+        level: int = logging.WARNING,
+    ):
+        self.logger = logger
+        self.window = window
+        self.level = level
+        self.counts: Dict[Tuple[str, str], int] = Counter()
+        self._window_start = time.monotonic()
+        EventAggregator._instances.add(self)
+
+    def add(
+        self,
+        event: str,
+        reason: str,
+        msg: Optional[str] = None,
+        *args: Any,
+        level: Optional[int] = None,
+    ) -> None:
+        key = (event, reason)
+        self.counts[key] += 1
+        if self.counts[key] == 1 and msg:
+            self.logger.log(
+                level or self.level,
+                msg,
+                *args,
+                extra={"event": event, "reason": reason, "sampled": True},
+            )
+
+        if time.monotonic() - self._window_start >= self.window:
+            self.flush()
+
+    def flush(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        self._window_start = now
+
+        counts, self.counts = self.counts, Counter()
+        for (event, reason), count in counts.items():
+            if reason == "ok":
+                level, summary = logging.INFO, f"{count} {event}"
+            else:
+                level, summary = self.level, f"{count} {event} with {reason}"
+
+            self.logger.log(
+                level,
+                f"{summary} in the last {elapsed:.0f}s",
+                extra={"event": event, "reason": reason, "count": count},
+            )
+
+    @classmethod
+    def flush_all(cls) -> None:
+        for aggregator in list(cls._instances):
+            if aggregator.counts:
+                aggregator.flush()
+
+
+async def flush_aggregators(interval: float = 10.0) -> None:
+    """Report aggregated events even when no new events arrive"""
+    while True:
+        await asyncio.sleep(interval)
+        EventAggregator.flush_all()
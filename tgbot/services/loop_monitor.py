@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from tgbot.services.metrics import EVENT_LOOP_LAG
+
+
+def install_uvloop() -> bool:
+    """Use uvloop for the event loops created from now on, returns success"""
+    try:
+        import uvloop
+    except ImportError:
+        logging.warning("uvloop is not installed, using the default event loop")
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logging.info("Using uvloop event loop")
+    return True
+
+
+class LoopLagMonitor:
+    """
+    Samples the event loop lag and reports stalls.
+
+    A task sleeps for `interval` and measures how late it wakes up. A watchdog
+    thread checks the heartbeat of that task and, when the loop has been blocked
+    for longer than `threshold`, logs the stack of the loop thread so the
+    blocking callback can be found.
+    """
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.25):
+        self.interval = interval
+        self.threshold = threshold
+        self.last_lag = 0.0
+        self.logger = logging.getLogger(__name__)
+
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stopped = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample(), name="loop_lag_monitor")
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop_lag_watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0)
+
+            self.last_lag = lag
+            self._heartbeat = time.monotonic()
+            EVENT_LOOP_LAG.observe(lag)
+
+            if lag > self.threshold:
+                self.logger.warning(f"Event loop was blocked for {lag:.3f} s")
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while not self._stopped.wait(self.threshold / 4):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for <= self.threshold or heartbeat == reported_heartbeat:
+                continue
+
+            # report every stall once, with the stack that is blocking the loop
+            reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            stack = "".join(traceback.format_stack(frame))
+            self.logger.warning(
+                f"Event loop blocked for more than {stalled_for:.3f} s, loop thread stack:\n{stack}"
+            )
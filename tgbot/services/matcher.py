@@ -0,0 +1,75 @@
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+
+class MultiPatternMatcher:
+    """
+    Finds which of many substrings occur in a text in one pass.
+
+    An Aho-Corasick automaton replaces `for p in patterns: if p in text` scans,
+    so the cost per text no longer grows with the number of patterns. A
+    compiled alternation of all patterns is used as a C-speed prefilter, most
+    texts match nothing and never reach the Python automaton loop.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: Tuple[str, ...] = tuple(sorted({p for p in patterns if p}))
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        self._prefilter: Optional[Pattern[str]] = None
+
+        if self.patterns:
+            self._build()
+            self._prefilter = re.compile(
+                "|".join(
+                    re.escape(p) for p in sorted(self.patterns, key=len, reverse=True)
+                )
+            )
+
+    def _build(self) -> None:
+        for pattern in self.patterns:
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] = self._out[state] + (pattern,)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+
+                self._fail[next_state] = fail
+                self._out[next_state] = self._out[next_state] + self._out[fail]
+
+    def find_all(self, text: str) -> Tuple[str, ...]:
+        """All patterns that occur in the text, each reported once"""
+        if self._prefilter is None or not self._prefilter.search(text):
+            return ()
+
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+
+        return tuple(found)
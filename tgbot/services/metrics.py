@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from redis import asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+NAMESPACE = "tracker_bot"
+
+# seconds, from a cache hit to a slow Telegram call
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+# Updates
+UPDATE_LATENCY = Histogram(
+    "update_handling_seconds",
+    "Time spent in a handler per router",
+    ["router", "handler"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+UPDATE_ERRORS = Counter(
+    "update_errors_total",
+    "The total number of handler errors",
+    ["router", "handler", "error_type"],
+    namespace=NAMESPACE,
+)
+MIDDLEWARE_LATENCY = Histogram(
+    "middleware_seconds",
+    "Own time of a middleware pipeline stage",
+    ["middleware"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+MIDDLEWARE_REJECTED = Counter(
+    "middleware_rejected_total",
+    "Updates dropped by a middleware pipeline stage",
+    ["middleware"],
+    namespace=NAMESPACE,
+)
+
+# Telegram API
+TELEGRAM_API_LATENCY = Histogram(
+    "telegram_api_seconds",
+    "Telegram Bot API call latency",
+    ["method"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+TELEGRAM_API_ERRORS = Counter(
+    "telegram_api_errors_total",
+    "The total number of failed Telegram Bot API calls",
+    ["method", "error_type"],
+    namespace=NAMESPACE,
+)
+
+TELEGRAM_POOL_CONNECTIONS = Counter(
+    "telegram_pool_connections_total",
+    "Connections to the Bot API server taken from the session pool",
+    ["event"],
+    namespace=NAMESPACE,
+)
+TELEGRAM_POOL_WAIT = Histogram(
+    "telegram_pool_wait_seconds",
+    "Time a Bot API request waited for a free pooled connection",
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+TELEGRAM_POOL_IN_USE = Gauge(
+    "telegram_pool_connections_in_use",
+    "Bot API connections currently serving a request",
+    namespace=NAMESPACE,
+)
+TELEGRAM_POOL_IDLE = Gauge(
+    "telegram_pool_connections_idle",
+    "Bot API keep-alive connections waiting for a request",
+    namespace=NAMESPACE,
+)
+
+# Notifications
+PUBSUB_MESSAGES = Counter(
+    "pubsub_messages_total",
+    "The total number of messages received from pubsub",
+    ["channel"],
+    namespace=NAMESPACE,
+)
+NOTIFICATION_QUEUE_DEPTH = Gauge(
+    "notification_queue_depth",
+    "The number of notifications waiting to be sent",
+    namespace=NAMESPACE,
+)
+NOTIFICATIONS_SENT = Counter(
+    "notifications_sent_total",
+    "The total number of notification send attempts",
+    ["status"],
+    namespace=NAMESPACE,
+)
+NOTIFICATIONS_FILTERED = Counter(
+    "notifications_filtered_total",
+    "The total number of notifications skipped by subscriber filters",
+    namespace=NAMESPACE,
+)
+LIVE_DASHBOARD_EDITS = Counter(
+    "live_dashboard_edits_total",
+    "Refreshes of live dashboard messages by outcome",
+    ["status"],
+    namespace=NAMESPACE,
+)
+HANDOFF_NOTIFICATIONS = Counter(
+    "handoff_notifications_total",
+    "Notifications handed off on shutdown and replayed on startup",
+    ["operation"],
+    namespace=NAMESPACE,
+)
+NOTIFICATION_LATENCY = Histogram(
+    "notification_latency_seconds",
+    "Notification latency per pipeline stage, total is tracker publish to delivery",
+    ["stage"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS + (30, 60),
+)
+
+# Runtime
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop wakes up a sleeping task",
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+
+# Storage
+DB_SESSION_LATENCY = Histogram(
+    "db_session_seconds",
+    "Lifetime of a database session",
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+DB_READS = Counter(
+    "db_reads_total",
+    "Repository reads by the database that served them",
+    ["target"],
+    namespace=NAMESPACE,
+)
+DB_REPLICA_FAILURES = Counter(
+    "db_replica_failures_total",
+    "Reads a replica failed and the primary served instead",
+    ["replica"],
+    namespace=NAMESPACE,
+)
+REDIS_LATENCY = Histogram(
+    "redis_ping_seconds",
+    "Redis round-trip time",
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+REDIS_ERRORS = Counter(
+    "redis_errors_total",
+    "The total number of Redis errors",
+    ["operation"],
+    namespace=NAMESPACE,
+)
+
+HISTORY_ROWS = Counter(
+    "history_rows_total",
+    "The total number of transaction history rows",
+    ["status"],
+    namespace=NAMESPACE,
+)
+HISTORY_BUFFER = Gauge(
+    "history_buffer_rows",
+    "The number of history rows waiting to be written",
+    namespace=NAMESPACE,
+)
+HISTORY_FLUSH_LATENCY = Histogram(
+    "history_flush_seconds",
+    "Time to COPY one batch of history rows",
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+
+
+# Solana RPC
+RPC_LATENCY = Histogram(
+    "solana_rpc_seconds",
+    "Solana JSON-RPC request latency, a batch counts as one request",
+    ["method"],
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+RPC_BATCH_SIZE = Histogram(
+    "solana_rpc_batch_size",
+    "Calls per Solana JSON-RPC batch request",
+    ["method"],
+    namespace=NAMESPACE,
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250),
+)
+ENRICHMENT_RESULTS = Counter(
+    "enrichment_results_total",
+    "Transaction enrichment outcomes",
+    ["status"],
+    namespace=NAMESPACE,
+)
+
+TOKEN_METADATA_LOOKUPS = Counter(
+    "token_metadata_lookups_total",
+    "Token metadata lookups by the tier that answered",
+    ["tier"],
+    namespace=NAMESPACE,
+)
+TOKEN_METADATA_FETCH_LATENCY = Histogram(
+    "token_metadata_fetch_seconds",
+    "Time to fetch a batch of mint accounts from the RPC",
+    namespace=NAMESPACE,
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def count_db_read(target: str) -> None:
+    DB_READS.labels(target).inc()
+
+
+def count_replica_failure(replica: str) -> None:
+    DB_REPLICA_FAILURES.labels(replica).inc()
+
+
+class TimedAsyncSession(AsyncSession):
+    """AsyncSession that records its lifetime when used as a context manager"""
+
+    async def __aenter__(self):
+        self._opened_at = time.perf_counter()
+        return await super().__aenter__()
+
+    async def __aexit__(self, type_, value, traceback):
+        try:
+            await super().__aexit__(type_, value, traceback)
+        finally:
+            DB_SESSION_LATENCY.observe(time.perf_counter() - self._opened_at)
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        body=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST}
+    )
+
+
+async def probe_redis(redis: aioredis.Redis, interval: float = 5) -> None:
+    """Periodically measures the Redis round-trip time"""
+    while True:
+        start = time.perf_counter()
+        try:
+            await redis.ping()
+        except Exception as e:
+            REDIS_ERRORS.labels("ping").inc()
+            logging.error(f"Redis ping failed: {e}")
+        else:
+            REDIS_LATENCY.observe(time.perf_counter() - start)
+
+        await asyncio.sleep(interval)
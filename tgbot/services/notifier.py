@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram import exceptions
+from aiogram.types import InlineKeyboardMarkup
+
+from tgbot.services.log_setup import EventAggregator
+from tgbot.services.metrics import NOTIFICATION_QUEUE_DEPTH, NOTIFICATIONS_SENT
+from tgbot.services.tracing import Trace
+
+
+@dataclass
+class Notification:
+    chat_id: int
+    text: str
+    trace: Optional[Trace] = None
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    # broadcasts, the text is the caption of the photo
+    photo: Optional[str] = None
+    disable_notification: bool = False
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+
+
+class Notifier:
+    """Queue of outgoing notifications drained by a pool of sender workers"""
+
+    def __init__(
+        self,
+        bot: Bot,
+        workers: int = 8,
+        maxsize: int = 10000,
+        max_attempts: int = 5,
+    ):
+        self.bot = bot
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.queue: asyncio.Queue[Notification] = asyncio.Queue(maxsize)
+        self.logger = logging.getLogger(__name__)
+        self.events = EventAggregator(self.logger)
+        self._tasks: List[asyncio.Task] = []
+        # notification being sent per worker, handed off when a drain times out
+        self._sending: Dict[int, Notification] = {}
+
+        NOTIFICATION_QUEUE_DEPTH.set_function(self.queue.qsize)
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            self._tasks.append(
+                asyncio.create_task(self._worker(), name=f"notifier:{i}")
+            )
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def submit(self, notification: Notification) -> None:
+        """Enqueue a notification, waits while the queue is full"""
+        await self.queue.put(notification)
+
+    async def drain(self, timeout: float) -> List[Notification]:
+        """
+        Send what is queued for up to `timeout` seconds, then stop the workers.
+
+        Returns the notifications that were not sent, including the ones
+        interrupted mid-send, which may therefore be delivered twice.
+        """
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        left = list(self._sending.values())
+        await self.stop()
+        while not self.queue.empty():
+            left.append(self.queue.get_nowait())
+            self.queue.task_done()
+        return left
+
+    async def _worker(self) -> None:
+        worker = id(asyncio.current_task())
+        while True:
+            notification = await self.queue.get()
+            if notification.trace:
+                notification.trace.span(
+                    "queue_wait", time.perf_counter() - notification.enqueued_at
+                )
+            self._sending[worker] = notification
+            try:
+                await self._send(notification)
+            finally:
+                del self._sending[worker]
+                self.queue.task_done()
+
+    async def _send(self, notification: Notification) -> None:
+        trace = notification.trace
+        for _ in range(self.max_attempts):
+            start = time.perf_counter()
+            try:
+                if notification.photo:
+                    await self.bot.send_photo(
+                        chat_id=notification.chat_id,
+                        photo=notification.photo,
+                        caption=notification.text,
+                        disable_notification=notification.disable_notification,
+                        reply_markup=notification.reply_markup,
+                    )
+                else:
+                    await self.bot.send_message(
+                        chat_id=notification.chat_id,
+                        text=notification.text,
+                        disable_web_page_preview=True,
+                        disable_notification=notification.disable_notification,
+                        reply_markup=notification.reply_markup,
+                    )
+            except exceptions.TelegramRetryAfter as e:
+                NOTIFICATIONS_SENT.labels("retry").inc()
+                self.events.add(
+                    "sends throttled",
+                    "TelegramRetryAfter",
+                    "Flood limit is exceeded. Sleep %s seconds.",
+                    e.retry_after,
+                )
+                await asyncio.sleep(e.retry_after)
+                continue
+            except Exception as e:
+                NOTIFICATIONS_SENT.labels("error").inc()
+                self.events.add(
+                    "sends failed",
+                    type(e).__name__,
+                    "Error sending notification to %s (trace %s): %s",
+                    notification.chat_id,
+                    trace.trace_id if trace else "-",
+                    e,
+                )
+                return
+            else:
+                NOTIFICATIONS_SENT.labels("ok").inc()
+                if trace:
+                    trace.span("telegram", time.perf_counter() - start)
+                    trace.delivered()
+                return
+
+        NOTIFICATIONS_SENT.labels("dropped").inc()
+        self.events.add(
+            "notifications dropped",
+            "TelegramRetryAfter",
+            "Notification for %s dropped after %s attempts",
+            notification.chat_id,
+            self.max_attempts,
+        )
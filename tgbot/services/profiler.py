@@ -0,0 +1,224 @@
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from types import CodeType, FrameType
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from aiogram import Router
+
+# samples per second, each one walks the stacks of every task of the loop
+SAMPLE_INTERVAL = 0.01
+# the command waits for the profile, keep it under the webhook timeout
+MAX_DURATION = 60
+# GIL switch interval while profiling, with the default 5ms the sampler
+# mostly gets the GIL when the loop blocks and misses shorter CPU bursts
+SWITCH_INTERVAL = 0.0002
+
+# the project root, frames under it are shown relative to it
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+AWAIT_FRAME = "[await]"
+IDLE_FRAME = "[loop]"
+
+
+def handler_labels(routers: Iterable[Router]) -> Dict[CodeType, str]:
+    """`router:handler` of every handler callback of the router trees by its code"""
+    labels = {}
+    for router in routers:
+        for child in router.chain_tail:
+            for observer in child.observers.values():
+                for handler in observer.handlers:
+                    code = getattr(handler.callback, "__code__", None)
+                    if code is not None:
+                        labels[code] = f"{child.name}:{handler.callback.__name__}"
+    return labels
+
+
+def _coroutine_frames(coro) -> List[FrameType]:
+    """Frames of a coroutine and of everything it awaits, outermost first"""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            frame = getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = (
+            getattr(coro, "cr_await", None)
+            or getattr(coro, "ag_await", None)
+            or getattr(coro, "gi_yieldfrom", None)
+        )
+    return frames
+
+
+def _thread_frames(frame: Optional[FrameType]) -> List[FrameType]:
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+@dataclass
+class Profile:
+    duration: float
+    interval: float
+    ticks: int = 0
+    # collapsed stack -> samples, the first frame is the handler or the task
+    stacks: Counter = field(default_factory=Counter)
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format, the input of flamegraph.pl and speedscope"""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+    def roots(self, n: int = 10) -> List[Tuple[str, int]]:
+        """Handlers and tasks by wall-clock samples"""
+        counts = Counter()
+        for stack, count in self.stacks.items():
+            counts[stack.split(";", 1)[0]] += count
+        return counts.most_common(n)
+
+    def top(self, n: int = 10) -> List[Tuple[str, int, int]]:
+        """(function, self, total) of the functions the loop spent its time in"""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames or frames[-1] == AWAIT_FRAME:
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        return [(name, count, total[name]) for name, count in own.most_common(n)]
+
+
+class LoopProfiler:
+    """
+    Wall-clock sampling profiler of the running event loop.
+
+    A thread wakes up every `interval` seconds and records the stack of
+    every task, coroutines waiting on an await included, and what the loop
+    thread itself is executing. Stacks are rooted at the handler of
+    `routers_list` they run in, otherwise at the task. Nothing is installed
+    while no profile is running.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self._names: Dict[CodeType, str] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _name(self, code: CodeType) -> str:
+        name = self._names.get(code)
+        if name is None:
+            path = code.co_filename
+            if "site-packages" in path:
+                path = path.split("site-packages" + os.sep, 1)[-1]
+            elif path.startswith(ROOT):
+                path = os.path.relpath(path, ROOT)
+            name = self._names[code] = f"{code.co_qualname} ({path})"
+        return name
+
+    def _collapse(
+        self, root: str, frames: Iterable[FrameType], handlers: Dict[CodeType, str]
+    ) -> str:
+        names = []
+        for frame in frames:
+            root = handlers.get(frame.f_code, root)
+            names.append(self._name(frame.f_code))
+        return ";".join([root, *names])
+
+    def _sample(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        thread_id: int,
+        handlers: Dict[CodeType, str],
+        skip: Optional[asyncio.Task],
+        profile: Profile,
+    ) -> None:
+        running = _thread_frames(sys._current_frames().get(thread_id))
+        positions = {id(frame): i for i, frame in enumerate(running)}
+        try:
+            tasks = asyncio.all_tasks(loop)
+        except RuntimeError:
+            # the task set kept changing while it was copied, skip the tick
+            return
+
+        busy = False
+        for task in tasks:
+            if task is skip:
+                continue
+            frames = _coroutine_frames(task.get_coro())
+            if not frames:
+                continue
+
+            position = positions.get(id(frames[-1]))
+            waiting = position is None
+            if not waiting:
+                # the running task, with the plain functions it called
+                frames += running[position + 1 :]
+                busy = True
+
+            name = task.get_name()
+            if name.startswith("Task-"):
+                name = task.get_coro().__qualname__
+            stack = self._collapse(f"task:{name}", frames, handlers)
+            if waiting:
+                stack += f";{AWAIT_FRAME}"
+            profile.stacks[stack] += 1
+
+        if not busy and running:
+            # callbacks outside of tasks or waiting for IO in the selector
+            profile.stacks[self._collapse(IDLE_FRAME, running, handlers)] += 1
+        profile.ticks += 1
+
+    def _run(self, stop: threading.Event, *args) -> None:
+        # jittered, a fixed period locks onto periodic work and sees one phase of it
+        while not stop.wait(self.interval * random.uniform(0.5, 1.5)):
+            self._sample(*args)
+
+    async def profile(self, duration: float, routers: Iterable[Router]) -> Profile:
+        """Sample the loop for `duration` seconds, one profile at a time"""
+        duration = min(duration, MAX_DURATION)
+        async with self._lock:
+            profile = Profile(duration=duration, interval=self.interval)
+            stop = threading.Event()
+            sampler = threading.Thread(
+                target=self._run,
+                args=(
+                    stop,
+                    asyncio.get_running_loop(),
+                    threading.get_ident(),
+                    handler_labels(routers),
+                    asyncio.current_task(),
+                    profile,
+                ),
+                name="loop_profiler",
+                daemon=True,
+            )
+            switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(switch_interval, SWITCH_INTERVAL))
+            started_at = time.perf_counter()
+            sampler.start()
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                stop.set()
+                await asyncio.to_thread(sampler.join)
+                sys.setswitchinterval(switch_interval)
+            profile.duration = time.perf_counter() - started_at
+            return profile
+
+
+loop_profiler = LoopProfiler()
@@ -0,0 +1,122 @@
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiohttp
+
+from tgbot.services.metrics import RPC_BATCH_SIZE, RPC_LATENCY
+
+
+class RPCError(Exception):
+    pass
+
+
+class SolanaRPC:
+    """
+    Solana JSON-RPC client over one pooled aiohttp session.
+
+    `batch` sends many calls of a method as a single JSON-RPC batch request,
+    failed calls come back as None instead of failing the whole batch.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        commitment: str = "confirmed",
+        timeout: float = 5.0,
+        connections: int = 20,
+    ):
+        self.url = url
+        self.commitment = commitment
+        self.timeout = timeout
+        self.connections = connections
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.connections, ttl_dns_cache=300, keepalive_timeout=30
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                json_serialize=json.dumps,
+            )
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def call(self, method: str, params: List[Any]) -> Any:
+        await self.start()
+        payload = {"jsonrpc": "2.0", "id": 0, "method": method, "params": params}
+
+        start = time.perf_counter()
+        try:
+            async with self.session.post(self.url, json=payload) as response:
+                if response.status != 200:
+                    raise RPCError(f"{method} returned HTTP {response.status}")
+                reply = await response.json(content_type=None)
+        finally:
+            RPC_LATENCY.labels(method).observe(time.perf_counter() - start)
+
+        if reply.get("error"):
+            raise RPCError(f"{method} failed: {reply['error']}")
+        return reply.get("result")
+
+    async def batch(
+        self, method: str, params: Sequence[List[Any]]
+    ) -> List[Optional[Any]]:
+        """Results of `method` per params entry, in the same order"""
+        if not params:
+            return []
+        await self.start()
+
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": call_params}
+            for i, call_params in enumerate(params)
+        ]
+        RPC_BATCH_SIZE.labels(method).observe(len(payload))
+
+        start = time.perf_counter()
+        try:
+            async with self.session.post(self.url, json=payload) as response:
+                if response.status != 200:
+                    raise RPCError(f"{method} returned HTTP {response.status}")
+                replies = await response.json(content_type=None)
+        finally:
+            RPC_LATENCY.labels(method).observe(time.perf_counter() - start)
+
+        if isinstance(replies, dict):
+            # some providers answer a failed batch with a single error object
+            raise RPCError(f"{method} failed: {replies.get('error')}")
+
+        results: List[Optional[Any]] = [None] * len(params)
+        for reply in replies:
+            call_id = reply.get("id")
+            if isinstance(call_id, int) and 0 <= call_id < len(results):
+                results[call_id] = reply.get("result")
+        return results
+
+    async def get_transactions(
+        self, signatures: Sequence[str]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        config = {
+            "encoding": "jsonParsed",
+            "commitment": self.commitment,
+            "maxSupportedTransactionVersion": 0,
+        }
+        results = await self.batch(
+            "getTransaction", [[signature, config] for signature in signatures]
+        )
+        return dict(zip(signatures, results))
+
+    async def get_multiple_accounts(
+        self, pubkeys: Sequence[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """jsonParsed accounts in the order of pubkeys, at most 100 per call"""
+        result = await self.call(
+            "getMultipleAccounts",
+            [list(pubkeys), {"encoding": "jsonParsed", "commitment": self.commitment}],
+        )
+        return result["value"]
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+@dataclass
+class StartupStep:
+    name: str
+    func: Callable[[], Awaitable[None]]
+    depends_on: Tuple[str, ...] = ()
+    # background steps are started like the others but startup does not wait for them
+    background: bool = False
+    duration: Optional[float] = field(default=None, init=False)
+
+
+class StartupOrchestrator:
+    """
+    Runs startup steps as a dependency graph.
+
+    Every step starts as soon as all of its dependencies have finished, so
+    independent steps run concurrently. A failing foreground step aborts the
+    startup, a failing background step is only logged.
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.steps: Dict[str, StartupStep] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def add_step(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[None]],
+        depends_on: Tuple[str, ...] = (),
+        background: bool = False,
+    ) -> None:
+        if name in self.steps:
+            raise ValueError(f"Startup step {name} is already registered")
+        self.steps[name] = StartupStep(name, func, tuple(depends_on), background)
+
+    def _check_graph(self) -> None:
+        for step in self.steps.values():
+            for dependency in step.depends_on:
+                if dependency not in self.steps:
+                    raise ValueError(
+                        f"Startup step {step.name} depends on unknown step {dependency}"
+                    )
+
+        visited: Dict[str, bool] = {}
+
+        def visit(name: str) -> None:
+            if visited.get(name) is False:
+                raise ValueError(f"Startup steps have a dependency cycle at {name}")
+            if name in visited:
+                return
+            visited[name] = False
+            for dependency in self.steps[name].depends_on:
+                visit(dependency)
+            visited[name] = True
+
+        for name in self.steps:
+            visit(name)
+
+    async def _run_step(self, step: StartupStep) -> None:
+        if step.depends_on:
+            await asyncio.gather(*(self._tasks[name] for name in step.depends_on))
+
+        start = time.perf_counter()
+        try:
+            await step.func()
+        except Exception as e:
+            self.logger.error(f"Startup step {step.name} failed: {e}")
+            raise
+        finally:
+            step.duration = time.perf_counter() - start
+
+        self.logger.info(
+            f"Startup step {step.name} finished in {step.duration * 1000:.1f} ms"
+        )
+
+    @staticmethod
+    def _background_done(task: asyncio.Task) -> None:
+        # the error is already logged by _run_step, only mark it as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self) -> None:
+        self._check_graph()
+        start = time.perf_counter()
+
+        # create the tasks in dependency order so every dependency task exists
+        pending = dict(self.steps)
+        while pending:
+            for name, step in list(pending.items()):
+                if all(dep in self._tasks for dep in step.depends_on):
+                    self._tasks[name] = asyncio.create_task(
+                        self._run_step(step), name=f"startup:{name}"
+                    )
+                    del pending[name]
+
+        foreground = [
+            task
+            for name, task in self._tasks.items()
+            if not self.steps[name].background
+        ]
+        for name, task in self._tasks.items():
+            if self.steps[name].background:
+                task.add_done_callback(self._background_done)
+
+        try:
+            await asyncio.gather(*foreground)
+        except Exception:
+            for task in foreground:
+                task.cancel()
+            raise
+
+        self.logger.info(
+            f"Startup finished in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
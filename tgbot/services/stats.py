@@ -0,0 +1,217 @@
+import asyncio
+import bisect
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+from prometheus_client.metrics import MetricWrapperBase
+
+from tgbot.database.orm import AsyncORM
+from tgbot.services.address_pages import page_cache
+from tgbot.services.metrics import (
+    ENRICHMENT_RESULTS,
+    EVENT_LOOP_LAG,
+    NOTIFICATION_QUEUE_DEPTH,
+    NOTIFICATIONS_SENT,
+    PUBSUB_MESSAGES,
+    REDIS_LATENCY,
+    TELEGRAM_API_LATENCY,
+    TOKEN_METADATA_LOOKUPS,
+)
+
+# cumulative (upper bound, count) pairs of a histogram
+Buckets = List[Tuple[float, float]]
+
+
+def metric_total(metric: MetricWrapperBase, suffix: str = "_total", **labels) -> float:
+    """Sum of the samples of a metric over the label sets matching `labels`"""
+    total = 0.0
+    for family in metric.collect():
+        for sample in family.samples:
+            if not sample.name.endswith(suffix):
+                continue
+            if all(sample.labels.get(k) == v for k, v in labels.items()):
+                total += sample.value
+    return total
+
+
+def histogram_buckets(metric: MetricWrapperBase, **labels) -> Buckets:
+    counts: Dict[float, float] = {}
+    for family in metric.collect():
+        for sample in family.samples:
+            if not sample.name.endswith("_bucket"):
+                continue
+            if all(sample.labels.get(k) == v for k, v in labels.items()):
+                le = float(sample.labels["le"])
+                counts[le] = counts.get(le, 0.0) + sample.value
+    return sorted(counts.items())
+
+
+def quantile(buckets: Buckets, q: float) -> Optional[float]:
+    """Quantile of cumulative buckets, linear within a bucket like histogram_quantile"""
+    if not buckets or not buckets[-1][1]:
+        return None
+
+    rank = q * buckets[-1][1]
+    index = bisect.bisect_left([count for _, count in buckets], rank)
+    upper, count = buckets[index]
+    lower, below = buckets[index - 1] if index else (0.0, 0.0)
+    if upper == float("inf"):
+        return lower
+    if count == below:
+        return upper
+    return lower + (upper - lower) * (rank - below) / (count - below)
+
+
+@dataclass
+class Sample:
+    at: float
+    totals: Dict[str, float]
+    histograms: Dict[str, Buckets]
+
+    @classmethod
+    def take(cls) -> "Sample":
+        return cls(
+            at=time.monotonic(),
+            totals={
+                "intake": metric_total(PUBSUB_MESSAGES),
+                "sent": metric_total(NOTIFICATIONS_SENT, status="ok"),
+                "throttled": metric_total(NOTIFICATIONS_SENT, status="retry"),
+                "failed": metric_total(NOTIFICATIONS_SENT, status="error")
+                + metric_total(NOTIFICATIONS_SENT, status="dropped"),
+                "enrichment_hits": metric_total(ENRICHMENT_RESULTS, status="hit"),
+                "enrichment_misses": metric_total(ENRICHMENT_RESULTS, status="miss"),
+                "token_local": metric_total(TOKEN_METADATA_LOOKUPS, tier="local"),
+                "token_lookups": metric_total(TOKEN_METADATA_LOOKUPS),
+                "page_hits": page_cache.hits,
+                "page_misses": page_cache.misses,
+            },
+            histograms={
+                "send": histogram_buckets(TELEGRAM_API_LATENCY, method="SendMessage"),
+                "loop_lag": histogram_buckets(EVENT_LOOP_LAG),
+                "redis": histogram_buckets(REDIS_LATENCY),
+            },
+        )
+
+    def delta(self, older: "Sample") -> Tuple[Dict[str, float], Dict[str, Buckets]]:
+        totals = {
+            name: value - older.totals.get(name, 0.0)
+            for name, value in self.totals.items()
+        }
+        histograms = {}
+        for name, buckets in self.histograms.items():
+            before = dict(older.histograms.get(name, []))
+            histograms[name] = [
+                (le, count - before.get(le, 0.0)) for le, count in buckets
+            ]
+        return totals, histograms
+
+
+@dataclass
+class StatsSnapshot:
+    window: float
+    intake_per_s: float
+    queue_depth: int
+    sent_per_s: float
+    throttled: int
+    failed: int
+    send_p50: Optional[float]
+    send_p99: Optional[float]
+    loop_lag_p50: Optional[float]
+    loop_lag_p99: Optional[float]
+    redis_rtt: Optional[float]
+    # checked out connections and the pool size, overflow can exceed it
+    db_pool: Optional[Tuple[int, int]]
+    enrichment_hit_rate: Optional[float]
+    token_hit_rate: Optional[float]
+    page_hit_rate: Optional[float]
+
+
+def _ratio(hits: float, total: float) -> Optional[float]:
+    return hits / total if total else None
+
+
+def db_pool_usage() -> Optional[Tuple[int, int]]:
+    factory = getattr(AsyncORM, "session_factory", None)
+    engine = factory.kw.get("bind") if factory else None
+    if engine is None:
+        return None
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return None
+    return pool.checkedout(), pool.size()
+
+
+class StatsSampler:
+    """
+    Rates and quantiles over the last `window` seconds of the Prometheus metrics.
+
+    Nothing is added to the hot path, the existing metrics are read every
+    `interval` seconds and a snapshot compares the current values with the
+    oldest sample of the window.
+    """
+
+    def __init__(self, window: float = 60, interval: float = 10):
+        self.window = window
+        self.interval = interval
+        self._samples: Deque[Sample] = deque()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="stats_sampler")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def sample(self) -> Sample:
+        sample = Sample.take()
+        self._samples.append(sample)
+        # keep one sample at least `window` old to compare with
+        while len(self._samples) > 2 and self._samples[1].at <= sample.at - self.window:
+            self._samples.popleft()
+        return sample
+
+    async def _run(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> StatsSnapshot:
+        oldest = self._samples[0] if self._samples else None
+        current = self.sample()
+        if oldest is None:
+            oldest = Sample(at=current.at - self.window, totals={}, histograms={})
+
+        elapsed = max(current.at - oldest.at, 1e-9)
+        totals, histograms = current.delta(oldest)
+
+        return StatsSnapshot(
+            window=elapsed,
+            intake_per_s=totals["intake"] / elapsed,
+            queue_depth=int(metric_total(NOTIFICATION_QUEUE_DEPTH, suffix="")),
+            sent_per_s=totals["sent"] / elapsed,
+            throttled=int(totals["throttled"]),
+            failed=int(totals["failed"]),
+            send_p50=quantile(histograms["send"], 0.5),
+            send_p99=quantile(histograms["send"], 0.99),
+            loop_lag_p50=quantile(histograms["loop_lag"], 0.5),
+            loop_lag_p99=quantile(histograms["loop_lag"], 0.99),
+            redis_rtt=quantile(histograms["redis"], 0.5),
+            db_pool=db_pool_usage(),
+            enrichment_hit_rate=_ratio(
+                totals["enrichment_hits"],
+                totals["enrichment_hits"] + totals["enrichment_misses"],
+            ),
+            token_hit_rate=_ratio(totals["token_local"], totals["token_lookups"]),
+            page_hit_rate=_ratio(
+                totals["page_hits"], totals["page_hits"] + totals["page_misses"]
+            ),
+        )
+
+
+stats_sampler = StatsSampler()
@@ -0,0 +1,137 @@
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+from aiogram import __version__
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import (
+    BaseConnector,
+    ClientSession,
+    TraceConfig,
+    TraceConnectionCreateEndParams,
+    TraceConnectionQueuedEndParams,
+    TraceConnectionQueuedStartParams,
+    TraceConnectionReuseconnParams,
+    UnixConnector,
+)
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+
+from tgbot.config import TelegramSession
+from tgbot.services.metrics import (
+    TELEGRAM_POOL_CONNECTIONS,
+    TELEGRAM_POOL_IDLE,
+    TELEGRAM_POOL_IN_USE,
+    TELEGRAM_POOL_WAIT,
+)
+
+
+def api_server(config: TelegramSession) -> TelegramAPIServer:
+    api_url = config.api_url.rstrip("/")
+    file_url = config.file_url.rstrip("/")
+    return TelegramAPIServer(
+        base=f"{api_url}/bot{{token}}/{{method}}",
+        file=f"{file_url}/file/bot{{token}}/{{path}}",
+    )
+
+
+async def _on_queued_start(
+    session: ClientSession,
+    context: SimpleNamespace,
+    params: TraceConnectionQueuedStartParams,
+) -> None:
+    context.queued_at = time.perf_counter()
+
+
+async def _on_queued_end(
+    session: ClientSession,
+    context: SimpleNamespace,
+    params: TraceConnectionQueuedEndParams,
+) -> None:
+    TELEGRAM_POOL_WAIT.observe(time.perf_counter() - context.queued_at)
+
+
+async def _on_connection_create(
+    session: ClientSession,
+    context: SimpleNamespace,
+    params: TraceConnectionCreateEndParams,
+) -> None:
+    TELEGRAM_POOL_CONNECTIONS.labels("created").inc()
+
+
+async def _on_connection_reuse(
+    session: ClientSession,
+    context: SimpleNamespace,
+    params: TraceConnectionReuseconnParams,
+) -> None:
+    TELEGRAM_POOL_CONNECTIONS.labels("reused").inc()
+
+
+def pool_trace_config() -> TraceConfig:
+    trace_config = TraceConfig()
+    trace_config.on_connection_queued_start.append(_on_queued_start)
+    trace_config.on_connection_queued_end.append(_on_queued_end)
+    trace_config.on_connection_create_end.append(_on_connection_create)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuse)
+    return trace_config
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """
+    AiohttpSession with a configurable connection pool to the Bot API server.
+
+    Connections are kept alive for `keepalive_timeout` and DNS answers are
+    cached for `dns_ttl`, so sends at a high rate reuse warm connections
+    instead of opening one per request. With `unix_socket` the requests go
+    over that socket. Pool usage is exported as tracker_bot_telegram_pool_*.
+    """
+
+    def __init__(self, config: TelegramSession, **kwargs):
+        super().__init__(api=api_server(config), **kwargs)
+        self.config = config
+        pool = {
+            "limit": config.connections,
+            "limit_per_host": config.connections_per_host,
+            "keepalive_timeout": config.keepalive_timeout,
+        }
+        if config.unix_socket:
+            self._connector_type = UnixConnector
+            self._connector_init = {"path": config.unix_socket, **pool}
+        else:
+            self._connector_init.update(
+                pool, use_dns_cache=True, ttl_dns_cache=config.dns_ttl
+            )
+
+        TELEGRAM_POOL_IN_USE.set_function(self._in_use)
+        TELEGRAM_POOL_IDLE.set_function(self._idle)
+
+    @property
+    def connector(self) -> Optional[BaseConnector]:
+        if self._session is None or self._session.closed:
+            return None
+        return self._session.connector
+
+    def _in_use(self) -> int:
+        # aiohttp has no public pool statistics
+        connector = self.connector
+        return len(getattr(connector, "_acquired", ())) if connector else 0
+
+    def _idle(self) -> int:
+        connector = self.connector
+        conns = getattr(connector, "_conns", {}) if connector else {}
+        return sum(len(idle) for idle in conns.values())
+
+    async def create_session(self) -> ClientSession:
+        if self._should_reset_connector:
+            await self.close()
+
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{__version__}"},
+                trace_configs=[pool_trace_config()],
+            )
+            self._should_reset_connector = False
+
+        return self._session
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from redis.asyncio.client import Redis
+
+from tgbot.database.orm import batched
+from tgbot.services.metrics import (
+    REDIS_ERRORS,
+    TOKEN_METADATA_FETCH_LATENCY,
+    TOKEN_METADATA_LOOKUPS,
+)
+from tgbot.services.solana_rpc import SolanaRPC
+
+# getMultipleAccounts accepts at most 100 accounts
+FETCH_BATCH_SIZE = 100
+# symbols are set by the token creator, longer ones are cut in messages
+MAX_SYMBOL_LENGTH = 16
+
+
+@dataclass(frozen=True)
+class TokenMetadata:
+    mint: str
+    decimals: int
+    # only Token-2022 mints carry their symbol on chain
+    symbol: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        if not self.symbol:
+            return f"{self.mint[:4]}…{self.mint[-4:]}"
+        if len(self.symbol) > MAX_SYMBOL_LENGTH:
+            return self.symbol[: MAX_SYMBOL_LENGTH - 1] + "…"
+        return self.symbol
+
+
+def parse_mint_account(
+    mint: str, account: Optional[Dict[str, Any]]
+) -> Optional[TokenMetadata]:
+    """Metadata from a jsonParsed mint account, None when it is not a mint"""
+    if not account:
+        return None
+
+    parsed = account.get("data", {})
+    if not isinstance(parsed, dict) or parsed.get("parsed", {}).get("type") != "mint":
+        return None
+
+    info = parsed["parsed"].get("info", {})
+    symbol = None
+    for extension in info.get("extensions", []):
+        if extension.get("extension") == "tokenMetadata":
+            symbol = extension.get("state", {}).get("symbol") or None
+    return TokenMetadata(mint=mint, decimals=info.get("decimals", 0), symbol=symbol)
+
+
+class TokenMetadataCache:
+    """
+    mint -> symbol/decimals with an in-process LRU in front of Redis.
+
+    Redis keeps one hash per mint for `ttl` seconds, unknown mints are cached
+    as negative entries for `negative_ttl`. Concurrent misses of a mint share
+    one in-flight fetch, and `get_many` resolves all misses of a batch with
+    one Redis pipeline and one getMultipleAccounts call per 100 mints.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        rpc: SolanaRPC,
+        local_size: int = 5000,
+        ttl: int = 24 * 3600,
+        negative_ttl: int = 3600,
+    ):
+        self.redis = redis
+        self.rpc = rpc
+        self.local_size = local_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.logger = logging.getLogger(__name__)
+        # mint -> (metadata or None for unknown mints, expires at)
+        self._local: "OrderedDict[str, Tuple[Optional[TokenMetadata], float]]" = (
+            OrderedDict()
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def key(mint: str) -> str:
+        return f"token:meta:{mint}"
+
+    def peek(self, mint: str) -> Optional[TokenMetadata]:
+        """Local tier only, never waits"""
+        entry = self._local.get(mint)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def _remember(self, mint: str, metadata: Optional[TokenMetadata]) -> None:
+        ttl = self.ttl if metadata else self.negative_ttl
+        self._local[mint] = (metadata, time.monotonic() + ttl)
+        self._local.move_to_end(mint)
+        if len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    async def get(self, mint: str) -> Optional[TokenMetadata]:
+        return (await self.get_many([mint]))[mint]
+
+    async def get_many(
+        self, mints: Iterable[str]
+    ) -> Dict[str, Optional[TokenMetadata]]:
+        results: Dict[str, Optional[TokenMetadata]] = {}
+        missing: List[str] = []
+
+        for mint in dict.fromkeys(mints):
+            entry = self._local.get(mint)
+            if entry is not None and entry[1] >= time.monotonic():
+                self._local.move_to_end(mint)
+                TOKEN_METADATA_LOOKUPS.labels("local").inc()
+                results[mint] = entry[0]
+            else:
+                missing.append(mint)
+
+        if missing:
+            missing = await self._from_redis(missing, results)
+        if missing:
+            await self._fetch(missing, results)
+        return results
+
+    async def prefetch(self, mints: Iterable[str]) -> None:
+        """Warm the local tier for a batch of transactions, errors are ignored"""
+        try:
+            await self.get_many(mints)
+        except Exception as e:
+            self.logger.warning(f"Token metadata prefetch failed: {e}")
+
+    async def _from_redis(
+        self, mints: List[str], results: Dict[str, Optional[TokenMetadata]]
+    ) -> List[str]:
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for mint in mints:
+                    pipe.hgetall(self.key(mint))
+                entries = await pipe.execute()
+        except Exception as e:
+            REDIS_ERRORS.labels("token_metadata").inc()
+            self.logger.warning(f"Token metadata lookup in Redis failed: {e}")
+            return mints
+
+        missing = []
+        for mint, entry in zip(mints, entries):
+            if not entry:
+                missing.append(mint)
+                continue
+
+            if entry.get(b"missing"):
+                metadata = None
+                TOKEN_METADATA_LOOKUPS.labels("negative").inc()
+            else:
+                symbol = entry.get(b"symbol")
+                metadata = TokenMetadata(
+                    mint=mint,
+                    decimals=int(entry[b"decimals"]),
+                    symbol=symbol.decode() if symbol else None,
+                )
+                TOKEN_METADATA_LOOKUPS.labels("redis").inc()
+            self._remember(mint, metadata)
+            results[mint] = metadata
+        return missing
+
+    async def _fetch(
+        self, mints: List[str], results: Dict[str, Optional[TokenMetadata]]
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        waiting: Dict[str, asyncio.Future] = {}
+        to_fetch: Dict[str, asyncio.Future] = {}
+        for mint in mints:
+            if mint in self._inflight:
+                waiting[mint] = self._inflight[mint]
+                TOKEN_METADATA_LOOKUPS.labels("coalesced").inc()
+            else:
+                future = loop.create_future()
+                self._inflight[mint] = to_fetch[mint] = waiting[mint] = future
+
+        if to_fetch:
+            try:
+                await self._fetch_from_rpc(to_fetch)
+            finally:
+                for mint, future in to_fetch.items():
+                    self._inflight.pop(mint, None)
+                    if not future.done():
+                        future.set_result(None)
+
+        for mint, future in waiting.items():
+            results[mint] = await asyncio.shield(future)
+
+    async def _fetch_from_rpc(self, futures: Dict[str, asyncio.Future]) -> None:
+        for mints in batched(futures, FETCH_BATCH_SIZE):
+            start = time.perf_counter()
+            accounts = await self.rpc.get_multiple_accounts(mints)
+            TOKEN_METADATA_FETCH_LATENCY.observe(time.perf_counter() - start)
+
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for mint, account in zip(mints, accounts):
+                    metadata = parse_mint_account(mint, account)
+                    TOKEN_METADATA_LOOKUPS.labels("rpc").inc()
+                    self._remember(mint, metadata)
+                    futures[mint].set_result(metadata)
+
+                    key = self.key(mint)
+                    if metadata:
+                        mapping = {"decimals": metadata.decimals}
+                        if metadata.symbol:
+                            mapping["symbol"] = metadata.symbol
+                        pipe.hset(key, mapping=mapping)
+                        pipe.expire(key, self.ttl)
+                    else:
+                        pipe.hset(key, "missing", 1)
+                        pipe.expire(key, self.negative_ttl)
+                try:
+                    await pipe.execute()
+                except Exception as e:
+                    REDIS_ERRORS.labels("token_metadata").inc()
+                    self.logger.warning(f"Failed to store token metadata: {e}")
@@ -0,0 +1,68 @@
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from tgbot.services.metrics import NOTIFICATION_LATENCY
+
+# transport: tracker publish -> pubsub receive
+# decode: payload json decode
+# enrich: waiting for getTransaction, only with enrichment enabled
+# fanout: resolving the recipients of a transaction
+# queue_wait: time in the notifier queue
+# telegram: the send call itself
+# total: tracker publish -> delivered
+# since_observed: tracker observed the transaction -> delivered
+STAGES = (
+    "transport",
+    "decode",
+    "enrich",
+    "fanout",
+    "queue_wait",
+    "telegram",
+    "total",
+    "since_observed",
+)
+_stage_histograms = {stage: NOTIFICATION_LATENCY.labels(stage) for stage in STAGES}
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Parse a Go RFC 3339 timestamp into unix seconds"""
+    if not value:
+        return None
+
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    published_at: Optional[float] = None
+    observed_at: Optional[float] = None
+    received_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_payload(cls, data: Dict[str, Any], received_at: float) -> "Trace":
+        trace = cls(
+            trace_id=data.get("trace_id") or "",
+            published_at=parse_timestamp(data.get("published_at")),
+            observed_at=parse_timestamp(data.get("timestamp")),
+            received_at=received_at,
+        )
+        if trace.published_at:
+            trace.span("transport", received_at - trace.published_at)
+        return trace
+
+    @staticmethod
+    def span(stage: str, seconds: float) -> None:
+        _stage_histograms[stage].observe(max(seconds, 0))
+
+    def delivered(self) -> None:
+        now = time.time()
+        if self.published_at:
+            self.span("total", now - self.published_at)
+        if self.observed_at:
+            self.span("since_observed", now - self.observed_at)
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+from redis.asyncio.client import Redis
+
+from tgbot.database.orm import AsyncORM, batched
+from tgbot.services.address_pages import page_cache
+from tgbot.misc.solana import is_valid_address
+
+MAX_NAME_LENGTH = 64
+# commands per redis pipeline round trip
+PUBLISH_BATCH_SIZE = 1000
+
+# first column names of a CSV header row
+HEADER_NAMES = {"address", "sol_address", "wallet", "pubkey", "public_key"}
+
+# "address name", "address,name", "address;name" or "address<TAB>name"
+_SEPARATOR = re.compile(r"\s*[,;\t]\s*|\s+")
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+@dataclass
+class WatchlistParseResult:
+    # (sol_address, name), deduplicated by address
+    entries: List[Tuple[str, str]] = field(default_factory=list)
+    total: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    invalid_examples: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ImportSummary:
+    added: int
+    already_tracked: int
+    invalid: int
+    duplicates: int
+    invalid_examples: List[str]
+
+
+def _default_name(sol_address: str) -> str:
+    return f"{sol_address[:4]}…{sol_address[-4:]}"
+
+
+def parse_watchlist_lines(lines: Iterable[str]) -> WatchlistParseResult:
+    """Parse `address [name]` rows, a CSV header row is skipped"""
+    result = WatchlistParseResult()
+    seen = set()
+
+    for line in lines:
+        line = line.strip().lstrip("\ufeff")
+        if not line:
+            continue
+
+        parts = _SEPARATOR.split(line, maxsplit=1)
+        sol_address = parts[0].strip('"')
+        result.total += 1
+
+        if not is_valid_address(sol_address):
+            if result.total == 1 and sol_address.lower() in HEADER_NAMES:
+                result.total -= 1
+                continue
+            result.invalid += 1
+            if len(result.invalid_examples) < 5:
+                result.invalid_examples.append(sol_address[:50])
+            continue
+
+        if sol_address in seen:
+            result.duplicates += 1
+            continue
+        seen.add(sol_address)
+
+        name = parts[1].strip().strip('"') if len(parts) > 1 else ""
+        result.entries.append(
+            (sol_address, name[:MAX_NAME_LENGTH] or _default_name(sol_address))
+        )
+
+    return result
+
+
+def parse_watchlist_file(path: str) -> WatchlistParseResult:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return parse_watchlist_lines(f)
+
+
+async def parse_watchlist_file_async(path: str) -> WatchlistParseResult:
+    """Parse and validate an uploaded file in a worker process"""
+    global _executor
+    if _executor is None:
+        # spawn, a fork would copy the logging and watchdog threads' locks
+        _executor = ProcessPoolExecutor(
+            max_workers=2, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, parse_watchlist_file, path)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def publish_wallet_commands(
+    redis: Redis, channel: str, action: str, addresses: List[str], chat_id: int
+) -> None:
+    """Send add/remove commands to the tracker, pipelined in batches"""
+    for batch in batched(addresses, PUBLISH_BATCH_SIZE):
+        async with redis.pipeline(transaction=False) as pipe:
+            for sol_address in batch:
+                command = {"action": action, "address": sol_address, "chat_id": chat_id}
+                pipe.publish(channel, json.dumps(command))
+            await pipe.execute()
+
+
+async def import_watchlist(
+    user_id: int,
+    chat_id: int,
+    parsed: WatchlistParseResult,
+    redis: Redis,
+    channel: str,
+) -> ImportSummary:
+    existing = await AsyncORM.addresses.get_user_sol_addresses(user_id)
+    new_entries = [entry for entry in parsed.entries if entry[0] not in existing]
+
+    await AsyncORM.addresses.bulk_create(user_id, new_entries)
+    page_cache.invalidate(user_id)
+    await publish_wallet_commands(
+        redis, channel, "add", [sol_address for sol_address, _ in new_entries], chat_id
+    )
+
+    return ImportSummary(
+        added=len(new_entries),
+        already_tracked=len(parsed.entries) - len(new_entries),
+        invalid=parsed.invalid,
+        duplicates=parsed.duplicates,
+        invalid_examples=parsed.invalid_examples,
+    )